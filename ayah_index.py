@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+ayah_index.py - O(1) lookups over QuranDataManager.all_ayas.
+
+Maps (sura, aya) and the ayah ordinal (0-based position in all_ayas) to each
+other, keeps a per-sura table (first ayah, ayah count) and, when a WordTable is
+available, the contiguous global word id range of every ayah.
+"""
+
+from array import array
+
+
+class AyahIndex:
+    def __init__(self, ayas, word_table=None):
+        """
+        ayas: all_ayas (a list of aya dicts or the corpus-backed sequence).
+        word_table: optional WordTable for word_range().
+        """
+        self.ayas = ayas
+        self._ordinals = {}    # (sura, aya) -> ordinal of its first entry in ayas
+        self._sura_first = {}  # sura -> ordinal of its first ayah
+        self._sura_count = {}  # sura -> number of ayahs
+        self._keys = []        # ordinal -> (sura, aya)
+
+        for ordinal, aya in enumerate(ayas):
+            sura_no = aya.get('sura_no')
+            key = (sura_no, aya.get('aya_no'))
+            self._keys.append(key)
+            self._ordinals.setdefault(key, ordinal)
+            self._sura_first.setdefault(sura_no, ordinal)
+            self._sura_count[sura_no] = self._sura_count.get(sura_no, 0) + 1
+
+        # Ordinal -> first global word id and word count (0/0 when unknown).
+        self._word_start = array('I', bytes(4 * len(self._keys)))
+        self._word_count = array('H', bytes(2 * len(self._keys)))
+        if word_table is not None:
+            self._index_words(word_table)
+
+    def _index_words(self, word_table):
+        for global_id in word_table:
+            ordinal = self._ordinals.get((word_table.sura[global_id], word_table.aya[global_id]))
+            if ordinal is None:
+                continue
+            if not self._word_count[ordinal]:
+                self._word_start[ordinal] = global_id
+            self._word_count[ordinal] += 1
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._ordinals
+
+    # --- Ayahs ---
+    def ordinal(self, sura, aya):
+        """(sura, aya) -> 0-based position in all_ayas, or None."""
+        return self._ordinals.get((sura, aya))
+
+    def key(self, ordinal):
+        """Ordinal -> (sura, aya), or None."""
+        return self._keys[ordinal] if 0 <= ordinal < len(self._keys) else None
+
+    def get(self, sura, aya):
+        """The aya dict for (sura, aya), or None."""
+        ordinal = self._ordinals.get((sura, aya))
+        return None if ordinal is None else self.ayas[ordinal]
+
+    def next_key(self, sura, aya):
+        """(sura, aya) of the ayah after the given one, or None at the end of the mushaf."""
+        ordinal = self._ordinals.get((sura, aya))
+        if ordinal is None or ordinal + 1 >= len(self._keys):
+            return None
+        return self._keys[ordinal + 1]
+
+    def prev_key(self, sura, aya):
+        """(sura, aya) of the ayah before the given one, or None at the start of the mushaf."""
+        ordinal = self._ordinals.get((sura, aya))
+        if not ordinal:
+            return None
+        return self._keys[ordinal - 1]
+
+    # --- Suras ---
+    def sura(self, sura_no):
+        """The first aya dict of a sura (carries sura_name_ar, page, ...), or None."""
+        ordinal = self._sura_first.get(sura_no)
+        return None if ordinal is None else self.ayas[ordinal]
+
+    def sura_ayah_count(self, sura_no):
+        return self._sura_count.get(sura_no, 0)
+
+    def sura_ordinals(self, sura_no):
+        """range of ordinals covering the sura's ayahs."""
+        first = self._sura_first.get(sura_no)
+        if first is None:
+            return range(0)
+        return range(first, first + self._sura_count[sura_no])
+
+    # --- Words ---
+    def word_range(self, sura, aya):
+        """range of global word ids in (sura, aya); empty if unknown or no WordTable was given."""
+        ordinal = self._ordinals.get((sura, aya))
+        if ordinal is None or not self._word_count[ordinal]:
+            return range(0)
+        start = self._word_start[ordinal]
+        return range(start, start + self._word_count[ordinal])
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark_data_layer.py - Reproducible benchmarks for the data layer hot paths.
+
+    python benchmark_data_layer.py                         # run, write benchmark_results.json
+    python benchmark_data_layer.py --output base.json      # store a baseline
+    python benchmark_data_layer.py --compare base.json     # run and compare against it
+
+Startup is measured in child processes with an empty app-data directory
+(cold: no snapshot, no page shards) and then again with the caches that run
+left behind (warm), including the time of each loading stage. Everything else
+runs in-process on a loaded QuranDataManager. Query inputs are drawn from the
+loaded text with a fixed seed, so runs on the same data are comparable.
+Comparison exits with status 1 when any median regresses beyond --threshold
+(and by more than --min-delta-ms, so microsecond timings don't flag noise).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+STARTUP_CHILD_FLAG = "--startup-child"
+
+
+def measure(func, repeat, setup=None):
+    """Runs func() repeat times; returns timing stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "mean_ms": statistics.fmean(samples),
+        "runs": repeat,
+    }
+
+
+def _quiet(func):
+    """Wraps func so the data layer's diagnostic prints don't flood the report."""
+    def run():
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+        try:
+            return func()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return run
+
+
+# --- Startup (child process) ---
+def startup_child():
+    """Loads QuranDataManager once and prints its timings as JSON on the last line."""
+    start = time.perf_counter()
+    from quran_data_manager import QuranDataManager
+    imported = time.perf_counter()
+    data_manager = QuranDataManager()
+    done = time.perf_counter()
+
+    loader = data_manager.loader
+    phases = {name: {"start_ms": (begin - loader.started) * 1000, "duration_ms": (end - begin) * 1000}
+              for name, (begin, end) in loader.timings.items()}
+    print(json.dumps({"import_ms": (imported - start) * 1000, "init_ms": (done - imported) * 1000,
+                      "phases": phases}))
+
+
+def run_startup(app_data_dir):
+    env = dict(os.environ, HOME=app_data_dir, APPDATA=app_data_dir)
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), STARTUP_CHILD_FLAG],
+                          env=env, capture_output=True, text=True, encoding='utf-8')
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup benchmark failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(results, repeat):
+    samples = {}
+    phase_samples = {}
+
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="quran-bench-") as app_data_dir:
+            for kind in ("cold", "warm"):
+                run = run_startup(app_data_dir)
+                samples.setdefault(f"startup.{kind}.import", []).append(run["import_ms"])
+                samples.setdefault(f"startup.{kind}.init", []).append(run["init_ms"])
+                for phase, timing in run["phases"].items():
+                    phase_samples.setdefault(f"startup.{kind}.phase.{phase}", []).append(timing["duration_ms"])
+
+    for name, values in samples.items():
+        results[name] = _stats(values)
+    for name, values in sorted(phase_samples.items()):
+        results[name] = _stats(values)
+
+
+def _stats(samples):
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples),
+            "mean_ms": statistics.fmean(samples), "runs": len(samples)}
+
+
+# --- In-process benchmarks ---
+def bench_normalize(results, data_manager, repeat):
+    from utils import normalize_word, normalize_words, normalize_corpus_word
+    words = [w for aya in data_manager.all_ayas for w in aya.get('aya_text_emlaey', '').split()]
+
+    stats = measure(lambda: [normalize_word(w) for w in words], repeat)
+    stats["words_per_s"] = len(words) / (stats["median_ms"] / 1000)
+    results["normalize_word.corpus"] = stats
+
+    normalize_words(words)
+    stats = measure(lambda: normalize_words(words), repeat)
+    stats["words_per_s"] = len(words) / (stats["median_ms"] / 1000)
+    results["normalize_words.cached"] = stats
+    normalize_corpus_word.cache_clear()
+
+
+def bench_search(results, data_manager, repeat, rng):
+    texts = [aya['aya_text_emlaey'].split() for aya in data_manager.all_ayas if aya.get('aya_text_emlaey')]
+    for length in (1, 2, 4, 8):
+        candidates = [words for words in texts if len(words) >= length]
+        queries = []
+        for _ in range(10):
+            words = rng.choice(candidates)
+            start = rng.randrange(len(words) - length + 1)
+            queries.append(" ".join(words[start:start + length]))
+        run = _quiet(lambda: [data_manager.find_verse_by_text(q) for q in queries])
+        stats = measure(run, repeat)
+        stats["median_ms"] /= len(queries); stats["min_ms"] /= len(queries); stats["mean_ms"] /= len(queries)
+        results[f"find_verse_by_text.words_{length}"] = stats
+
+        fuzzy = _quiet(lambda: [data_manager.find_verse_by_text(q, fuzzy=True) for q in queries[:3]])
+        stats = measure(fuzzy, repeat)
+        stats["median_ms"] /= 3; stats["min_ms"] /= 3; stats["mean_ms"] /= 3
+        results[f"find_verse_by_text.fuzzy.words_{length}"] = stats
+
+
+def bench_recitation_range(results, data_manager, repeat):
+    ranges = {
+        "short": (2, 255, 2, 257),
+        "long": (2, 1, 2, 286),
+        "juz_30": data_manager.get_range_for_unit('juz', 30) or (78, 1, 114, 6),
+    }
+    clear = data_manager.range_engine.clear_cache if data_manager.range_engine else None
+    for name, bounds in ranges.items():
+        results[f"build_recitation_range.{name}"] = measure(
+            lambda: data_manager.build_recitation_range(*bounds), repeat, setup=clear)
+        if clear:
+            results[f"build_recitation_range.{name}.cached"] = measure(
+                lambda: data_manager.build_recitation_range(*bounds), repeat)
+
+
+def bench_units(results, data_manager, repeat):
+    results["get_range_for_unit.all_juz"] = measure(
+        lambda: [data_manager.get_range_for_unit('juz', juz) for juz in range(1, 31)], repeat)
+
+
+def bench_word_meaning_manager(results, repeat):
+    from quran_data_manager import WORD_RASM_DB_FILE
+    from word_meaning_manager import WordMeaningManager
+    manager = WordMeaningManager(WORD_RASM_DB_FILE)
+    results["word_meaning_manager.load_all.sqlite"] = measure(_quiet(lambda: manager.load_all(use_snapshot=False)), repeat)
+    _quiet(manager.load_all)() # Writes the snapshot if there is none yet
+    results["word_meaning_manager.load_all.snapshot"] = measure(_quiet(manager.load_all), repeat)
+
+
+def run_benchmarks(repeat, startup_repeat, seed):
+    results = {}
+    print("Benchmarking startup (child processes)...")
+    bench_startup(results, startup_repeat)
+
+    print("Loading QuranDataManager...")
+    from quran_data_manager import QuranDataManager
+    data_manager = _quiet(QuranDataManager)()
+
+    print("Benchmarking in-process hot paths...")
+    bench_normalize(results, data_manager, repeat)
+    bench_search(results, data_manager, repeat, random.Random(seed))
+    bench_recitation_range(results, data_manager, repeat)
+    bench_units(results, data_manager, repeat)
+    bench_word_meaning_manager(results, repeat)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "startup_repeat": startup_repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold, min_delta_ms=0.0):
+    """
+    Prints the median change per benchmark. Returns the names that regressed by more
+    than threshold percent and more than min_delta_ms.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<50} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<50} {'-':>11} {stats['median_ms']:>9.2f}ms {'new':>8}")
+            continue
+        change = (stats["median_ms"] - base["median_ms"]) / base["median_ms"] * 100 if base["median_ms"] else 0.0
+        flag = ""
+        if change > threshold and stats["median_ms"] - base["median_ms"] > min_delta_ms:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<50} {base['median_ms']:>9.2f}ms {stats['median_ms']:>9.2f}ms {change:>+7.1f}%{flag}")
+    for name in baseline.get("results", {}):
+        if name not in current["results"]:
+            print(f"{name:<50} (missing from this run)")
+    return regressions
+
+
+def print_results(report):
+    print(f"\n{'benchmark':<50} {'median':>11} {'min':>11}")
+    for name, stats in report["results"].items():
+        print(f"{name:<50} {stats['median_ms']:>9.2f}ms {stats['min_ms']:>9.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Quran data layer hot paths.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1,
+                        help="ignore regressions smaller than this many milliseconds")
+    parser.add_argument("--repeat", type=int, default=7, help="runs per in-process benchmark")
+    parser.add_argument("--startup-repeat", type=int, default=3, help="cold/warm startup runs")
+    parser.add_argument("--seed", type=int, default=1234, help="seed for query sampling")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.repeat, args.startup_repeat, args.seed)
+    print_results(report)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0f}%.")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    if STARTUP_CHILD_FLAG in sys.argv:
+        startup_child()
+    else:
+        sys.exit(main())
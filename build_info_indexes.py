@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+build_info_indexes.py - Adds lookup indexes to the info databases (data/sqlite).
+
+For each database QuranInfoManager reads (meaning, eerab, sarf, the tafsirs,
+nozool, tajweed) this checks with EXPLAIN QUERY PLAN whether the exact queries
+the manager issues - the word lookup, the ayah lookup and the batch range query
+of prefetch_words() - can use an index. Where one of them scans the table, an
+index on (sura, aya[, word]) is created; when the content column is short
+(word databases) the content and title columns are appended so the lookup is
+answered from the index alone. Lookup latency is measured on a sample of real
+keys before and after and reported per database.
+
+    python build_info_indexes.py                 # all databases
+    python build_info_indexes.py meaning tabary  # only these
+    python build_info_indexes.py --check         # report only, change nothing
+
+The databases are modified in place, so run this while the app is closed; the
+app notices the changed files and re-reads their schema on the next start.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+from quran_info_manager import QuranInfoManager
+
+SAMPLE_KEYS = 200           # lookups timed per query shape
+COVERING_MAX_AVG_BYTES = 512  # include the content in the index only below this average length
+
+
+def _lookup_queries(manager, db_key, config):
+    """(name, sql, params_for_key) for every query shape QuranInfoManager runs on db_key."""
+    table, sura_col, aya_col, word_col, content_col, has_project_id, title_col = config
+    queries = [("aya", manager._select_query(db_key, config, by_word=False), lambda k: k[:2])]
+    if word_col:
+        queries.append(("word", manager._select_query(db_key, config, by_word=True), lambda k: k))
+        queries.append(("batch", manager._batch_query(db_key, config), lambda k: (k[0], k[1], k[1], k[2], k[2] + 20)))
+    return queries
+
+
+def _scans(conn, sql, params):
+    """True if SQLite would read the whole table for sql."""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return any(row[-1].startswith("SCAN") for row in plan)
+
+
+def _time_queries(conn, queries, keys):
+    """Median latency in microseconds of each query shape over keys."""
+    timings = {}
+    for name, sql, params_for in queries:
+        samples = []
+        for key in keys:
+            start = time.perf_counter()
+            conn.execute(sql, params_for(key)).fetchall()
+            samples.append((time.perf_counter() - start) * 1e6)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def _index_columns(conn, config):
+    table, sura_col, aya_col, word_col, content_col, has_project_id, title_col = config
+    columns = [sura_col, aya_col] + ([word_col] if word_col else [])
+    avg_len = conn.execute(f"SELECT AVG(LENGTH({content_col})) FROM {table}").fetchone()[0] or 0
+    if avg_len <= COVERING_MAX_AVG_BYTES:
+        columns.append(content_col)
+        if title_col:
+            columns.append(title_col)
+    return columns, avg_len
+
+
+def index_database(manager, db_key, check_only=False):
+    """Inspects (and unless check_only, indexes) one database. Returns a report dict or None."""
+    db_path = os.path.join(manager.base_path, manager.db_files[db_key])
+    if not os.path.exists(db_path):
+        print(f"{db_key}: {db_path} not found, skipped.")
+        return None
+
+    conn = sqlite3.connect(db_path)
+    try:
+        schema = manager._discover_db_schema(db_key, conn)
+        if not schema or not schema["config"][4]:
+            print(f"{db_key}: no content table found, skipped.")
+            return None
+        config = schema["config"]
+        if config[3] not in schema["columns"]: # The word column is only a guess for ayah databases
+            config = config[:3] + (None,) + config[4:]
+        table, sura_col, aya_col, word_col = config[:4]
+
+        key_cols = f"{sura_col}, {aya_col}" + (f", {word_col}" if word_col else "")
+        rows = conn.execute(f"SELECT {key_cols} FROM {table}").fetchall()
+        if not rows:
+            print(f"{db_key}: table {table} is empty, skipped.")
+            return None
+        random.seed(0)
+        keys = [tuple(r) + ((0,) if not word_col else ()) for r in random.sample(rows, min(SAMPLE_KEYS, len(rows)))]
+
+        queries = _lookup_queries(manager, db_key, config)
+        scanning = [name for name, sql, params_for in queries if _scans(conn, sql, params_for(keys[0]))]
+        report = {"db": db_key, "scanning": scanning, "before": _time_queries(conn, queries, keys),
+                  "index": None, "after": None}
+
+        if scanning and not check_only:
+            columns, avg_len = _index_columns(conn, config)
+            name = f"idx_{table}_info_lookup"
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+            conn.execute(f"ANALYZE {table}")
+            conn.commit()
+            report["index"] = (name, columns, avg_len)
+            report["after"] = _time_queries(conn, queries, keys)
+        return report
+    finally:
+        conn.close()
+
+
+def _print_report(report):
+    shapes = sorted(report["before"])
+    print(f"\n{report['db']}: {'full scan in ' + ', '.join(report['scanning']) if report['scanning'] else 'all lookups use an index'}")
+    if report["index"]:
+        name, columns, avg_len = report["index"]
+        print(f"  created {name} ({', '.join(columns)}), average content {avg_len:.0f} bytes")
+    for shape in shapes:
+        line = f"  {shape:<6} {report['before'][shape]:10.1f} us"
+        if report["after"]:
+            after = report["after"][shape]
+            line += f" -> {after:10.1f} us ({report['before'][shape] / max(after, 1e-3):.1f}x)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the info databases for QuranInfoManager's lookups.")
+    parser.add_argument("db_keys", nargs="*", help="databases to process (default: all)")
+    parser.add_argument("--check", action="store_true", help="only report query plans and latency")
+    args = parser.parse_args()
+
+    manager = QuranInfoManager()
+    db_keys = args.db_keys or list(manager.db_files)
+    unknown = [k for k in db_keys if k not in manager.db_files]
+    if unknown:
+        parser.error(f"unknown databases: {', '.join(unknown)} (known: {', '.join(manager.db_files)})")
+
+    for db_key in db_keys:
+        try:
+            report = index_database(manager, db_key, check_only=args.check)
+        except sqlite3.Error as e:
+            print(f"{db_key}: {e}")
+            continue
+        if report:
+            _print_report(report)
+
+
+if __name__ == '__main__':
+    main()
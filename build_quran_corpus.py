@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+build_quran_corpus.py - Compiles the Quran JSON data files into the binary
+corpus (data/quran_corpus.bin) that QuranDataManager memory-maps at startup.
+
+Re-run this script whenever one of the JSON sources changes; the app detects
+out-of-date corpora and falls back to the JSON files until then.
+"""
+
+import json
+import os
+import time
+
+from utils import (resource_path, QURAN_CORPUS_FILE, QURAN_TEXT_BY_PAGE_FILE,
+                   MINI_AYA_DICT_NOSH_FILE, MINI_WORDS_DICT_FULL_FILE, QURAN_WORD_MEANINGS_FILE)
+from quran_corpus import compile_corpus
+
+CONSOLIDATED_FILE = resource_path(os.path.join("data", "consolidated_quran_pages.json"))
+MUSHAF_LAYOUT_FILE = resource_path(os.path.join("data", "full_mushaf_pages_with_jozz.json"))
+
+# Blob name -> source file. Blobs are stored verbatim and decoded lazily by the app.
+BLOB_SOURCES = {
+    "page_text_map": QURAN_TEXT_BY_PAGE_FILE,
+    "aya_dict_nosh": MINI_AYA_DICT_NOSH_FILE,
+    "words_dict_full": MINI_WORDS_DICT_FULL_FILE,
+    "word_meanings": QURAN_WORD_MEANINGS_FILE,
+}
+
+
+def _read_json_blob(path):
+    """Returns the raw bytes of a JSON file after checking that it parses."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    json.loads(raw.decode('utf-8'))
+    return raw
+
+
+def build_quran_corpus(output_path=QURAN_CORPUS_FILE):
+    # Imported here so the data manager's own corpus lookup does not run at import time.
+    from quran_data_manager import QuranDataManager
+
+    start = time.time()
+    print("Loading JSON sources...")
+    # Build from a fully loaded manager so the compiled ayas are exactly what the app computes.
+    data_manager = QuranDataManager(use_corpus=False)
+    if not data_manager.full_page_layout_data:
+        print(f"Error: no layout data loaded from {MUSHAF_LAYOUT_FILE}. Corpus not written.")
+        return False
+
+    pages = [data_manager.full_page_layout_data[p] for p in sorted(data_manager.full_page_layout_data)]
+
+    blobs = {}
+    for name, path in BLOB_SOURCES.items():
+        if not os.path.exists(path):
+            print(f"Warning: {path} not found, '{name}' will be empty in the corpus.")
+            continue
+        try:
+            blobs[name] = _read_json_blob(path)
+        except (ValueError, IOError) as e:
+            print(f"Warning: skipping {path}: {e}")
+
+    sources = {os.path.basename(p): p for p in [CONSOLIDATED_FILE, MUSHAF_LAYOUT_FILE, *BLOB_SOURCES.values()]}
+    extra_meta = {"sura_juz_info": data_manager.sura_juz_info}
+
+    page_count, word_count, string_count = compile_corpus(
+        output_path, pages, data_manager.all_ayas, blobs, sources, extra_meta)
+
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"Wrote {output_path}: {page_count} pages, {word_count} words, {len(data_manager.all_ayas)} ayas, "
+          f"{string_count} strings ({size_mb:.1f} MB) in {time.time() - start:.1f}s")
+    return True
+
+
+if __name__ == '__main__':
+    build_quran_corpus()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+build_unified_info_db.py - Merges the info databases (data/sqlite) into one file,
+data/sqlite/quran-info-unified.sqlite, that QuranInfoManager reads instead of
+opening eleven separate databases.
+
+Every entry is keyed canonically: word entries (meaning, eerab, sarf) by the
+global word id and ayah entries (tafsirs, nozool, tajweed) by the ayah ordinal
+(1..6236), both taken from word-wordrasm.sqlite, the same ids the app already
+passes to QuranInfoManager. Each source row is matched on exactly the
+(sura, aya[, word]) key the manager would have queried it with, so lookups
+return the same text as before; rows no lookup could reach are dropped. The size
+and SQLite change counter of every source are recorded, so the app can tell a
+stale unified file from its sources' headers alone.
+
+    words     (global_word_id, sura_id, aya_id, ayah_ordinal)
+    ayahs     (ayah_ordinal, sura_id, aya_id)
+    sources   (source_id, db_key, level, file_name, signature)
+    word_info (source_id, global_word_id, content, title)
+    ayah_info (source_id, ayah_ordinal, content, title)
+
+Re-run this script whenever one of the databases changes; the app detects an
+out-of-date unified file and falls back to the separate databases until then.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from utils import UNIFIED_INFO_DB_FILE
+from quran_info_manager import QuranInfoManager, WORD_DB_KEYS, UNIFIED_SCHEMA_VERSION, unified_fingerprint
+from sqlite_pool import read_only_uri
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE sources (source_id INTEGER PRIMARY KEY, db_key TEXT UNIQUE, level TEXT,
+                      file_name TEXT, signature TEXT);
+CREATE TABLE ayahs (ayah_ordinal INTEGER PRIMARY KEY, sura_id INTEGER, aya_id INTEGER);
+CREATE UNIQUE INDEX ayahs_by_sura_aya ON ayahs (sura_id, aya_id);
+CREATE TABLE words (global_word_id INTEGER PRIMARY KEY, sura_id INTEGER, aya_id INTEGER,
+                    ayah_ordinal INTEGER REFERENCES ayahs);
+CREATE TABLE word_info (source_id INTEGER REFERENCES sources, global_word_id INTEGER REFERENCES words,
+                        content TEXT, title TEXT, PRIMARY KEY (source_id, global_word_id)) WITHOUT ROWID;
+CREATE TABLE ayah_info (source_id INTEGER REFERENCES sources, ayah_ordinal INTEGER REFERENCES ayahs,
+                        content TEXT, title TEXT, UNIQUE (source_id, ayah_ordinal));
+"""
+
+
+def _text(value):
+    return value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value
+
+
+def _read_keys(word_rasm_path):
+    """[(global_word_id, sura_id, aya_id)] in word order, from word-wordrasm.sqlite."""
+    conn = sqlite3.connect(read_only_uri(word_rasm_path), uri=True)
+    try:
+        return conn.execute("SELECT word_id, sura_id, aya_id FROM project_contents ORDER BY word_id").fetchall()
+    finally:
+        conn.close()
+
+
+def _merge_source(out, manager, source_id, db_key, word_ids, ayah_ordinals):
+    """Copies one info database into word_info/ayah_info. Returns (level, kept, dropped) or None."""
+    db_path = os.path.join(manager.base_path, manager.db_files[db_key])
+    if not os.path.exists(db_path):
+        print(f"Warning: {db_path} not found, '{db_key}' will not be in the unified database.")
+        return None
+
+    src = sqlite3.connect(read_only_uri(db_path), uri=True)
+    try:
+        schema = manager._discover_db_schema(db_key, src)
+        if not schema or not schema["config"][4]:
+            print(f"Warning: no content table in {db_path}, '{db_key}' skipped.")
+            return None
+        table, sura_col, aya_col, word_col, content_col, has_project_id, title_col = schema["config"]
+        # Word databases are looked up per word only when they have a word column; otherwise
+        # QuranInfoManager falls back to the ayah, and so does the unified database.
+        level = "word" if db_key in WORD_DB_KEYS and word_col in schema["columns"] else "ayah"
+
+        cols = [sura_col, aya_col] + ([word_col] if level == "word" else []) + [content_col]
+        cols += [title_col] if title_col else []
+        kept = dropped = 0
+        for row in src.execute(f"SELECT {', '.join(cols)} FROM {table}"):
+            content = _text(row[len(cols) - 2] if title_col else row[-1])
+            title = _text(row[-1]) if title_col else None
+            if level == "word":
+                key = word_ids.get((row[0], row[1], row[2]))
+                target = "word_info (source_id, global_word_id, content, title)"
+            else:
+                key = ayah_ordinals.get((row[0], row[1]))
+                target = "ayah_info (source_id, ayah_ordinal, content, title)"
+            if key is None:
+                dropped += 1
+                continue
+            # OR IGNORE: the first row for a key wins, as with the manager's fetchone().
+            out.execute(f"INSERT OR IGNORE INTO {target} VALUES (?, ?, ?, ?)", (source_id, key, content, title))
+            kept += 1
+    finally:
+        src.close()
+
+    out.execute("INSERT INTO sources VALUES (?, ?, ?, ?, ?)",
+                (source_id, db_key, level, os.path.basename(db_path), json.dumps(unified_fingerprint(db_path))))
+    return level, kept, dropped
+
+
+def build_unified_info_db(output_path=UNIFIED_INFO_DB_FILE):
+    # Imported here so building does not need the data manager's other modules at import time.
+    from quran_data_manager import WORD_RASM_DB_FILE
+
+    start = time.time()
+    if not os.path.exists(WORD_RASM_DB_FILE):
+        print(f"Error: {WORD_RASM_DB_FILE} not found; it provides the global word ids. Nothing written.")
+        return False
+
+    keys = _read_keys(WORD_RASM_DB_FILE)
+    word_ids = {(s, a, w): w for w, s, a in keys}
+    ayah_ordinals = {}
+    for _, s, a in keys:
+        ayah_ordinals.setdefault((s, a), len(ayah_ordinals) + 1)
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    out = sqlite3.connect(tmp_path)
+    try:
+        out.executescript(SCHEMA)
+        out.executemany("INSERT INTO ayahs VALUES (?, ?, ?)", ((o, s, a) for (s, a), o in ayah_ordinals.items()))
+        out.executemany("INSERT INTO words VALUES (?, ?, ?, ?)", ((w, s, a, ayah_ordinals[(s, a)]) for w, s, a in keys))
+
+        manager = QuranInfoManager()
+        for source_id, db_key in enumerate(manager.db_files, start=1):
+            result = _merge_source(out, manager, source_id, db_key, word_ids, ayah_ordinals)
+            if result:
+                level, kept, dropped = result
+                print(f"  {db_key:<10} {level:<5} {kept:>7} entries" + (f", {dropped} rows with unknown ids dropped" if dropped else ""))
+
+        # The word ids themselves are a source: if word-wordrasm.sqlite changes, so do the keys.
+        out.execute("INSERT INTO sources VALUES (?, ?, ?, ?, ?)",
+                    (0, "wordrasm", "keys", os.path.basename(WORD_RASM_DB_FILE), json.dumps(unified_fingerprint(WORD_RASM_DB_FILE))))
+        out.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(UNIFIED_SCHEMA_VERSION),))
+        out.commit()
+        out.execute("ANALYZE")
+        out.execute("VACUUM")
+    finally:
+        out.close()
+    os.replace(tmp_path, output_path)
+
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"Wrote {output_path} ({size_mb:.1f} MB, {len(keys)} words, {len(ayah_ordinals)} ayat) in {time.time() - start:.1f}s")
+    return True
+
+
+if __name__ == '__main__':
+    build_unified_info_db()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+build_word_meanings.py - Offline phrase-to-word alignment of words_meanings.json.
+
+Writes data/word_meanings_index.bin (global_word_id -> meaning id + deduplicated
+meaning pool) which QuranDataManager loads instead of aligning at startup, and a
+verification report listing every phrase that could not be placed on a word.
+"""
+
+import json
+import os
+import time
+
+from utils import (resource_path, QURAN_WORD_MEANINGS_FILE, QURAN_WORD_MEANINGS_INDEX_FILE)
+from word_meanings_index import (parse_meaning_phrases, align_word_meanings,
+                                 unmatched_phrases, write_word_meanings_index)
+
+REPORT_FILE = resource_path(os.path.join("data", "word_meanings_report.json"))
+
+
+def build_word_meanings(output_path=QURAN_WORD_MEANINGS_INDEX_FILE, report_path=REPORT_FILE):
+    from quran_data_manager import QuranDataManager, MUSHAF_LAYOUT_FILE, WORD_RASM_DB_FILE
+
+    start = time.time()
+    data_manager = QuranDataManager()
+    if not data_manager.full_page_layout_data or not data_manager.local_to_global_map:
+        print("Error: layout data or word ID mappings are missing. Index not written.")
+        return False
+
+    if os.path.exists(QURAN_WORD_MEANINGS_FILE):
+        with open(QURAN_WORD_MEANINGS_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    elif data_manager.corpus and data_manager.corpus.has_blob("word_meanings"):
+        data = data_manager.corpus.load_json("word_meanings")
+    else:
+        print(f"Error: meanings file not found: {QURAN_WORD_MEANINGS_FILE}")
+        return False
+
+    phrases = parse_meaning_phrases(data)
+    matched = set()
+    pages = (data_manager.full_page_layout_data[p] for p in sorted(data_manager.full_page_layout_data))
+    word_meanings = align_word_meanings(pages, phrases, matched)
+
+    # Source names are relative to the data folder the index is written to.
+    data_dir = os.path.dirname(os.path.abspath(output_path))
+    sources = {os.path.relpath(p, data_dir): p
+               for p in [QURAN_WORD_MEANINGS_FILE, MUSHAF_LAYOUT_FILE, WORD_RASM_DB_FILE]}
+    mapped, missing_ids = write_word_meanings_index(output_path, word_meanings,
+                                                    data_manager.local_to_global_map, sources)
+
+    unmatched = unmatched_phrases(phrases, matched)
+    total_phrases = sum(len(v) for v in phrases.values())
+    report = {
+        "phrases": total_phrases,
+        "matched_phrases": total_phrases - len(unmatched),
+        "mapped_words": mapped,
+        "words_without_global_id": missing_ids,
+        "unmatched": unmatched,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Wrote {output_path}: {mapped} words mapped to meanings in {time.time() - start:.1f}s")
+    print(f"Matched {report['matched_phrases']}/{total_phrases} phrases; "
+          f"{len(unmatched)} unmatched, {missing_ids} words without a global ID. Report: {report_path}")
+    return True
+
+
+if __name__ == '__main__':
+    build_word_meanings()
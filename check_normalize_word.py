@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+check_normalize_word.py - Verifies that utils.normalize_word (single str.translate
+pass) returns exactly what the original chained replace/regex implementation did,
+on every Unicode code point and on all corpus text found in the app folder.
+Exits with status 1 on any difference.
+"""
+
+import json
+import os
+import re
+import sys
+
+from utils import (resource_path, normalize_word, normalize_words, SPECIAL_WORD_MAPPINGS,
+                   QURAN_WORD_MEANINGS_FILE)
+
+_re_diacritics = re.compile(r'[\u0610-\u061A\u064B-\u0652\u0654-\u065F\u06D6-\u06ED\u0640]')
+_re_not_arabic = re.compile(r'[^\u0600-\u06FF0-9\s]')
+
+
+def reference_normalize_word(s):
+    """The original implementation, kept verbatim as the reference."""
+    if not s:
+        return ""
+    s_for_mapping = s.strip()
+    s_for_mapping = s_for_mapping.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
+    if s_for_mapping in SPECIAL_WORD_MAPPINGS:
+        s = SPECIAL_WORD_MAPPINGS[s_for_mapping]
+    s = s.replace("\u0670", "\u0627") # ٰ -> ا
+    s = _re_diacritics.sub("", s)
+    s = _re_not_arabic.sub("", s)
+    s = s.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا").replace("ٱ", "ا")
+    s = s.replace("ة", "ه")
+    s = s.replace("ى", "ي")
+    s = s.replace("ـ", "")
+    return "".join(s.split())
+
+
+def _add_text(samples, text):
+    if isinstance(text, str):
+        samples.add(text)
+        samples.update(text.split())
+        samples.update(part.strip() for seg in text.split('|') for part in seg.split(':'))
+
+
+def collect_samples():
+    samples = {chr(cp) for cp in range(0x110000) if not 0xD800 <= cp < 0xE000}
+    for key, value in SPECIAL_WORD_MAPPINGS.items():
+        samples.update([key, value, f" {key}\t", key.replace("ا", "أ"), key.replace("ا", "إ", 1), key.replace("ا", "آ")])
+
+    sources = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "quran_minified.json"),
+               resource_path(os.path.join("data", "full_mushaf_pages_with_jozz.json")),
+               QURAN_WORD_MEANINGS_FILE]
+    for path in sources:
+        if not os.path.exists(path):
+            print(f"Skipping missing {path}")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, dict):
+                stack.extend(item.values())
+            elif isinstance(item, list):
+                stack.extend(item)
+            else:
+                _add_text(samples, item)
+    return sorted(samples)
+
+
+def main():
+    samples = collect_samples()
+    mismatches = [s for s in samples if normalize_word(s) != reference_normalize_word(s)]
+    if normalize_words(samples) != [reference_normalize_word(s) for s in samples]:
+        mismatches.append("<normalize_words batch>")
+    print(f"Checked {len(samples)} strings: {len(mismatches)} mismatches.")
+    for s in mismatches[:20]:
+        print(f"  {s!r}: {normalize_word(s)!r} != {reference_normalize_word(s)!r}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,7 +6,7 @@ import sys
 # Add the parent directory to the sys.path to import utils
 script_dir = os.path.dirname(__file__)
 sys.path.append(script_dir)
-from utils import normalize_word
+from utils import normalize_corpus_word
 
 def create_quran_vocabulary(quran_data_path, output_vocab_path):
     """
@@ -40,7 +40,7 @@ def create_quran_vocabulary(quran_data_path, output_vocab_path):
         words_in_ayah = [word for word in aya_text_cleaned.split() if word]
         
         for word in words_in_ayah:
-            normalized = normalize_word(word)
+            normalized = normalize_corpus_word(word)
             if normalized: # Only add non-empty normalized words
                 unique_words.add(normalized)
     
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+info_prefetcher.py - Warms QuranInfoManager's caches around the word being shown.
+
+After WordInfoDialog shows a word, the words around it and the previous/next
+ayah's tafsir, nozool and tajweed are fetched on a small worker pool into the
+manager's word and ayah LRUs, so stepping with the navigation buttons is served
+from memory. Each prefetch() supersedes the previous one: queued work for an
+older position is skipped.
+
+    prefetcher = InfoPrefetcher(info_manager, data_manager)
+    prefetcher.prefetch(global_word_id, tafsir_source)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from quran_info_manager import WORD_DB_KEYS
+
+NEIGHBOUR_WORDS = 8  # words warmed on each side of the current one
+AYA_DB_KEYS = ("nozool", "tajweed")  # ayah databases warmed besides the selected tafsir
+
+
+class InfoPrefetcher:
+    def __init__(self, info_manager, data_manager, words=NEIGHBOUR_WORDS, workers=2):
+        self.info_manager = info_manager
+        self.data_manager = data_manager
+        self.words = words
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="info-prefetch")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._closed = False
+
+    def prefetch(self, global_id, tafsir_source=None):
+        """Warms the neighbours of global_id in the background; returns immediately."""
+        with self._lock:
+            if self._closed:
+                return
+            self._generation += 1
+            generation = self._generation
+        self._executor.submit(self._warm_words, generation, global_id)
+        self._executor.submit(self._warm_ayahs, generation, global_id, tafsir_source)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            self._generation += 1  # Queued jobs see a newer generation and return
+        self._executor.shutdown(wait=False)
+
+    def _current(self, generation):
+        return generation == self._generation
+
+    def _warm_words(self, generation, global_id):
+        global_to_db = self.data_manager.global_to_db_map
+        # Nearest words first, alternating next/previous, as the user is most likely to step there.
+        db_words = []
+        for offset in range(1, self.words + 1):
+            for g in (global_id + offset, global_id - offset):
+                if g in global_to_db:
+                    db_words.append(global_to_db[g])
+        if db_words and self._current(generation):
+            try:
+                self.info_manager.prefetch_words(db_words, WORD_DB_KEYS)
+            except Exception as e:
+                print(f"Error prefetching words around {global_id}: {e}")
+
+    def _warm_ayahs(self, generation, global_id, tafsir_source):
+        db_keys = ((tafsir_source,) if tafsir_source else ()) + AYA_DB_KEYS
+        for sura, aya in self._neighbour_ayahs(global_id):
+            for db_key in db_keys:
+                if not self._current(generation):
+                    return
+                try:
+                    self.info_manager.get_aya_data(db_key, sura, aya)
+                except Exception as e:
+                    print(f"Error prefetching {db_key} for {sura}:{aya}: {e}")
+
+    def _neighbour_ayahs(self, global_id):
+        """(sura_id, aya_id) of the next and previous ayah, as stored in the databases."""
+        global_to_db = self.data_manager.global_to_db_map
+        current = global_to_db.get(global_id)
+        if not current:
+            return []
+        here = current[:2]
+        ayahs = []
+        for step in (1, -1):
+            g = global_id + step
+            while g in global_to_db and global_to_db[g][:2] == here:
+                g += step
+            if g in global_to_db:
+                ayahs.append(global_to_db[g][:2])
+        return ayahs
@@ -1,15 +1,20 @@
 # -*- coding: utf-8 -*-
 """
 new_quran_data_manager.py - Manages loading and accessing Quran page layout data.
+
+Pages come from the shared, memory-mapped corpus (shared_corpus.py) that the main
+app maps as well, so running the viewer next to it costs almost no extra memory.
 """
 
-import json
-import os
-from new_utils import resource_path
+import shared_corpus
+from startup_cache import SnapshotCache
+from utils import MUSHAF_LAYOUT_FILE, QURAN_CORPUS_FILE
+
+AYAS_META_SNAPSHOT_VERSION = 1
 
 class QuranDataManager:
     def __init__(self):
-        self.full_page_layout_data = {}
+        self.full_page_layout_data = {} # {page_number: page}, decoded on demand from the shared corpus
         self.sura_pages = {}
         self.juz_pages = {}
         self.sura_aya_counts = {}
@@ -19,22 +24,26 @@ class QuranDataManager:
         self._build_indexes()
 
     def _load_render_data(self):
-        """Loads page layout data and populates a minimal aya list for indexing."""
-        mushaf_rendered_path = resource_path(os.path.join("data", "full_mushaf_pages_with_jozz.json"))
+        """Attaches to the shared page layout and populates a minimal aya list for indexing."""
         try:
-            if not os.path.exists(mushaf_rendered_path):
-                print(f"!!! Comprehensive mushaf layout data file not found at {mushaf_rendered_path}. Page rendering will fail.")
+            store = shared_corpus.layout_store()
+            if store is None:
                 return
+            self.full_page_layout_data = store
+            print(f"Attached to shared mushaf layout ({len(store)} pages) for rendering.")
 
-            with open(mushaf_rendered_path, 'r', encoding='utf-8') as f:
-                loaded_pages_list = json.load(f)
-            print(f"Loaded comprehensive mushaf page data for rendering from {mushaf_rendered_path}")
+            # The aya list needs every page once; keep it so later launches skip the scan.
+            snapshot = SnapshotCache("page_viewer_ayas", [MUSHAF_LAYOUT_FILE, QURAN_CORPUS_FILE],
+                                     AYAS_META_SNAPSHOT_VERSION)
+            cached = snapshot.load()
+            if cached is not None:
+                self.all_ayas_meta = cached
+                return
 
-            self.full_page_layout_data = {page['page_number']: page for page in loaded_pages_list}
-            
             # Fallback to populate aya metadata from render data for indexes
             processed_ayas = set()
-            for page_num, page_data in self.full_page_layout_data.items():
+            for page_num in sorted(self.full_page_layout_data):
+                page_data = self.full_page_layout_data[page_num]
                 for line in page_data.get('lines', []):
                     for word in line.get('words', []):
                         sura_no = word.get('surah')
@@ -48,6 +57,7 @@ class QuranDataManager:
                                 'sura_name_ar': page_data.get('sura_name_ar')
                             })
                             processed_ayas.add((sura_no, aya_no))
+            snapshot.save(self.all_ayas_meta)
 
         except Exception as e:
             print(f"Error loading render data: {e}")
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+page_layout_store.py - Page-sharded, lazily loaded mushaf layout.
+
+Pages are read one at a time from an offset-indexed source (the compiled
+corpus, or a shard file built once from full_mushaf_pages_with_jozz.json) and
+kept in a small LRU. Asking for a page warms its facing page and the next
+spread in the background, so turning pages never waits on decoding.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import file_signature, signature_matches
+
+SHARDS_MAGIC = b"QRNSHRD1"
+_SHARDS_HEADER = struct.Struct("<8sII")  # magic, source signature JSON length, page count
+_SHARD_ENTRY = struct.Struct("<IQI")     # page number, offset, length
+
+DEFAULT_CACHE_PAGES = 12
+STALE_TMP_SECONDS = 10 * 60  # a shard .tmp older than this is no longer being written
+
+
+def spread_pages(page_num):
+    """Returns the (right, left) pages of the two-page spread containing page_num."""
+    start = page_num if page_num % 2 != 0 else page_num - 1
+    return start, start + 1
+
+
+class PageShardFile:
+    """Memory-mapped shard file: an offset table followed by one compact JSON blob per page."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, sig_len, count = _SHARDS_HEADER.unpack_from(self._mm, 0)
+        if magic != SHARDS_MAGIC:
+            raise ValueError(f"Not a page shard file: {path}")
+        pos = _SHARDS_HEADER.size
+        self.source_signature = json.loads(self._mm[pos:pos + sig_len].decode('utf-8'))
+        pos += sig_len
+        self._offsets = {}
+        self.page_numbers = []
+        for i in range(count):
+            page_num, off, length = _SHARD_ENTRY.unpack_from(self._mm, pos + i * _SHARD_ENTRY.size)
+            self._offsets[page_num] = (off, length)
+            self.page_numbers.append(page_num)
+        self.page_index = self._offsets
+
+    def page(self, page_num):
+        entry = self._offsets.get(page_num)
+        if entry is None:
+            return None
+        off, length = entry
+        return json.loads(self._mm[off:off + length].decode('utf-8'))
+
+    def close(self):
+        self._mm.close()
+
+
+def _remove_stale_tmp_files(shards_path):
+    """
+    Deletes {shards_path}.<pid>.tmp files left behind by earlier builds: ones that were
+    never moved into place because the shard file was mapped elsewhere, or interrupted
+    builds. Recent ones are kept, as another process may still be writing them.
+    """
+    folder = os.path.dirname(shards_path) or '.'
+    prefix = os.path.basename(shards_path) + '.'
+    now = time.time()
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        if not (name.startswith(prefix) and name.endswith('.tmp')):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass  # Still mapped by a running instance (Windows); removed on a later start
+
+
+def build_page_shards(layout_path, shards_path):
+    """
+    Splits the layout JSON into a shard file. Returns (number of pages, path written):
+    the path is a temporary one when Windows refuses to replace a shard file that
+    another process still has mapped; this process then reads that one for this
+    session only, and the next start rebuilds, retries the replace and deletes it.
+    """
+    with open(layout_path, 'r', encoding='utf-8') as f:
+        pages = json.load(f)
+
+    blobs = []
+    for page in sorted(pages, key=lambda p: p.get('page_number', 0)):
+        blob = json.dumps(page, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        blobs.append((page['page_number'], blob))
+
+    signature = json.dumps(file_signature(layout_path)).encode('utf-8')
+    offset = _SHARDS_HEADER.size + len(signature) + _SHARD_ENTRY.size * len(blobs)
+
+    os.makedirs(os.path.dirname(shards_path), exist_ok=True)
+    _remove_stale_tmp_files(shards_path)
+    tmp_path = f"{shards_path}.{os.getpid()}.tmp" # Other processes may be building it too
+    with open(tmp_path, 'wb') as f:
+        f.write(_SHARDS_HEADER.pack(SHARDS_MAGIC, len(signature), len(blobs)))
+        f.write(signature)
+        for page_num, blob in blobs:
+            f.write(_SHARD_ENTRY.pack(page_num, offset, len(blob)))
+            offset += len(blob)
+        for _, blob in blobs:
+            f.write(blob)
+    try:
+        os.replace(tmp_path, shards_path)
+    except PermissionError:
+        print(f"Could not replace {shards_path} (in use by another instance); "
+              f"using {tmp_path} for this session, it will be replaced on the next start.")
+        return len(blobs), tmp_path
+    return len(blobs), shards_path
+
+
+def open_page_shards(layout_path, shards_path):
+    """
+    Opens the shard file for layout_path, (re)building it first if it is missing
+    or was built from a different version of the layout. Returns None if there is
+    no layout at all.
+    """
+    if os.path.exists(shards_path):
+        try:
+            shards = PageShardFile(shards_path)
+            # remember=True: a layout whose mtime changed (copy, fresh extraction) is hashed once.
+            if not os.path.exists(layout_path) or signature_matches(layout_path, shards.source_signature, remember=True):
+                return shards
+            shards.close()
+            print(f"Page shards are out of date with {layout_path}, rebuilding.")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring unreadable page shards {shards_path}: {e}")
+
+    if not os.path.exists(layout_path):
+        print(f"!!! Comprehensive mushaf layout data file not found at {layout_path}. Page rendering will fail.")
+        return None
+
+    count, built_path = build_page_shards(layout_path, shards_path)
+    print(f"Built {count} page shards from {layout_path}")
+    return PageShardFile(built_path)
+
+
+class PageLayoutStore(Mapping):
+    """
+    {page_number: page dict} mapping over a page source with a bounded LRU.
+    A source needs page(page_num) -> dict | None, page_numbers and page_index.
+    """
+
+    def __init__(self, source, max_pages=DEFAULT_CACHE_PAGES):
+        self._source = source
+        self._max_pages = max_pages
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._prefetcher = None
+
+    def __getitem__(self, page_num):
+        with self._lock:
+            page = self._cache.get(page_num)
+            if page is not None:
+                self._cache.move_to_end(page_num)
+                return page
+
+        page = self._source.page(page_num)
+        if page is None:
+            raise KeyError(page_num)
+
+        with self._lock:
+            self._cache[page_num] = page
+            while len(self._cache) > self._max_pages:
+                self._cache.popitem(last=False)
+        return page
+
+    def __iter__(self):
+        return iter(self._source.page_numbers)
+
+    def __len__(self):
+        return len(self._source.page_numbers)
+
+    def __contains__(self, page_num):
+        return page_num in self._source.page_index
+
+    def is_cached(self, page_num):
+        with self._lock:
+            return page_num in self._cache
+
+    def prefetch(self, page_num):
+        """Decodes the facing page and the next spread in the background."""
+        right, left = spread_pages(page_num)
+        wanted = [p for p in (right, left, right + 2, left + 2)
+                  if p != page_num and p in self and not self.is_cached(p)]
+        if not wanted:
+            return
+        if self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+        self._prefetcher.submit(self._warm, wanted)
+
+    def _warm(self, pages):
+        for page_num in pages:
+            try:
+                self[page_num]
+            except KeyError:
+                pass
@@ -13,6 +13,7 @@ from PyQt5.QtWidgets import QGraphicsTextItem, QMenu, QAction, QToolTip
 from PyQt5.QtWidgets import QGraphicsRectItem, QGraphicsItem, QGraphicsEllipseItem
 from PyQt5.QtCore import QObject, pyqtSignal, Qt, QRectF, QRect, QTimer
 from utils import resource_path # Import resource_path
+import startup_profiler
 import re
 
 # --- NEW: Import arabic_reshaper locally ---
@@ -154,6 +155,7 @@ class PageRenderer:
         self.border_pixmap = None
         self._word_item_map = {} # Maps global_idx to ClickableWord objects
         self._word_highlight_map = {} # Maps global_idx to highlight rectangle objects
+        self._ayah_first_word = {} # Maps "sura:aya" to the global_idx of its first rendered word
         self._page_overlay_map = {} # NEW: Maps page_num to page overlay rectangle objects
         self._page_bounds_map = {} # NEW: Maps page_num to bounding rectangle of the page
         self._current_rendered_pages = set() # To track which pages are currently rendered
@@ -296,12 +298,14 @@ class PageRenderer:
 
     def ensure_ayah_visible(self, sura, aya):
         """Ensures the first word of the specified ayah is visible."""
-        # Try to find any word belonging to this ayah in the current map
-        prefix = f"{sura}:{aya}:"
-        for key in self._word_item_map:
-            if key.startswith(prefix):
-                self.ensure_visible(key)
-                return
+        key = self._ayah_first_word.get(f"{sura}:{aya}")
+        if key:
+            self.ensure_visible(key)
+
+    def _register_word_item(self, global_idx, word_item):
+        self._word_item_map[global_idx] = word_item
+        if global_idx:
+            self._ayah_first_word.setdefault(global_idx.rsplit(':', 1)[0], global_idx)
 
     def _to_arabic_numerals(self, number: int) -> str:
         """Converts a Latin digit integer to an Arabic numeral string."""
@@ -310,6 +314,7 @@ class PageRenderer:
         arabic_str = "".join(arabic_map[int(digit)] for digit in str(number))
         return arabic_str[::-1]
 
+    @startup_profiler.profiled("PageRenderer.render_page (first)", first_only=True)
     def render_page(self, start_page_num):
         """
         Renders the specified page and the one next to it. It performs a full re-render
@@ -334,6 +339,7 @@ class PageRenderer:
             self.scene.clear()
             self._word_item_map.clear()
             self._word_highlight_map.clear()
+            self._ayah_first_word.clear()
             self._page_overlay_map.clear() # Clear overlays on full re-render
             self._merged_highlight_items.clear() # Clear merged highlights list
             self._current_rendered_pages = pages_to_render
@@ -524,7 +530,7 @@ class PageRenderer:
                     
                     word_item.setZValue(1)
                     self.scene.addItem(word_item)
-                    self._word_item_map[global_idx] = word_item
+                    self._register_word_item(global_idx, word_item)
                     
                 else:
                     # Marker (Static text)
@@ -939,7 +945,7 @@ class PageRenderer:
                 highlight_rect.setZValue(0.5)
                 self.scene.addItem(highlight_rect)
                 self._word_highlight_map[global_idx] = highlight_rect
-                self._word_item_map[global_idx] = word_item
+                self._register_word_item(global_idx, word_item)
 
             current_x -= (word_width + word_spacing)
 
@@ -1242,7 +1248,7 @@ class PageRenderer:
 
                     self.scene.addItem(highlight_rect)
                     self.scene.addItem(word_item)
-                    self._word_item_map[global_idx] = word_item
+                    self._register_word_item(global_idx, word_item)
 
                 elif item_type == 'ayah_marker' and self.main_window.show_aya_markers:
                     marker_item = QGraphicsTextItem(text_to_draw)
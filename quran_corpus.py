@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+quran_corpus.py - Compiled, memory-mapped Quran corpus.
+
+build_quran_corpus.py compiles the JSON data files into a single versioned,
+column-oriented binary file. At startup the file is memory-mapped and page
+layouts, ayas and the search dictionaries are decoded lazily on access, so
+there is no JSON parse step on launch.
+
+File layout (native byte order, sections aligned to 8 bytes):
+    header     magic, version, byte order flag, section count
+    directory  (name, offset, length) per section
+    sections   'meta' (JSON), 'strings.idx' + 'strings.dat' (string pool),
+               one column per field of each table ('<table>.<field>'),
+               'page.line_start' / 'line.word_start' offset tables and raw JSON blobs.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from utils import file_signature, signature_matches
+
+CORPUS_MAGIC = b"QRNCORP\0"
+CORPUS_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHI")   # magic, version, byte order flag, section count
+_SECTION = struct.Struct("<24sQQ")  # name, offset, length
+_ALIGN = 8
+_BYTE_ORDER_FLAG = 1 if sys.byteorder == 'little' else 2
+
+# Column kinds: 'i' int32, 'd' float64, 's' string id, 'j' JSON-encoded string id
+_TYPECODES = {'i': 'i', 'd': 'd', 's': 'I', 'j': 'I'}
+_MISSING_INT = -2 ** 31
+_MISSING_STR = 0xFFFFFFFF
+
+
+class CorpusFormatError(ValueError):
+    """Raised when a corpus file is missing, truncated or from another version."""
+
+
+def _column_kind(values):
+    """Picks the narrowest column kind that can hold every present value."""
+    kinds = set()
+    for v in values:
+        if isinstance(v, bool) or v is None:
+            return 'j'
+        if isinstance(v, int):
+            kinds.add('i' if _MISSING_INT < v < 2 ** 31 else 'j')
+        elif isinstance(v, float):
+            kinds.add('d')
+        elif isinstance(v, str):
+            kinds.add('s')
+        else:
+            return 'j'
+    if kinds <= {'i'}:
+        return 'i'
+    if kinds <= {'i', 'd'}:
+        return 'd'
+    if kinds == {'s'}:
+        return 's'
+    return 'j'
+
+
+class CorpusWriter:
+    """Collects tables, offset arrays and blobs and writes them as one corpus file."""
+
+    def __init__(self):
+        self.sections = {}
+        self.meta = {"tables": {}, "blobs": []}
+        self._strings = []
+        self._string_ids = {}
+
+    def add_string(self, text: str) -> int:
+        """Adds a string to the deduplicated pool and returns its id."""
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(text)
+            self._string_ids[text] = string_id
+        return string_id
+
+    def add_table(self, name, records):
+        """Stores a list of flat dicts as one column per key."""
+        keys = []
+        for rec in records:
+            for key in rec:
+                if key not in keys:
+                    keys.append(key)
+
+        schema = []
+        for key in keys:
+            kind = _column_kind(rec[key] for rec in records if key in rec)
+            column = array(_TYPECODES[kind])
+            for rec in records:
+                if key not in rec:
+                    column.append(_MISSING_INT if kind == 'i' else float('nan') if kind == 'd' else _MISSING_STR)
+                elif kind == 's':
+                    column.append(self.add_string(rec[key]))
+                elif kind == 'j':
+                    column.append(self.add_string(json.dumps(rec[key], ensure_ascii=False)))
+                else:
+                    column.append(rec[key])
+            self.sections[f"{name}.{key}"] = column.tobytes()
+            schema.append([key, kind])
+
+        self.meta["tables"][name] = {"size": len(records), "schema": schema}
+
+    def add_array(self, name, typecode, values):
+        self.sections[name] = array(typecode, values).tobytes()
+
+    def add_blob(self, name, raw: bytes):
+        """Stores raw JSON bytes that are only decoded when first requested."""
+        self.sections[f"blob.{name}"] = raw
+        self.meta["blobs"].append(name)
+
+    def add_sources(self, sources):
+        """Records {name: path} signatures; names are relative to the output file's directory."""
+        self.meta["sources"] = {name: file_signature(path) for name, path in sources.items()
+                                if os.path.exists(path)}
+
+    def write(self, path):
+        idx = array('I', [0])
+        pool = bytearray()
+        for text in self._strings:
+            pool += text.encode('utf-8')
+            idx.append(len(pool))
+
+        sections = dict(self.sections)
+        sections["strings.idx"] = idx.tobytes()
+        sections["strings.dat"] = bytes(pool)
+        sections["meta"] = json.dumps(self.meta, ensure_ascii=False).encode('utf-8')
+
+        names = sorted(sections)
+        offset = _HEADER.size + _SECTION.size * len(names)
+        directory = []
+        for name in names:
+            offset += -offset % _ALIGN
+            directory.append((name, offset, len(sections[name])))
+            offset += len(sections[name])
+
+        tmp_path = f"{path}.{os.getpid()}.tmp" # Readers map the final file; never expose a partial one
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, _BYTE_ORDER_FLAG, len(names)))
+            for name, off, length in directory:
+                f.write(_SECTION.pack(name.encode('ascii'), off, length))
+            for name, off, length in directory:
+                f.write(b"\0" * (off - f.tell()))
+                f.write(sections[name])
+        os.replace(tmp_path, path)
+
+
+class _CorpusTable:
+    """Column-backed table; rows are rebuilt as dicts on demand."""
+
+    def __init__(self, corpus, name):
+        info = corpus.meta["tables"].get(name, {"size": 0, "schema": []})
+        self.size = info["size"]
+        self._corpus = corpus
+        self._columns = [(key, kind, corpus.column(f"{name}.{key}", _TYPECODES[kind]))
+                         for key, kind in info["schema"]]
+
+    def __len__(self):
+        return self.size
+
+    def column(self, key):
+        for col_key, _, col in self._columns:
+            if col_key == key:
+                return col
+        return None
+
+    def row(self, i):
+        rec = {}
+        for key, kind, col in self._columns:
+            v = col[i]
+            if kind == 'i':
+                if v == _MISSING_INT:
+                    continue
+            elif kind == 'd':
+                if v != v:
+                    continue
+            else:
+                if v == _MISSING_STR:
+                    continue
+                v = self._corpus.string(v)
+                if kind == 'j':
+                    v = json.loads(v)
+            rec[key] = v
+        return rec
+
+
+class CorpusAyas(Sequence):
+    """all_ayas served from the corpus; each aya dict is decoded once and kept."""
+
+    def __init__(self, table):
+        self._table = table
+        self._rows = [None] * len(table)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        row = self._rows[i]
+        if row is None:
+            row = self._rows[i] = self._table.row(range(len(self._rows))[i])
+        return row
+
+
+class LazyCorpusBlob:
+    """
+    Attribute that is decoded from a corpus blob the first time it is read.
+    Assigning a value (e.g. after loading the JSON source) overrides it.
+    """
+
+    def __init__(self, blob_name, default_factory):
+        self.blob_name = blob_name
+        self.default_factory = default_factory
+
+    def __set_name__(self, owner, name):
+        self.attr = f"_{name}"
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.attr)
+        if value is None:
+            corpus = getattr(obj, 'corpus', None)
+            if corpus is not None and corpus.has_blob(self.blob_name):
+                value = corpus.load_json(self.blob_name)
+            else:
+                value = self.default_factory()
+            obj.__dict__[self.attr] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.attr] = value
+
+
+class CorpusFile:
+    """Read-only, memory-mapped view of any file written by CorpusWriter."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e: # Empty file
+            self._file.close()
+            raise CorpusFormatError(f"Empty corpus file: {path}") from e
+        self._view = memoryview(self._mm)
+
+        if len(self._mm) < _HEADER.size:
+            raise CorpusFormatError("Truncated corpus header")
+        magic, version, byte_order, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != CORPUS_MAGIC:
+            raise CorpusFormatError("Not a Quran corpus file")
+        if version != CORPUS_VERSION:
+            raise CorpusFormatError(f"Corpus version {version} (expected {CORPUS_VERSION})")
+        if byte_order != _BYTE_ORDER_FLAG:
+            raise CorpusFormatError("Corpus was built on a machine with a different byte order")
+
+        self._sections = {}
+        for i in range(count):
+            raw_name, off, length = _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size)
+            if off + length > len(self._mm):
+                raise CorpusFormatError("Truncated corpus section")
+            self._sections[raw_name.rstrip(b"\0").decode('ascii')] = (off, length)
+
+        self.meta = json.loads(str(self.section_bytes("meta"), 'utf-8'))
+        self._str_idx = self.column("strings.idx", 'I')
+        self._str_base = self._sections["strings.dat"][0]
+
+    # --- Raw access ---
+    def section_bytes(self, name):
+        if name not in self._sections:
+            raise CorpusFormatError(f"Missing corpus section '{name}'")
+        off, length = self._sections[name]
+        return self._view[off:off + length]
+
+    def column(self, name, typecode):
+        """Zero-copy typed view of a section."""
+        return self.section_bytes(name).cast(typecode)
+
+    def string(self, string_id):
+        start = self._str_base + self._str_idx[string_id]
+        end = self._str_base + self._str_idx[string_id + 1]
+        return str(self._mm[start:end], 'utf-8')
+
+    def has_blob(self, name):
+        return name in self.meta["blobs"]
+
+    def load_json(self, name):
+        return json.loads(str(self.section_bytes(f"blob.{name}"), 'utf-8'))
+
+    # --- Freshness ---
+    def stale_sources(self):
+        """Returns the names of source files that changed since the file was built."""
+        data_dir = os.path.dirname(os.path.abspath(self.path))
+        stale = []
+        for name, signature in self.meta.get("sources", {}).items():
+            src_path = os.path.join(data_dir, name)
+            # Missing sources are fine: a release may ship the compiled file on its own.
+            # remember=True: a source whose mtime changed is hashed once, not on every launch.
+            if os.path.exists(src_path) and not signature_matches(src_path, signature, remember=True):
+                stale.append(name)
+        return stale
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mm.close()
+        except BufferError:
+            pass # Column views still alive; the mapping is released with them.
+        self._file.close()
+
+
+class QuranCorpus(CorpusFile):
+    """The compiled Quran corpus: page layout, ayas and lazily decoded JSON blobs."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.pages = _CorpusTable(self, "page")
+        self.lines = _CorpusTable(self, "line")
+        self.words = _CorpusTable(self, "word")
+        self._page_line_start = self.column("page.line_start", 'I')
+        self._line_word_start = self.column("line.word_start", 'I')
+        page_numbers = self.pages.column("page_number")
+        self.page_numbers = list(page_numbers) if page_numbers is not None else []
+        self.page_index = {num: i for i, num in enumerate(self.page_numbers)}
+        self._ayas = None
+
+    # --- High level accessors ---
+    def page(self, page_num):
+        """Rebuilds the layout dict of one page: {page_number, ..., lines: [{words: [...]}]}."""
+        i = self.page_index.get(page_num)
+        if i is None:
+            return None
+        page = self.pages.row(i)
+        lines = []
+        for line_idx in range(self._page_line_start[i], self._page_line_start[i + 1]):
+            line = self.lines.row(line_idx)
+            line["words"] = [self.words.row(w) for w in range(self._line_word_start[line_idx],
+                                                               self._line_word_start[line_idx + 1])]
+            lines.append(line)
+        page["lines"] = lines
+        return page
+
+    def ayas(self):
+        if self._ayas is None:
+            self._ayas = CorpusAyas(_CorpusTable(self, "aya"))
+        return self._ayas
+
+
+def compile_corpus(output_path, pages, ayas, blobs, sources, extra_meta=None):
+    """
+    Writes a corpus file.
+    pages: list of layout page dicts (with 'lines' -> 'words').
+    ayas: list of aya dicts (all_ayas).
+    blobs: {name: raw JSON bytes} decoded lazily at runtime.
+    sources: {file name: path} recorded for staleness checks.
+    """
+    writer = CorpusWriter()
+    page_records, line_records, word_records = [], [], []
+    line_start, word_start = [0], [0]
+    for page in pages:
+        page_records.append({k: v for k, v in page.items() if k != 'lines'})
+        for line in page.get('lines', []):
+            if not isinstance(line, dict):
+                continue
+            line_records.append({k: v for k, v in line.items() if k != 'words'})
+            word_records.extend(line.get('words', []))
+            word_start.append(len(word_records))
+        line_start.append(len(line_records))
+
+    writer.add_table("page", page_records)
+    writer.add_table("line", line_records)
+    writer.add_table("word", word_records)
+    writer.add_array("page.line_start", 'I', line_start)
+    writer.add_array("line.word_start", 'I', word_start)
+    writer.add_table("aya", list(ayas))
+    for name, raw in blobs.items():
+        writer.add_blob(name, raw)
+
+    writer.add_sources(sources)
+    writer.meta.update(extra_meta or {})
+    writer.write(output_path)
+    return len(page_records), len(word_records), len(writer._strings)
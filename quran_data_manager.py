@@ -5,34 +5,69 @@ quran_data_manager.py - Manages loading, processing, and accessing Quran data.
 
 import json
 import os
-import requests
-import xml.etree.ElementTree as ET
 from typing import Optional, List, Tuple
 from utils import (resource_path, QURAN_DATA_FILE, MINI_WORDS_DICT_FULL_FILE,
-                   normalize_word, calculate_similarity, MINI_AYA_DICT_NOSH_FILE,
-                   QURAN_TEXT_BY_PAGE_FILE, QURAN_META_FILE, SURAH_NAMES, QURAN_WORD_MEANINGS_FILE)
+                   normalize_word, normalize_corpus_word, calculate_similarity, MINI_AYA_DICT_NOSH_FILE,
+                   QURAN_TEXT_BY_PAGE_FILE, QURAN_META_FILE, SURAH_NAMES, QURAN_WORD_MEANINGS_FILE,
+                   QURAN_CORPUS_FILE, QURAN_WORD_MEANINGS_INDEX_FILE, MUSHAF_LAYOUT_FILE)
 import re
 from word_meaning_manager import WordMeaningManager
+from quran_corpus import CorpusFormatError, LazyCorpusBlob
+from startup_cache import SnapshotCache
+from page_layout_store import PageLayoutStore
+import shared_corpus
+from staged_loader import StagedLoader
+import startup_profiler
+from word_meanings_index import WordMeaningsIndex, parse_meaning_phrases, align_word_meanings
+from word_table import WordTable
+from ayah_index import AyahIndex
+from recitation_ranges import RecitationStream, RangeEngine
+from verse_search import VerseSearchIndex
+
+CONSOLIDATED_PAGES_FILE = resource_path(os.path.join("data", "consolidated_quran_pages.json"))
+WORD_RASM_DB_FILE = resource_path(os.path.join("data", "sqlite", "word-wordrasm.sqlite"))
+
+# Bump when the code building any of the snapshot attributes changes.
+INDEX_SNAPSHOT_VERSION = 5
 
 class QuranDataManager:
-    def __init__(self):
+    # Decoded from the compiled corpus on first access (see quran_corpus.py)
+    aya_dict_nosh = LazyCorpusBlob("aya_dict_nosh", dict)
+    words_dict_full = LazyCorpusBlob("words_dict_full", list)
+    page_text_map = LazyCorpusBlob("page_text_map", dict)
+
+    # Derived structures persisted by the startup snapshot.
+    SNAPSHOT_ATTRS = (
+        "all_ayas", "sura_names_map", "juz_start_map", "rub_start_map", "sura_juz_info", "current_rub",
+        "word_table", "recitation_stream", "verse_index", "word_meanings_map", "pages_by_number", "sura_pages", "juz_pages", "page_to_juz", "sura_aya_counts",
+    )
+
+    @startup_profiler.profiled("QuranDataManager.__init__")
+    def __init__(self, use_corpus=True, background=False):
+        """
+        use_corpus: serve data from the compiled corpus when it is available and up to date.
+        background: return immediately and keep loading on worker threads (see ready);
+                    by default the constructor blocks until everything is loaded.
+        """
+        self.corpus = shared_corpus.corpus() if use_corpus else None # mmap'd, shared with other processes
         self.all_ayas = []
-        self.aya_dict_nosh = {} # Initialize
-        self.words_dict_full = [] # Initialize
+        self.aya_dict_nosh = None # Initialize (lazy when served from the corpus)
+        self.words_dict_full = None # Initialize (lazy when served from the corpus)
         self.full_page_layout_data = {} # To store page layout with coordinates for rendering
         self.all_mushaf_words_flat = [] # NEW: Initialize all_mushaf_words_flat
         self.word_meanings_map = {} # NEW: For word meanings
+        self.word_meanings_index = None # Precomputed alignment (build_word_meanings.py)
         
         # Initialize WordMeaningManager for the new DB
-        db_path = resource_path(os.path.join("data", "sqlite", "word-wordrasm.sqlite"))
-        self.word_meaning_manager = WordMeaningManager(db_path)
-        self.page_text_map = {} # NEW: لتخزين بيانات الملف الجديد
+        self.word_meaning_manager = WordMeaningManager(WORD_RASM_DB_FILE)
+        self.page_text_map = None # NEW: لتخزين بيانات الملف الجديد
         self.titles_map = {} # NEW: Store titles map for renderer access
         
         # --- NEW: ID Mappings for Info Box ---
         self.local_to_global_map = {}
         self.global_to_db_map = {}
         self.global_to_local_map = {}
+        self.word_table = None # Compact per-word columns; the four maps above become views over it
 
         # --- NEW: Metadata Maps ---
         self.sura_names_map = {}
@@ -43,18 +78,156 @@ class QuranDataManager:
         self.pages_by_number = {}
         self.sura_pages = {}
         self.juz_pages = {}
+        self.page_to_juz = {}
         self.sura_aya_counts = {}
         self.sura_juz_info = {} 
         self.current_rub = 1 
         self.all_words_ordered = []
+        self.ayah_index = None # (sura, aya) / ordinal / sura / word-range lookups over all_ayas
+        self.recitation_stream = None # Recitation word stream with normalized text (recitation_ranges.py)
+        self.range_engine = None # Unit and recitation range resolution over the two above
+        self.verse_index = None # Trigram index for find_verse_by_text (verse_search.py)
         self.word_to_global_idx = {}
 
-        self._load_metadata_from_xml() # تحميل البيانات من ملف XML
+        # --- Staged loading: independent sources load in parallel on a worker pool ---
+        # Artefacts: 'layout', 'ayas' (text + indexes), 'titles' (SQLite titles/ID maps),
+        # 'words' (word_table, recitation_stream), 'index' (ayah_index, range_engine),
+        # 'verses' (verse_index), 'meanings' and 'search'. See ready / when_ready / wait_until_ready.
+        self.loader = StagedLoader(name="QuranDataManager")
+        self.ready = self.loader.futures
+
+        # --- Startup snapshot of everything derived below ---
+        self._index_snapshot = SnapshotCache("quran_indexes", self._snapshot_sources(), INDEX_SNAPSHOT_VERSION)
+        with startup_profiler.span("QuranDataManager.snapshot_load"):
+            snapshot = self._index_snapshot.load()
+
+        self.loader.add("layout", self._load_layout)
+        if snapshot:
+            with startup_profiler.span("QuranDataManager.snapshot_restore"):
+                self._restore_snapshot(snapshot)
+            for name in ("metadata", "ayas", "titles", "words", "verses"):
+                self.loader.add_done(name)
+            self.loader.add("meanings", self._open_word_meanings_index)
+        else:
+            self.loader.add("metadata", self._load_metadata_from_xml) # تحميل البيانات من ملف XML
+            self.loader.add("titles", self._load_titles_and_mappings)
+            self.loader.add("ayas", self._load_ayas, deps=("metadata", "layout"))
+            self.loader.add("words", self._build_word_table, deps=("titles", "layout"))
+            self.loader.add("meanings", self._load_word_meanings, deps=("layout",)) # NEW
+            self.loader.add("verses", self._build_verse_index, deps=("ayas",))
+            self.loader.add("snapshot", self._save_snapshot, deps=("ayas", "words", "verses", "meanings"))
+        self.loader.add("index", self._build_ayah_index, deps=("ayas", "words"))
+        self.loader.add("search", self._load_search_data)
+        self.loader.shutdown_when_done()
+
+        if not background:
+            self.wait_until_ready()
+
+    # --- Readiness API ---
+    def is_ready(self, artefact):
+        future = self.ready.get(artefact)
+        return future is not None and future.done()
+
+    def when_ready(self, artefact, callback):
+        """
+        Calls callback() once the artefact has loaded. The callback runs on a loader
+        thread (or immediately if already loaded); UI code should emit a Qt signal from it.
+        """
+        self.ready[artefact].add_done_callback(lambda _future: callback())
+
+    def wait_until_ready(self, *artefacts, timeout=None):
+        """Blocks until the given artefacts (default: all) are loaded. Returns True on success."""
+        return self.loader.wait(list(artefacts) or None, timeout=timeout)
+
+    # --- Loading stages ---
+    def _load_layout(self):
+        self.full_page_layout_data = self._open_layout_store() or {}
+
+    def _load_titles_and_mappings(self):
+        """Loads word titles and local/global ID mappings from the word-rasm SQLite DB."""
+        (self.titles_map, self.local_to_global_map,
+         self.global_to_db_map, self.global_to_local_map) = self.word_meaning_manager.load_all()
+
+    def _build_word_table(self):
+        """
+        Builds the per-word structures in one pass over the layout: the recitation word
+        stream, and the WordTable packing the titles and ID maps with layout page/line/text.
+        """
+        pages = [self.full_page_layout_data[p] for p in sorted(self.full_page_layout_data)]
+        if pages:
+            self.recitation_stream = RecitationStream(pages)
+        if not self.global_to_db_map:
+            return
+        self._use_word_table(WordTable.build(pages, self.global_to_db_map, self.global_to_local_map, self.titles_map))
+        print(f"Built word table for {len(self.word_table)} words.")
+
+    def _build_verse_index(self):
+        if self.all_ayas:
+            self.verse_index = VerseSearchIndex(self.all_ayas)
+
+    def _build_ayah_index(self):
+        if self.all_ayas:
+            self.ayah_index = AyahIndex(self.all_ayas, self.word_table)
+            self.range_engine = RangeEngine(self.ayah_index, self.recitation_stream)
+
+    def _use_word_table(self, table):
+        """Replaces the per-word dict maps with read-only views over the table."""
+        self.word_table = table
+        self.titles_map = table.titles_view()
+        self.local_to_global_map = table.local_to_global_view()
+        self.global_to_db_map = table.global_to_db_view()
+        self.global_to_local_map = table.global_to_local_view()
+
+    def _load_ayas(self):
+        """Populates all_ayas (corpus, consolidated JSON or layout fallback) and builds the indexes."""
+        if self.corpus:
+            self.all_ayas = self.corpus.ayas()
+            # JSON object keys are strings; sura numbers are ints everywhere else.
+            self.sura_juz_info = {int(k): v for k, v in self.corpus.meta.get("sura_juz_info", {}).items()}
+            print(f"Mapped {len(self.all_ayas)} ayas from compiled corpus.")
+        else:
+            self._load_text_data()
+            if not self.all_ayas:
+                self._populate_ayas_from_layout()
+
+        if self.all_ayas:
+            self._build_indexes()
 
-        self._load_quran_data()
-        self._load_word_meanings() # NEW
+    def _load_search_data(self):
+        """Search dictionaries and page text; served lazily when the corpus is used."""
+        if not self.corpus:
+            self._load_page_text()
+            self._load_search_dicts()
 
-        # Load dictionaries for find_verse_by_text
+    def _save_snapshot(self):
+        if self.all_ayas:
+            self._index_snapshot.save(self._snapshot_state())
+
+    def _snapshot_sources(self):
+        """Files the snapshot attributes are derived from."""
+        sources = [QURAN_META_FILE, CONSOLIDATED_PAGES_FILE, MUSHAF_LAYOUT_FILE,
+                   QURAN_WORD_MEANINGS_FILE, QURAN_WORD_MEANINGS_INDEX_FILE, WORD_RASM_DB_FILE]
+        if self.corpus:
+            sources.append(QURAN_CORPUS_FILE)
+        return sources
+
+    def _snapshot_state(self):
+        state = {name: getattr(self, name) for name in self.SNAPSHOT_ATTRS}
+        # Corpus-backed ayas are a lazy view over the mmap; pickle the decoded dicts
+        # (pages_by_number refers to the same objects, so they are stored once).
+        state["all_ayas"] = list(self.all_ayas)
+        return state
+
+    def _restore_snapshot(self, snapshot):
+        for name in self.SNAPSHOT_ATTRS:
+            if name in snapshot:
+                setattr(self, name, snapshot[name])
+        if self.word_table is not None:
+            self._use_word_table(self.word_table)
+        print(f"Restored {len(self.all_ayas)} ayas and derived indexes from startup snapshot.")
+
+    def _load_search_dicts(self):
+        """Loads dictionaries for find_verse_by_text."""
         try:
             with open(MINI_AYA_DICT_NOSH_FILE, 'r', encoding='utf-8') as f:
                 self.aya_dict_nosh = json.load(f)
@@ -72,134 +245,54 @@ class QuranDataManager:
             print(f"!!! Error: {MINI_WORDS_DICT_FULL_FILE} not found. Find verse by text (sequential match) will not work.")
         except json.JSONDecodeError as e:
             print(f"!!! Error decoding {MINI_WORDS_DICT_FULL_FILE}: {e}. Find verse by text (sequential match) will not work.")
-        
-        if self.all_ayas:
-            self._build_indexes()
+
+    def _open_word_meanings_index(self):
+        """Opens the precomputed alignment from build_word_meanings.py if it is up to date."""
+        self.word_meanings_index = None
+        if not os.path.exists(QURAN_WORD_MEANINGS_INDEX_FILE):
+            return False
+        try:
+            index = WordMeaningsIndex(QURAN_WORD_MEANINGS_INDEX_FILE)
+        except (OSError, CorpusFormatError) as e:
+            print(f"!!! Could not open word meanings index {QURAN_WORD_MEANINGS_INDEX_FILE}: {e}")
+            return False
+        stale = index.stale_sources()
+        if stale:
+            print(f"Word meanings index is out of date ({', '.join(stale)} changed); re-run build_word_meanings.py.")
+            index.close()
+            return False
+        self.word_meanings_index = index
+        print(f"Loaded {len(index)} precomputed word meanings from {QURAN_WORD_MEANINGS_INDEX_FILE}")
+        return True
 
     def _load_word_meanings(self):
-        """Loads word meanings from the new JSON format."""
+        """Loads word meanings from the precomputed index, or aligns the JSON phrases at runtime."""
         self.word_meanings_map = {}
+        if self._open_word_meanings_index():
+            return
         
-        if not os.path.exists(QURAN_WORD_MEANINGS_FILE):
+        from_corpus = self.corpus is not None and self.corpus.has_blob("word_meanings")
+        if not from_corpus and not os.path.exists(QURAN_WORD_MEANINGS_FILE):
             print(f"Meanings file not found: {QURAN_WORD_MEANINGS_FILE}")
             return
 
         try:
-            with open(QURAN_WORD_MEANINGS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if from_corpus:
+                data = self.corpus.load_json("word_meanings")
+            else:
+                with open(QURAN_WORD_MEANINGS_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
             
-            # 1. Parse the loaded data into a structured lookup
             # Key: (sura, aya), Value: List of (phrase_norm, meaning)
-            temp_meanings = {}
-            for key, value in data.items():
-                try:
-                    if ':' not in key: continue
-                    sura_str, aya_str = key.split(':')
-                    sura, aya = int(sura_str), int(aya_str)
-                    
-                    # Value format: "word: meaning | word2: meaning2"
-                    segments = value.split('|')
-                    for seg in segments:
-                        if ':' in seg:
-                            w, m = seg.split(':', 1)
-                            w_norm = normalize_word(w.strip())
-                            if w_norm: # Ensure not empty
-                                if (sura, aya) not in temp_meanings:
-                                    temp_meanings[(sura, aya)] = []
-                                temp_meanings[(sura, aya)].append((w_norm, m.strip()))
-                except ValueError:
-                    continue
-
-            # 2. Map to global word IDs using layout data with improved matching logic
-            for page_num, page_data in self.full_page_layout_data.items():
-                page_words = [word for line in page_data.get('lines', []) for word in line.get('words', [])]
-                
-                i = 0
-                while i < len(page_words):
-                    word_processed_count = 0
-                    word = page_words[i]
-                    sura = word.get('surah')
-                    aya = word.get('ayah')
-                    
-                    if not sura or not aya:
-                        i += 1
-                        continue
-
-                    try:
-                        sura_int, aya_int = int(sura), int(aya)
-                    except (ValueError, TypeError):
-                        i += 1
-                        continue
-
-                    current_word_norm = normalize_word(word.get('text', ''))
-
-                    # --- Pass 1: Strict multi-word phrase matching ---
-                    if current_word_norm and (sura_int, aya_int) in temp_meanings:
-                        for phrase, meaning in temp_meanings.get((sura_int, aya_int), []):
-                            if phrase.startswith(current_word_norm):
-                                remaining_phrase = phrase[len(current_word_norm):]
-                                
-                                # If it's a perfect match for a single-word phrase
-                                if not remaining_phrase:
-                                    w_id = word.get('word')
-                                    if w_id is not None:
-                                        self.word_meanings_map[(sura_int, aya_int, int(w_id))] = meaning
-                                        word_processed_count = 1
-                                        break
-
-                                # Attempt to greedily match subsequent words for multi-word phrase
-                                consumed_words = 1
-                                temp_idx = i + 1
-                                while remaining_phrase and temp_idx < len(page_words):
-                                    next_word_text = page_words[temp_idx].get('text', '')
-                                    next_word_norm = normalize_word(next_word_text)
-                                    if not next_word_norm: # Skip empty normalized words (like formatting)
-                                        temp_idx += 1
-                                        consumed_words +=1
-                                        continue
-
-                                    if remaining_phrase.startswith(next_word_norm):
-                                        remaining_phrase = remaining_phrase[len(next_word_norm):]
-                                        consumed_words += 1
-                                        temp_idx += 1
-                                    else:
-                                        break
-                                
-                                if not remaining_phrase: # Full multi-word phrase matched
-                                    for j in range(consumed_words):
-                                        w = page_words[i+j]
-                                        w_id = w.get('word')
-                                        if w_id is not None:
-                                            self.word_meanings_map[(int(w.get('surah')), int(w.get('ayah')), int(w_id))] = meaning
-                                    word_processed_count = consumed_words
-                                    break
-                    
-                    if word_processed_count > 0:
-                        i += word_processed_count
-                        continue
-
-                    # --- Pass 2: Lenient fallback for words not part of a successful strict match ---
-                    if current_word_norm and (sura_int, aya_int) in temp_meanings:
-                        word_id = word.get('word')
-                        if word_id is not None:
-                            for phrase, meaning in temp_meanings.get((sura_int, aya_int), []):
-                                # Check if the dictionary phrase is IN the Quranic word (handles prefixes like و, ف)
-                                if phrase in current_word_norm:
-                                    self.word_meanings_map[(sura_int, aya_int, int(word_id))] = meaning
-                                    break
-                    
-                    i += 1 # Move to the next word if no match was found
-
+            phrases = parse_meaning_phrases(data)
+            self.word_meanings_map = align_word_meanings(self.full_page_layout_data.values(), phrases)
             print(f"Loaded and mapped {len(self.word_meanings_map)} word meanings from new JSON.")
 
         except Exception as e:
             print(f"Error loading word meanings: {e}")
 
-    def _load_quran_data(self):
-        """Loads both text data and rendering data from their respective files."""
-        self._load_text_data()
-        
-        # --- NEW: Load the simple text by page file ---
+    def _load_page_text(self):
+        """Loads the simple text by page file."""
         try:
             if os.path.exists(QURAN_TEXT_BY_PAGE_FILE):
                 with open(QURAN_TEXT_BY_PAGE_FILE, 'r', encoding='utf-8') as f:
@@ -209,12 +302,10 @@ class QuranDataManager:
                 print(f"Simple page text file not found at {QURAN_TEXT_BY_PAGE_FILE}")
         except Exception as e:
             print(f"Error loading simple page text: {e}")
-            
-        self._load_render_data()
 
     def _load_text_data(self):
         """Loads Quran text from the consolidated JSON file to populate all_ayas."""
-        consolidated_path = resource_path(os.path.join("data", "consolidated_quran_pages.json"))
+        consolidated_path = CONSOLIDATED_PAGES_FILE
         try:
             if not os.path.exists(consolidated_path):
                 print(f"!!! Consolidated data file not found at {consolidated_path}. Text search might not be optimal.")
@@ -290,93 +381,80 @@ class QuranDataManager:
         except Exception as e:
             print(f"Error loading consolidated text data: {e}")
 
-    def _load_render_data(self):
-        """Loads page layout data with coordinates for rendering."""
-        mushaf_rendered_path = resource_path(os.path.join("data", "full_mushaf_pages_with_jozz.json"))
-        try:
-            if not os.path.exists(mushaf_rendered_path):
-                print(f"!!! Comprehensive mushaf layout data file not found at {mushaf_rendered_path}. Page rendering will fail.")
-                return
-
-            with open(mushaf_rendered_path, 'r', encoding='utf-8') as f:
-                loaded_pages_list = json.load(f)
-            print(f"Loaded comprehensive mushaf page data for rendering from {mushaf_rendered_path}")
+    def _open_layout_store(self):
+        """
+        Opens the page layout as a lazily loaded {page_number: page} mapping backed by the
+        compiled corpus or by page shards of the layout JSON. Returns None if unavailable.
+        """
+        source = self.corpus if self.corpus else shared_corpus.page_shards()
+        if source is None:
+            return None
+        print(f"Opened page-sharded layout ({len(source.page_numbers)} pages) for rendering.")
+        return PageLayoutStore(source)
 
-            # --- NEW: Replace word text with titles from SQLite DB ---
-            # Load all titles once for performance
-            self.titles_map = self.word_meaning_manager.load_all_word_titles()
+    def _populate_ayas_from_layout(self):
+        """Fallback: builds all_ayas from the render (layout) data when the text data is missing."""
+        try:
+            print("Fallback: Populating ayas from render data.")
+            current_aya_words = []
+            current_sura_name = ""
             
-            # --- NEW: Load ID Mappings ---
-            self.local_to_global_map, self.global_to_db_map, self.global_to_local_map = self.word_meaning_manager.load_id_mappings()
-
-            # Convert the list of pages into a dictionary indexed by page_number for O(1) lookup
-            self.full_page_layout_data = {page['page_number']: page for page in loaded_pages_list}
-
-            # [OPTIMIZATION] DISABLED: This populates a very large list in memory at startup.
-            # self._build_all_mushaf_words_flat()
-
-            # If all_ayas is empty after trying to load text data, populate it from here as a fallback.
-            if not self.all_ayas:
-                print("Fallback: Populating ayas from render data.")
-                current_aya_words = []
-                current_sura_name = ""
-                
-                # Helper to flush current_aya_words into self.all_ayas
-                def flush_aya_data(sura_no, aya_no, page_no, juz_no):
-                    nonlocal current_aya_words
-                    if current_aya_words:
-                        aya_text = " ".join([w['text'] for w in current_aya_words])
-                        
-                        # Fallback for missing sura name
-                        sura_name = SURAH_NAMES[sura_no - 1] if 1 <= sura_no <= 114 else f"سورة {sura_no}"
+            # Helper to flush current_aya_words into self.all_ayas
+            def flush_aya_data(sura_no, aya_no, page_no, juz_no):
+                nonlocal current_aya_words
+                if current_aya_words:
+                    aya_text = " ".join([w['text'] for w in current_aya_words])
+                    
+                    # Fallback for missing sura name
+                    sura_name = SURAH_NAMES[sura_no - 1] if 1 <= sura_no <= 114 else f"سورة {sura_no}"
 
-                        # تحديد الربع والحزب (Fallback Logic)
-                        if (sura_no, aya_no) in self.rub_start_map:
-                            self.current_rub = self.rub_start_map[(sura_no, aya_no)]
-                        hizb_quarter = self.current_rub
+                    # تحديد الربع والحزب (Fallback Logic)
+                    if (sura_no, aya_no) in self.rub_start_map:
+                        self.current_rub = self.rub_start_map[(sura_no, aya_no)]
+                    hizb_quarter = self.current_rub
+                    
+                    self.all_ayas.append({
+                        "sura_no": sura_no,
+                        "aya_no": aya_no,
+                        "page": page_no,
+                        "juz": juz_no,
+                        "hizb_quarter": hizb_quarter, # Ensure this is set!
+                        "sura_name_ar": sura_name, # Use correct name
+                        "aya_text": aya_text,
+                        "aya_text_emlaey": aya_text, # Assuming similar for now
+                    })
+                    current_aya_words = []
+
+            for page_number, page_data in self.full_page_layout_data.items():
+                page_number = page_data.get('page_number')
+                for line_data in page_data.get('lines', []):
+                    for word_data in line_data.get('words', []):
+                        word_sura = word_data.get('surah')
+                        word_aya = word_data.get('ayah')
+                        word_juz = word_data.get('juz') # Assuming juz is available at word level or can be inferred from page
                         
-                        self.all_ayas.append({
-                            "sura_no": sura_no,
-                            "aya_no": aya_no,
-                            "page": page_no,
-                            "juz": juz_no,
-                            "hizb_quarter": hizb_quarter, # Ensure this is set!
-                            "sura_name_ar": sura_name, # Use correct name
-                            "aya_text": aya_text,
-                            "aya_text_emlaey": aya_text, # Assuming similar for now
-                        })
-                        current_aya_words = []
-
-                for page_number, page_data in self.full_page_layout_data.items():
-                    page_number = page_data.get('page_number')
-                    for line_data in page_data.get('lines', []):
-                        for word_data in line_data.get('words', []):
-                            word_sura = word_data.get('surah')
-                            word_aya = word_data.get('ayah')
-                            word_juz = word_data.get('juz') # Assuming juz is available at word level or can be inferred from page
-                            
-                            if not current_aya_words:
-                                current_aya_words.append(word_data)
-                            elif word_sura == current_aya_words[0].get('surah') and word_aya == current_aya_words[0].get('ayah'):
-                                current_aya_words.append(word_data)
-                            else:
-                                flush_aya_data(
-                                    current_aya_words[0].get('surah'),
-                                    current_aya_words[0].get('ayah'),
-                                    page_number,
-                                    current_aya_words[0].get('juz', word_juz)
-                                )
-                                current_aya_words.append(word_data)
-
-                # Flush any remaining aya data after loop
-                if current_aya_words:
-                    flush_aya_data(
-                        current_aya_words[0].get('surah'),
-                        current_aya_words[0].get('ayah'),
-                        page_number, # Fixed argument
-                        current_aya_words[0].get('juz')
-                    )
-                print(f"Populated {len(self.all_ayas)} ayas from fallback render data.")
+                        if not current_aya_words:
+                            current_aya_words.append(word_data)
+                        elif word_sura == current_aya_words[0].get('surah') and word_aya == current_aya_words[0].get('ayah'):
+                            current_aya_words.append(word_data)
+                        else:
+                            flush_aya_data(
+                                current_aya_words[0].get('surah'),
+                                current_aya_words[0].get('ayah'),
+                                page_number,
+                                current_aya_words[0].get('juz', word_juz)
+                            )
+                            current_aya_words.append(word_data)
+
+            # Flush any remaining aya data after loop
+            if current_aya_words:
+                flush_aya_data(
+                    current_aya_words[0].get('surah'),
+                    current_aya_words[0].get('ayah'),
+                    page_number, # Fixed argument
+                    current_aya_words[0].get('juz')
+                )
+            print(f"Populated {len(self.all_ayas)} ayas from fallback render data.")
 
 
         except Exception as e:
@@ -415,6 +493,7 @@ class QuranDataManager:
         # 1. Try loading from XML file first
         if os.path.exists(QURAN_META_FILE):
             try:
+                import xml.etree.ElementTree as ET # Only the cold (no snapshot) path parses the XML
                 tree = ET.parse(QURAN_META_FILE)
                 root = tree.getroot()
 
@@ -556,9 +635,11 @@ class QuranDataManager:
     def get_page_layout(self, page_num):
         """
         Gets the layout information (lines, words with coordinates) for a given page number
-        from the pre-loaded full mushaf data.
+        from the page-sharded layout store, and warms the facing page and next spread.
         """
         page_data = self.full_page_layout_data.get(page_num)
+        if isinstance(self.full_page_layout_data, PageLayoutStore):
+            self.full_page_layout_data.prefetch(page_num)
         if page_data and isinstance(page_data, dict):
             all_words_by_line = []
             for line_object in page_data.get('lines', []):
@@ -569,6 +650,11 @@ class QuranDataManager:
 
     def get_sura_name(self, sura_no):
         """Gets the Arabic name of a sura by its number."""
+        if self.ayah_index is not None:
+            first_aya = self.ayah_index.sura(sura_no)
+            if first_aya is not None:
+                return first_aya.get('sura_name_ar', f"سورة رقم {sura_no}")
+            return f"سورة رقم {sura_no}"
         for aya in self.all_ayas:
             if aya.get('sura_no') == sura_no:
                 return aya.get('sura_name_ar', f"سورة رقم {sura_no}")
@@ -576,7 +662,10 @@ class QuranDataManager:
 
     def get_ayah_text(self, sura_no, aya_no):
         """Gets the full text of a single ayah."""
-        # This is not the most efficient way, but it's fine for this specific use case.
+        if self.ayah_index is not None:
+            aya = self.ayah_index.get(sura_no, aya_no)
+            return aya.get('aya_text_emlaey', '') if aya is not None else ""
+        # Index not built yet (background loading): linear scan.
         for aya in self.all_ayas:
             if aya.get('sura_no') == sura_no and aya.get('aya_no') == aya_no:
                 return aya.get('aya_text_emlaey', '')
@@ -607,6 +696,8 @@ class QuranDataManager:
             return None
         try:
             sura, aya, word_id = map(int, global_idx.split(':'))
+            if self.word_meanings_index is not None:
+                return self.word_meanings_index.meaning(self.local_to_global_map.get((sura, aya, word_id)))
             return self.word_meanings_map.get((sura, aya, word_id))
         except (ValueError, KeyError):
             return None
@@ -638,6 +729,9 @@ class QuranDataManager:
 
     def build_recitation_range(self, from_sura, from_aya, to_sura, to_aya):
         """Builds the list of words and their context for a given recitation range."""
+        if self.range_engine is not None and self.range_engine.stream is not None:
+            return self.range_engine.words_between(from_sura, from_aya, to_sura, to_aya)
+
         recitation_range_words = []
         word_page_map = []
         collecting = False
@@ -672,7 +766,7 @@ class QuranDataManager:
                         # Add word to lists
                         original_text = text
                         # The normalization now happens here, just-in-time.
-                        normalized_text = normalize_word(original_text)
+                        normalized_text = normalize_corpus_word(original_text)
                         page_for_aya = page_number
 
                         recitation_range_words.append((original_text, normalized_text))
@@ -680,11 +774,17 @@ class QuranDataManager:
 
         return recitation_range_words, word_page_map
 
-    def find_verse_by_text(self, text: str):
+    def find_verse_by_text(self, text: str, fuzzy: bool = False, top_k: int = 10):
         """
         Finds all verses containing the given text snippet.
         The search is done by checking if the normalized input text is a substring of
-        the normalized verse text, making it robust for partial matches.
+        the normalized verse text, making it robust for partial matches. Once the trigram
+        index is built, results are ranked by how much of the verse the query covers.
+
+        fuzzy: tolerate spelling slips and noisy ASR text; returns the top_k closest ayat
+               (same result schema, similarity being the fuzzy score). If the verse index
+               could not be built, a warning is printed and the exact search is used
+               (still capped at top_k).
         """
         if not text or not self.all_ayas:
             return []
@@ -694,6 +794,24 @@ class QuranDataManager:
         if not normalized_input:
             return []
 
+        if fuzzy and self.verse_index is None:
+            self.wait_until_ready("verses")
+            if self.verse_index is None:
+                # The verses stage failed; fall back to the exact search rather than return nothing.
+                print(f"Warning: fuzzy search is unavailable (verse index not built); "
+                      f"using exact substring search for '{text}'.")
+        if self.verse_index is not None:
+            if fuzzy:
+                results = self.verse_index.fuzzy_search(text, top_k)
+            else:
+                results = self.verse_index.search(normalized_input)
+            matches = [self._verse_match(ordinal, similarity) for ordinal, similarity in results]
+            if matches:
+                print(f"Found {len(matches)} match(es) for '{text}'.")
+            else:
+                print(f"No {'fuzzy' if fuzzy else 'substring'} match found for '{text}'.")
+            return matches
+
         matches = []
         found_verses = set()  # To avoid duplicate verses in the results
 
@@ -732,7 +850,9 @@ class QuranDataManager:
         # Sort matches by the length of the matched text, descending.
         # Longer matches are generally more specific and likely what the user wants.
         matches.sort(key=lambda x: len(x['text']), reverse=True)
-        
+        if fuzzy:
+            matches = matches[:top_k]  # Fuzzy fallback: keep the result size the caller asked for
+
         if matches:
             print(f"Found {len(matches)} match(es) for '{text}'.")
         else:
@@ -740,12 +860,46 @@ class QuranDataManager:
             
         return matches
 
+    def iter_find_verse_by_text(self, text: str, fuzzy: bool = False, limit: int = 20, token=None):
+        """
+        Streaming find_verse_by_text for type-ahead: yields the ranked results found so far
+        (at most limit, same schema) as the search progresses. Pass a
+        verse_search.CancellationToken and cancel it to abandon a stale query; the generator
+        then stops at its next chunk. Blocks until the verse index is loaded.
+        """
+        if not text or not normalize_word(text):
+            return
+        self.wait_until_ready("verses")
+        if self.verse_index is None:
+            return
+        if fuzzy:
+            partials = self.verse_index.iter_fuzzy_search(text, limit, token)
+        else:
+            partials = self.verse_index.iter_search(normalize_word(text), limit, token)
+        for results in partials:
+            yield [self._verse_match(ordinal, similarity) for ordinal, similarity in results]
+
+    def _verse_match(self, ordinal, similarity):
+        """Search result dict for the aya at ordinal in all_ayas."""
+        aya_info = self.all_ayas[ordinal]
+        return {
+            "sura_no": aya_info.get("sura_no"),
+            "aya_no": aya_info.get("aya_no"),
+            "page_no": aya_info.get("page"),
+            "sura_name": aya_info.get("sura_name_ar"),
+            "similarity": similarity,
+            "text": aya_info.get("aya_text_emlaey", "")
+        }
+
     def get_range_for_unit(self, unit_type, unit_value):
         """
         Returns (start_sura, start_aya, end_sura, end_aya) for a given unit.
-        unit_type: 'juz', 'hizb', 'rub'
+        unit_type: 'juz', 'hizb', 'rub' ('page' and 'sura' too once the range engine is built)
         unit_value: integer value of the unit
         """
+        if self.range_engine is not None:
+            return self.range_engine.unit_range(unit_type, unit_value)
+
         start_aya = None
         end_aya = None
         
@@ -780,6 +934,11 @@ class QuranDataManager:
         if not self.all_ayas:
             print("DEBUG HIGHLIGHT: self.all_ayas is empty in get_all_ayats_in_range.")
             return []
+
+        if self.range_engine is not None:
+            all_ayats_in_range = self.range_engine.ayahs_between(start_sura_aya, end_sura_aya)
+            print(f"DEBUG HIGHLIGHT: Found {len(all_ayats_in_range)} ayahs in range {start_sura_aya} to {end_sura_aya}.")
+            return all_ayats_in_range
     
         all_ayats_in_range = []
         started_collecting = False
@@ -4,6 +4,9 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, QSettings, pyqtSignal
 from PyQt5.QtGui import QFont
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from info_prefetcher import InfoPrefetcher
 
 try:
     import arabic_reshaper
@@ -11,18 +14,38 @@ try:
 except ImportError:
     HAS_RESHAPER = False
 
+# فهرس التبويب -> (المتصفح، لون النص، مفتاح "لا توجد بيانات"، قاعدة البيانات، خاص بالكلمة)
+# The tafsir tab (1) reads the database chosen in its combo box.
+INFO_TABS = {
+    0: ("txt_meaning", "#2c3e50", "no_meaning", "meaning", True),
+    1: ("txt_tafsir", "#2980b9", "no_tafsir", None, False),
+    2: ("txt_eerab", "#16a085", "no_eerab", "eerab", True),
+    3: ("txt_sarf", "#8e44ad", "no_sarf", "sarf", True),
+    4: ("txt_nozool", "#2c3e50", "no_nozool", "nozool", False),
+    5: ("txt_tajweed", "#2c3e50", "no_tajweed", "tajweed", False),
+}
+
 class WordInfoDialog(QDialog):
     reflection_saved_signal = pyqtSignal()
+    info_ready_signal = pyqtSignal(int, int, object) # generation, tab index, (content, title) or None
 
     def __init__(self, info_manager, data_manager, global_word_id, font_family="Traditional Arabic", parent=None, user_manager=None):
         super().__init__(parent)
         self.reflection_saved_signal.connect(self.on_reflection_saved)
+        self.info_ready_signal.connect(self.on_info_ready)
         self.info_manager = info_manager
         self.data_manager = data_manager
         self.user_manager = user_manager  # تخزين مدير المستخدمين
         self.current_global_id = global_word_id
         self.font_family = font_family
         self.last_sura_aya = None 
+        self.current_db_ids = None
+        
+        # --- NEW: Info is fetched on a worker; each tab request gets a generation id ---
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="word-info")
+        self._generation = 0
+        self._tab_generations = {} # tab index -> generation of its latest request
+        self._tab_requests = {} # tab index -> request shown (or being fetched) in the tab
         
         # Helper for translation
         self.tr_func = parent.tr if parent and hasattr(parent, 'tr') else lambda k, *args: k
@@ -142,12 +165,21 @@ class WordInfoDialog(QDialog):
         
         layout.addLayout(bottom_layout)
         
+        # --- NEW: Warm the neighbouring words/ayat in the background after each step ---
+        self.prefetcher = InfoPrefetcher(info_manager, data_manager)
+        self.finished.connect(self._shutdown_workers)
+        
         self.load_data()
         
         geometry = self.settings.value("geometry")
         if geometry:
             self.restoreGeometry(geometry)
 
+    def _shutdown_workers(self, _result=None):
+        self._tab_generations.clear() # Pending fetches find no current request and return
+        self._executor.shutdown(wait=False)
+        self.prefetcher.shutdown()
+
     def closeEvent(self, event):
         self.settings.setValue("geometry", self.saveGeometry())
         super().closeEvent(event)
@@ -249,6 +281,7 @@ class WordInfoDialog(QDialog):
             
         sura_id_db, aya_id_db, word_id_db = db_ids
         sura_local, aya_local, word_local = local_info
+        self.current_db_ids = db_ids
         
         # تحديث المتغيرات الحالية للتدبرات
         self.current_sura = sura_local
@@ -257,83 +290,101 @@ class WordInfoDialog(QDialog):
         sura_name = self.data_manager.get_sura_name(sura_local)
         self.setWindowTitle(self.tr_func("window_title_details", sura_name, aya_local, word_local))
         
-        # 1. المعنى
-        meaning, m_title = self.info_manager.get_word_data("meaning", sura_id_db, aya_id_db, word_id_db)
-        html_meaning = ""
-        if m_title:
-            fixed_title = self._fix_text(m_title)
-            # تصغير خط العنوان
-            html_meaning += f"<div style='font-family: \"Traditional Arabic\"; color: #C0392B; font-size: 18px; font-weight: bold; margin-bottom: 5px;'>{fixed_title}</div>"
-        html_meaning += f"<div dir='rtl' style='color:#2c3e50;'>{meaning if meaning else self.tr_func('no_meaning')}</div>"
-        self.txt_meaning.setHtml(html_meaning)
-        
-        # 2. الإعراب
-        eerab, e_title = self.info_manager.get_word_data("eerab", sura_id_db, aya_id_db, word_id_db)
-        html_eerab = ""
-        if e_title:
-            fixed_title = self._fix_text(e_title)
-            html_eerab += f"<div style='font-family: \"Traditional Arabic\"; color: #C0392B; font-size: 18px; font-weight: bold; margin-bottom: 5px;'>{fixed_title}</div>"
-        html_eerab += f"<div dir='rtl' style='color:#16a085;'>{eerab if eerab else self.tr_func('no_eerab')}</div>"
-        self.txt_eerab.setHtml(html_eerab)
-        
-        # 3. الصرف
-        sarf, s_title = self.info_manager.get_word_data("sarf", sura_id_db, aya_id_db, word_id_db)
-        html_sarf = ""
-        if s_title:
-            fixed_title = self._fix_text(s_title)
-            html_sarf += f"<div style='font-family: \"Traditional Arabic\"; color: #C0392B; font-size: 18px; font-weight: bold; margin-bottom: 5px;'>{fixed_title}</div>"
-        html_sarf += f"<div dir='rtl' style='color:#8e44ad;'>{sarf if sarf else self.tr_func('no_sarf')}</div>"
-        self.txt_sarf.setHtml(html_sarf)
+        # التبويبات التي تغير محتواها تعرض "جاري التحميل" وتُجلب عند ظهورها فقط
+        for index in INFO_TABS:
+            if self._tab_requests.get(index) != self._tab_request(index):
+                self._invalidate_tab(index)
+        self._load_tab(self.tabs.currentIndex())
         
         # تحديث الحقول الخاصة بالآية
         current_sura_aya = (sura_id_db, aya_id_db)
         if current_sura_aya != self.last_sura_aya:
-            self.load_tafsir()
-            self.load_nozool()
-            self.load_tajweed()
             self.load_reflection() # تحميل التدبر
             self.last_sura_aya = current_sura_aya
-
-    def load_tafsir(self):
-        db_ids = self.data_manager.get_db_ids_from_global(self.current_global_id)
-        if not db_ids: return
-        sura_id_db, aya_id_db, _ = db_ids
-        
-        source = self.combo_tafsir.currentData()
-        tafsir, t_title = self.info_manager.get_aya_data(source, sura_id_db, aya_id_db)
         
-        html_tafsir = ""
-        if t_title:
-            fixed_title = self._fix_text(t_title)
-            html_tafsir += f"<div style='font-family: \"Traditional Arabic\"; color: #C0392B; font-size: 18px; font-weight: bold; margin-bottom: 5px;'>{fixed_title}</div>"
-        html_tafsir += f"<div dir='rtl' style='color:#2980b9;'>{tafsir if tafsir else self.tr_func('no_tafsir')}</div>"
-        self.txt_tafsir.setHtml(html_tafsir)
-
-    def load_nozool(self):
-        db_ids = self.data_manager.get_db_ids_from_global(self.current_global_id)
-        if not db_ids: return
-        sura_id_db, aya_id_db, _ = db_ids
-        
-        content, title = self.info_manager.get_aya_data("nozool", sura_id_db, aya_id_db)
+        self.prefetcher.prefetch(self.current_global_id, self.combo_tafsir.currentData())
+
+    def _tab_request(self, index):
+        """(db_key, sura_id, aya_id, word_id or None) that tab index shows for the current word"""
+        sura_id_db, aya_id_db, word_id_db = self.current_db_ids
+        if index == 1:
+            return (self.combo_tafsir.currentData(), sura_id_db, aya_id_db, None)
+        db_key, by_word = INFO_TABS[index][3], INFO_TABS[index][4]
+        return (db_key, sura_id_db, aya_id_db, word_id_db if by_word else None)
+
+    def _invalidate_tab(self, index):
+        """Drops the tab's content and any fetch still running for it."""
+        self._tab_requests.pop(index, None)
+        self._tab_generations.pop(index, None)
+        browser = getattr(self, INFO_TABS[index][0])
+        browser.setHtml(f"<div dir='rtl' style='color:#7f8c8d;'>{self.tr_func('info_loading')}</div>")
+
+    def _load_tab(self, index):
+        """Starts fetching the tab's content on the worker unless it is already shown or on its way."""
+        if index not in INFO_TABS or self.current_db_ids is None:
+            return
+        request = self._tab_request(index)
+        if self._tab_requests.get(index) == request:
+            return
+        self._invalidate_tab(index)
+        self._generation += 1
+        self._tab_requests[index] = request
+        self._tab_generations[index] = self._generation
+        self._executor.submit(self._fetch_info, self._generation, index, request, self.current_global_id)
+
+    def _fetch_info(self, generation, index, request, global_id):
+        """Runs on the worker thread; results of superseded requests are never fetched or shown."""
+        if self._tab_generations.get(index) != generation:
+            return
+        db_key, sura_id_db, aya_id_db, word_id_db = request
+        try:
+            if word_id_db is None:
+                result = self.info_manager.get_aya_data(db_key, sura_id_db, aya_id_db)
+            else:
+                # جلب بيانات كل كلمات الآية دفعة واحدة، فيُخدم التنقل بين كلماتها من الذاكرة
+                self.info_manager.prefetch_words(self._ayah_db_words(global_id, sura_id_db, aya_id_db))
+                result = self.info_manager.get_word_data(db_key, sura_id_db, aya_id_db, word_id_db)
+        except Exception as e:
+            print(f"Error loading {db_key} for {sura_id_db}:{aya_id_db}: {e}")
+            result = None
+        if self._tab_generations.get(index) != generation:
+            return
+        try:
+            self.info_ready_signal.emit(generation, index, result)
+        except RuntimeError: # The dialog was destroyed meanwhile
+            pass
+
+    def on_info_ready(self, generation, index, result):
+        if self._tab_generations.get(index) != generation:
+            return # The user has already moved to another word/ayah/tafsir
+        browser_attr, color, empty_key = INFO_TABS[index][:3]
+        content, title = result if result else (None, None)
         html = ""
         if title:
             fixed_title = self._fix_text(title)
+            # تصغير خط العنوان
             html += f"<div style='font-family: \"Traditional Arabic\"; color: #C0392B; font-size: 18px; font-weight: bold; margin-bottom: 5px;'>{fixed_title}</div>"
-        html += f"<div dir='rtl' style='color:#2c3e50;'>{content if content else self.tr_func('no_nozool')}</div>"
-        self.txt_nozool.setHtml(html)
+        html += f"<div dir='rtl' style='color:{color};'>{content if content else self.tr_func(empty_key)}</div>"
+        getattr(self, browser_attr).setHtml(html)
+
+    def _ayah_db_words(self, global_id, sura_id_db, aya_id_db):
+        """(sura_id, aya_id, word_id) of every word of global_id's ayah"""
+        global_to_db = self.data_manager.global_to_db_map
+        first = last = global_id
+        while global_to_db.get(first - 1, (None, None))[:2] == (sura_id_db, aya_id_db):
+            first -= 1
+        while global_to_db.get(last + 1, (None, None))[:2] == (sura_id_db, aya_id_db):
+            last += 1
+        return [global_to_db[g] for g in range(first, last + 1)]
+
+    def load_tafsir(self):
+        self._load_tab(1)
+
+    def load_nozool(self):
+        self._load_tab(4)
 
     def load_tajweed(self):
-        db_ids = self.data_manager.get_db_ids_from_global(self.current_global_id)
-        if not db_ids: return
-        sura_id_db, aya_id_db, _ = db_ids
-        
-        content, title = self.info_manager.get_aya_data("tajweed", sura_id_db, aya_id_db)
-        html = ""
-        if title:
-            fixed_title = self._fix_text(title)
-            html += f"<div style='font-family: \"Traditional Arabic\"; color: #C0392B; font-size: 18px; font-weight: bold; margin-bottom: 5px;'>{fixed_title}</div>"
-        html += f"<div dir='rtl' style='color:#2c3e50;'>{content if content else self.tr_func('no_tajweed')}</div>"
-        self.txt_tajweed.setHtml(html)
+        self._load_tab(5)
 
     def load_reflection(self):
         """تحميل التدبر المحفوظ للآية الحالية"""
@@ -386,6 +437,7 @@ class WordInfoDialog(QDialog):
         else:
             self.btn_prev.setText(self.tr_func("btn_prev_word"))
             self.btn_next.setText(self.tr_func("btn_next_word"))
+        self._load_tab(index) # التبويبات غير الظاهرة تُحمّل عند فتحها
 
     def _go_prev_ayah(self):
         local_info = self.data_manager.global_to_local_map.get(self.current_global_id)
@@ -1,13 +1,50 @@
-import sqlite3
 import os
-from utils import resource_path
+import json
+import threading
+from collections import OrderedDict
+from utils import resource_path, UNIFIED_INFO_DB_FILE
+from sqlite_pool import SQLitePool, header_fingerprint
+from startup_cache import SnapshotCache
+import startup_profiler
+
+SCHEMA_MANIFEST_VERSION = 2 # Bump when _discover_db_schema changes what it records
+WORD_DB_KEYS = ("meaning", "eerab", "sarf") # قواعد البيانات الخاصة بالكلمات
+WORD_CACHE_SIZE = 8192 # (db_key, word) entries kept by the word LRU
+AYA_CACHE_SIZE = 512 # (db_key, sura, aya) entries kept by the ayah LRU (tafsir texts can be long)
+UNIFIED_SCHEMA_VERSION = 2 # Bump when build_unified_info_db.py changes the tables below
+
+# Lookups in the unified database (see build_unified_info_db.py); all keyed by source_id first.
+UNIFIED_WORD_QUERY = ("SELECT i.content, i.title FROM word_info i JOIN words w ON w.global_word_id = i.global_word_id "
+                      "WHERE i.source_id=? AND w.global_word_id=? AND w.sura_id=? AND w.aya_id=?")
+UNIFIED_WORD_RANGE_QUERY = ("SELECT w.sura_id, w.aya_id, w.global_word_id, i.content, i.title "
+                            "FROM word_info i JOIN words w ON w.global_word_id = i.global_word_id "
+                            "WHERE i.source_id=? AND i.global_word_id BETWEEN ? AND ?")
+UNIFIED_AYA_QUERY = ("SELECT i.content, i.title FROM ayah_info i JOIN ayahs a ON a.ayah_ordinal = i.ayah_ordinal "
+                     "WHERE i.source_id=? AND a.sura_id=? AND a.aya_id=?")
+
+def unified_fingerprint(path):
+    """[size, file change counter] recorded for each source of the unified database, or None."""
+    fingerprint = header_fingerprint(path)
+    return list(fingerprint[:2]) if fingerprint else None
 
 class QuranInfoManager:
     def __init__(self):
         # مسار مجلد قواعد البيانات
         self.base_path = resource_path(os.path.join("data", "sqlite"))
-        self.connections = {}
+        self.pools = {} # db_key -> SQLitePool (one read-only connection per thread)
+        self._pools_lock = threading.Lock()
+        self._queries = {} # (db_key, by_word) -> SELECT text, so sqlite3 reuses the prepared statement
         self.db_configs = {} # لتخزين هيكل الجداول المكتشف (Cache)
+        self.db_indexes = {} # db_key -> [(index_name, [columns], unique)]
+        self._schema_lock = threading.Lock() # one thread probes a schema and writes its manifest
+        self._word_cache = OrderedDict() # (db_key, sura_id, aya_id, word_id) -> (content, title), LRU
+        self._word_cache_lock = threading.Lock()
+        self._aya_cache = OrderedDict() # (db_key, sura_id, aya_id) -> (content, title), LRU
+        self._aya_cache_lock = threading.Lock()
+        # --- NEW: Single merged database, used instead of the separate files when present ---
+        self.unified_path = UNIFIED_INFO_DB_FILE
+        self._unified = None # (SQLitePool, {db_key: (source_id, level)}) once checked
+        self._unified_lock = threading.Lock()
         
         # خريطة أسماء الملفات
         self.db_files = {
@@ -25,32 +62,149 @@ class QuranInfoManager:
         }
 
     def _get_connection(self, db_key):
-        """إنشاء أو استرجاع اتصال بقاعدة البيانات المطلوبة"""
-        if db_key in self.connections:
-            return self.connections[db_key]
-        
-        filename = self.db_files.get(db_key)
-        if not filename: return None
-        
-        db_path = os.path.join(self.base_path, filename)
-        if not os.path.exists(db_path):
-            print(f"Database not found: {db_path}")
-            return None
-            
+        """إنشاء أو استرجاع اتصال بقاعدة البيانات المطلوبة (اتصال خاص بكل خيط)"""
+        pool = self.pools.get(db_key)
+        if pool is None:
+            filename = self.db_files.get(db_key)
+            if not filename: return None
+
+            db_path = os.path.join(self.base_path, filename)
+            if not os.path.exists(db_path):
+                print(f"Database not found: {db_path}")
+                return None
+            with self._pools_lock:
+                pool = self.pools.setdefault(db_key, SQLitePool(db_path))
+
         try:
-            conn = sqlite3.connect(db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            self.connections[db_key] = conn
-            return conn
+            with startup_profiler.span(f"QuranInfoManager.connect.{db_key}"):
+                return pool.connection()
         except Exception as e:
             print(f"Error connecting to {db_key}: {e}")
             return None
 
+    def _unified_sources(self):
+        """{db_key: (source_id, 'word' | 'ayah')} served by the unified database ({} if not usable)."""
+        if self._unified is None:
+            with self._unified_lock:
+                if self._unified is None:
+                    self._unified = self._open_unified()
+        return self._unified[1]
+
+    def _open_unified(self):
+        if not os.path.exists(self.unified_path):
+            return None, {}
+        pool = SQLitePool(self.unified_path)
+        try:
+            with startup_profiler.span("QuranInfoManager.connect.unified"):
+                conn = pool.connection()
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+                rows = conn.execute("SELECT source_id, db_key, level, file_name, signature FROM sources").fetchall()
+        except Exception as e:
+            print(f"!!! Could not open unified info database {self.unified_path}: {e}. Using the separate databases.")
+            pool.close_all()
+            return None, {}
+        if meta.get("schema_version") != str(UNIFIED_SCHEMA_VERSION):
+            print("Unified info database has an old format. Using the separate databases; re-run build_unified_info_db.py.")
+            pool.close_all()
+            return None, {}
+
+        # Missing sources are fine: a release may ship the unified file on its own. Sources are
+        # compared by size and SQLite change counter (see unified_fingerprint), read from their
+        # headers, so this check never reads the databases themselves.
+        data_dir = os.path.dirname(os.path.abspath(self.unified_path))
+        stale = [r["file_name"] for r in rows
+                 if os.path.exists(os.path.join(data_dir, r["file_name"]))
+                 and unified_fingerprint(os.path.join(data_dir, r["file_name"])) != json.loads(r["signature"])]
+        if stale:
+            print(f"Unified info database is out of date ({', '.join(stale)} changed). Using the separate databases; re-run build_unified_info_db.py.")
+            pool.close_all()
+            return None, {}
+        print(f"Using unified info database {self.unified_path}")
+        return pool, {r["db_key"]: (r["source_id"], r["level"]) for r in rows if r["level"] in ("word", "ayah")}
+
+    def _unified_lookup(self, source, sura, aya, word=None):
+        """(content, title) from the unified database; (None, None) if it has no entry."""
+        source_id, level = source
+        conn = self._unified[0].connection()
+        if level == "word" and word is not None:
+            row = conn.execute(UNIFIED_WORD_QUERY, (source_id, word, sura, aya)).fetchone()
+        else: # Ayah databases, and word databases without a word column, are looked up by ayah
+            row = conn.execute(UNIFIED_AYA_QUERY, (source_id, sura, aya)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _select_query(self, db_key, config, by_word):
+        """The lookup SELECT for a database, built once from its discovered columns."""
+        query = self._queries.get((db_key, by_word))
+        if query is None:
+            table, sura_col, aya_col, word_col, content_col, has_project_id, title_col = config
+            where_clause = f"{sura_col}=? AND {aya_col}=?"
+            if by_word and word_col:
+                where_clause += f" AND {word_col}=?"
+            sel_cols = content_col
+            if title_col:
+                sel_cols += f", {title_col}"
+            query = f"SELECT {sel_cols} FROM {table} WHERE {where_clause}"
+            self._queries[(db_key, by_word)] = query
+        return query
+
+    def _batch_query(self, db_key, config):
+        """
+        The range SELECT prefetch_words() runs once per sura: params (sura, first aya, last aya,
+        first word, last word). Equality on the sura and a range on the aya let SQLite seek a
+        (sura, aya, word) index instead of walking every row of a sura range.
+        """
+        query = self._queries.get((db_key, "batch"))
+        if query is None:
+            table, sura_col, aya_col, word_col, content_col, has_project_id, title_col = config
+            sel_cols = f"{sura_col}, {aya_col}, {word_col}, {content_col}" + (f", {title_col}" if title_col else "")
+            query = (f"SELECT {sel_cols} FROM {table} "
+                     f"WHERE {sura_col}=? AND {aya_col} BETWEEN ? AND ? AND {word_col} BETWEEN ? AND ?")
+            self._queries[(db_key, "batch")] = query
+        return query
+
     def _get_db_config(self, db_key, conn):
         """اكتشاف اسم الجدول وأسماء الأعمدة تلقائياً"""
         if db_key in self.db_configs:
             return self.db_configs[db_key]
         
+        with self._schema_lock, startup_profiler.span(f"QuranInfoManager.schema.{db_key}"):
+            if db_key in self.db_configs:  # Discovered by another thread while this one waited
+                return self.db_configs[db_key]
+            # The discovered schema is kept in a manifest keyed by the file size and the
+            # SQLite schema cookie, so only the first session after the schema changes probes
+            # it; checking the key reads the 100-byte header, never the whole file.
+            manifest = self._schema_manifest(db_key)
+            fingerprint = self._schema_fingerprint(db_key)
+            schema = manifest.load()
+            if schema is None or schema.get("fingerprint") != fingerprint:
+                schema = self._discover_db_schema(db_key, conn)
+                if schema is None:
+                    return None
+                if fingerprint is not None:
+                    schema["fingerprint"] = fingerprint
+                    manifest.save(schema)
+            self.db_configs[db_key] = schema["config"]
+            self.db_indexes[db_key] = schema["indexes"]
+            return schema["config"]
+
+    def _schema_manifest(self, db_key):
+        # No source files: validity is decided by _schema_fingerprint, not a content hash.
+        return SnapshotCache(f"info_schema_{db_key}", [], SCHEMA_MANIFEST_VERSION)
+
+    def _schema_fingerprint(self, db_key):
+        """(size, schema cookie) of the database file, or None if it cannot be read."""
+        fingerprint = header_fingerprint(os.path.join(self.base_path, self.db_files[db_key]))
+        return (fingerprint[0], fingerprint[2]) if fingerprint else None
+
+    def get_db_indexes(self, db_key):
+        """فهارس جدول المحتوى: [(name, [columns], unique)]، أو None إن لم يُكتشف الجدول بعد"""
+        return self.db_indexes.get(db_key)
+
+    def _discover_db_schema(self, db_key, conn):
+        """
+        Probes sqlite_master and PRAGMA table_info/index_list for db_key.
+        Returns {'table', 'columns', 'config', 'indexes'}, or None if there is no usable table.
+        """
         try:
             cur = conn.cursor()
             # 1. البحث عن اسم الجدول
@@ -92,15 +246,114 @@ class QuranInfoManager:
             title_col = 'title' if 'title' in cols else None
             
             config = (table, sura_col, aya_col, word_col, content_col, has_project_id, title_col)
-            self.db_configs[db_key] = config
-            print(f"DB Config for {db_key}: {config}") # للتشخيص
-            return config
+
+            # 3. الفهارس المتاحة على الجدول
+            indexes = []
+            cur.execute(f"PRAGMA index_list({table})")
+            for r in cur.fetchall():
+                name, unique = r[1], bool(r[2])
+                cur.execute(f"PRAGMA index_info({name})")
+                indexes.append((name, [c[2] for c in cur.fetchall()], unique))
+
+            print(f"DB Config for {db_key}: {config}, indexes: {indexes}") # للتشخيص (مرة واحدة لكل ملف)
+            return {"table": table, "columns": cols, "config": config, "indexes": indexes}
         except Exception as e:
             print(f"Error inspecting DB {db_key}: {e}")
             return None
 
+    def _cached_word(self, db_key, db_word):
+        key = (db_key,) + tuple(db_word)
+        with self._word_cache_lock:
+            entry = self._word_cache.get(key)
+            if entry is not None:
+                self._word_cache.move_to_end(key)
+            return entry
+
+    def _cache_words(self, db_key, entries):
+        with self._word_cache_lock:
+            for db_word, entry in entries.items():
+                key = (db_key,) + tuple(db_word)
+                self._word_cache[key] = entry
+                self._word_cache.move_to_end(key)
+            while len(self._word_cache) > WORD_CACHE_SIZE:
+                self._word_cache.popitem(last=False)
+
+    def prefetch_words(self, db_words, db_keys=WORD_DB_KEYS):
+        """
+        Fetches the data of many words (e.g. every word of an ayah or a page) with one range
+        query per database and sura and keeps it in the word LRU, so get_word_data() for any of
+        them is answered from memory.
+        db_words: [(sura_id, aya_id, word_id)] as stored in the databases (see
+        QuranDataManager.get_db_ids_from_global); word_id is the global word id.
+        """
+        db_words = [tuple(w) for w in db_words]
+        if not db_words:
+            return
+        for db_key in db_keys:
+            missing = [w for w in db_words if self._cached_word(db_key, w) is None]
+            if not missing:
+                continue
+
+            source = self._unified_sources().get(db_key)
+            if source:
+                if source[1] != "word":
+                    continue
+                conn = self._unified[0].connection()
+                words = [w[2] for w in missing]
+                title_col = True
+                batches = [(UNIFIED_WORD_RANGE_QUERY, (source[0], min(words), max(words)))]
+            else:
+                conn = self._get_connection(db_key)
+                if not conn: continue
+                config = self._get_db_config(db_key, conn)
+                if not config: continue
+                table, sura_col, aya_col, word_col, content_col, has_project_id, title_col = config
+                if not content_col or not word_col:
+                    continue # بدون عمود للكلمة لا يمكن التمييز بين كلمات الآية
+
+                query = self._batch_query(db_key, config)
+                by_sura = {}
+                for w in missing:
+                    by_sura.setdefault(w[0], []).append(w)
+                batches = [(query, (sura, min(w[1] for w in ws), max(w[1] for w in ws),
+                                    min(w[2] for w in ws), max(w[2] for w in ws)))
+                           for sura, ws in by_sura.items()]
+
+            entries = dict.fromkeys(missing, (None, None)) # كلمات بلا صف: نتيجة فارغة محفوظة أيضاً
+            found = set()
+            try:
+                for query, params in batches:
+                    for row in conn.execute(query, params):
+                        key = (row[0], row[1], row[2])
+                        if key not in entries or key in found: # First row wins, as with fetchone()
+                            continue
+                        found.add(key)
+                        val = row[3]
+                        title = row[4] if title_col else None
+                        val = val.decode('utf-8', errors='replace') if isinstance(val, bytes) else val
+                        title = title.decode('utf-8', errors='replace') if isinstance(title, bytes) else title
+                        entries[key] = (val, title)
+            except Exception as e:
+                print(f"Batch query error in {db_key}: {e}")
+                continue
+            self._cache_words(db_key, entries)
+
     def get_word_data(self, db_key, sura, aya, word):
         """جلب معلومات خاصة بكلمة محددة (معنى، إعراب، صرف)"""
+        cached = self._cached_word(db_key, (sura, aya, word))
+        if cached is not None:
+            return cached
+
+        source = self._unified_sources().get(db_key)
+        if source:
+            try:
+                result = self._unified_lookup(source, sura, aya, word)
+            except Exception as e:
+                print(f"Query error in unified {db_key}: {e}")
+                return None, None
+            self._cache_words(db_key, {(sura, aya, word): result})
+            return result
+
         conn = self._get_connection(db_key)
         if not conn:
             print(f"DEBUG DB [{db_key}]: No connection.")
@@ -119,20 +372,11 @@ class QuranInfoManager:
         try:
             cur = conn.cursor()
             
-            # Build query parts
-            where_clause = f"{sura_col}=? AND {aya_col}=?"
             params = [sura, aya]
-            
             # إذا كان العمود الخاص بالكلمة موجوداً نستخدمه، وإلا نبحث بالآية فقط
             if word_col:
-                where_clause += f" AND {word_col}=?"
                 params.append(word)
-
-            sel_cols = content_col
-            if title_col:
-                sel_cols += f", {title_col}"
-
-            query = f"SELECT {sel_cols} FROM {table} WHERE {where_clause}"
+            query = self._select_query(db_key, config, by_word=True)
             
             # --- DEBUG PRINT ---
             print(f"DEBUG DB [{db_key}]: Query: {query} | Params: {params}")
@@ -148,6 +392,7 @@ class QuranInfoManager:
                 print(f"DEBUG DB [{db_key}]: Row found. Value type: {type(val)}")
                 val = val.decode('utf-8', errors='replace') if isinstance(val, bytes) else val
                 title = title.decode('utf-8', errors='replace') if isinstance(title, bytes) else title
+                self._cache_words(db_key, {(sura, aya, word): (val, title)})
                 return val, title
             else:
                 # --- DEBUG PRINT ---
@@ -159,6 +404,23 @@ class QuranInfoManager:
 
     def get_aya_data(self, db_key, sura, aya):
         """جلب معلومات خاصة بآية كاملة (تفاسير)"""
+        key = (db_key, sura, aya)
+        with self._aya_cache_lock:
+            cached = self._aya_cache.get(key)
+            if cached is not None:
+                self._aya_cache.move_to_end(key)
+                return cached
+
+        source = self._unified_sources().get(db_key)
+        if source:
+            try:
+                result = self._unified_lookup(source, sura, aya)
+            except Exception as e:
+                print(f"Query error in unified {db_key}: {e}")
+                return None, None
+            self._cache_aya(key, result)
+            return result
+
         conn = self._get_connection(db_key)
         if not conn: return None
         
@@ -170,13 +432,7 @@ class QuranInfoManager:
 
         try:
             cur = conn.cursor()
-            where_clause = f"{sura_col}=? AND {aya_col}=?"
-            
-            sel_cols = content_col
-            if title_col:
-                sel_cols += f", {title_col}"
-                
-            query = f"SELECT {sel_cols} FROM {table} WHERE {where_clause}"
+            query = self._select_query(db_key, config, by_word=False)
             
             # --- DEBUG PRINT ---
             print(f"DEBUG DB [{db_key}]: Query: {query} | Params: {sura}, {aya}")
@@ -189,14 +445,29 @@ class QuranInfoManager:
                 print(f"DEBUG DB [{db_key}]: Row found.")
                 val = val.decode('utf-8', errors='replace') if isinstance(val, bytes) else val
                 title = title.decode('utf-8', errors='replace') if isinstance(title, bytes) else title
-                return val, title
+                result = (val, title)
             else:
                 print(f"DEBUG DB [{db_key}]: No row returned.")
+                result = (None, None)
         except Exception as e:
             print(f"Query error in {db_key}: {e}")
-        return None, None
+            return None, None
+
+        self._cache_aya(key, result)
+        return result
+
+    def _cache_aya(self, key, result):
+        with self._aya_cache_lock:
+            self._aya_cache[key] = result
+            while len(self._aya_cache) > AYA_CACHE_SIZE:
+                self._aya_cache.popitem(last=False)
 
     def close_all(self):
-        for conn in self.connections.values():
-            conn.close()
-        self.connections.clear()
+        with self._pools_lock:
+            pools, self.pools = list(self.pools.values()), {}
+        with self._unified_lock:
+            if self._unified and self._unified[0]:
+                pools.append(self._unified[0])
+            self._unified = None
+        for pool in pools:
+            pool.close_all()
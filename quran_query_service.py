@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+quran_query_service.py - Local HTTP/JSON service over one warm QuranDataManager.
+
+Kiosk and teacher tools on the same machine query this instead of each loading
+the whole data layer:
+
+    python quran_query_service.py                    # 127.0.0.1:8765
+    python quran_query_service.py --port 9000
+
+GET endpoints (query-string parameters, JSON response {"result": ...}):
+
+    /ayah?sura=2&aya=255
+    /search?q=الله لا اله الا هو&fuzzy=0&limit=10
+    /unit?type=juz&value=30                  juz / hizb / rub / page / sura
+    /recitation?from=2:255&to=2:257          words and their (page, sura, aya, word)
+    /page?number=3                           layout lines of a page
+    /word?key=2:255:1  or  /word?id=<global word id>
+    /metrics                                 per-endpoint latency, cache and error counts
+
+POST /batch with a JSON list of {"endpoint": "search", "params": {...}} answers
+several queries in one round trip (a list of {"result"} / {"error", "status"}).
+
+Queries run on a small thread pool so the event loop keeps accepting connections.
+Answers are cached (the data is read-only) and identical queries arriving while
+one is running share its result. query() can be used without the HTTP layer.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_SIZE = 2048         # encoded answers kept
+LATENCY_SAMPLES = 1024    # most recent latencies kept per endpoint for percentiles
+MAX_BODY = 1 << 20        # largest accepted /batch body
+MAX_BATCH = 256
+IDLE_TIMEOUT = 30         # seconds a keep-alive connection may sit idle
+
+
+class QueryError(Exception):
+    """A query the service refuses, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Parameter parsing ---
+def _param(params, name, default=None):
+    value = params.get(name, default)
+    if value is None:
+        raise QueryError(400, f"Missing parameter '{name}'")
+    return value
+
+
+def _int_param(params, name, default=None):
+    try:
+        return int(_param(params, name, default))
+    except (TypeError, ValueError):
+        raise QueryError(400, f"Parameter '{name}' must be an integer")
+
+
+def _bool_param(params, name):
+    return str(params.get(name, "0")).lower() in ("1", "true", "yes")
+
+
+def _ayah_param(params, name):
+    """'sura:aya' -> (sura, aya)."""
+    try:
+        sura, aya = map(int, str(_param(params, name)).split(":"))
+    except ValueError:
+        raise QueryError(400, f"Parameter '{name}' must look like sura:aya")
+    return sura, aya
+
+
+# --- Endpoints (run on the worker pool) ---
+def _ayah(dm, params):
+    sura, aya = _int_param(params, "sura"), _int_param(params, "aya")
+    text = dm.get_ayah_text(sura, aya)
+    if not text:
+        raise QueryError(404, f"No ayah {sura}:{aya}")
+    return {"sura": sura, "aya": aya, "sura_name": dm.get_sura_name(sura), "text": text}
+
+
+def _search(dm, params):
+    limit = _int_param(params, "limit", 10)
+    return dm.find_verse_by_text(_param(params, "q"), fuzzy=_bool_param(params, "fuzzy"), top_k=limit)[:limit]
+
+
+def _unit(dm, params):
+    unit_range = dm.get_range_for_unit(_param(params, "type"), _int_param(params, "value"))
+    if unit_range is None:
+        raise QueryError(404, "No such unit")
+    return unit_range
+
+
+def _recitation(dm, params):
+    (from_sura, from_aya), (to_sura, to_aya) = _ayah_param(params, "from"), _ayah_param(params, "to")
+    words, word_pages = dm.build_recitation_range(from_sura, from_aya, to_sura, to_aya)
+    return {"words": words, "word_pages": word_pages}
+
+
+def _page(dm, params):
+    number = _int_param(params, "number")
+    lines = dm.get_page_layout(number)
+    if not lines:
+        raise QueryError(404, f"No page {number}")
+    return lines
+
+
+def _word(dm, params):
+    if "id" in params:
+        global_id = _int_param(params, "id")
+        local = dm.global_to_local_map.get(global_id)
+    else:
+        try:
+            local = tuple(map(int, _param(params, "key").split(":")))
+        except ValueError:
+            raise QueryError(400, "Parameter 'key' must look like sura:aya:word")
+        global_id = dm.get_global_word_id_from_local(*local) if len(local) == 3 else None
+    if global_id is None or local is None:
+        raise QueryError(404, "No such word")
+
+    key = ":".join(map(str, local))
+    info = {"global_id": global_id, "key": key, "db_ids": dm.get_db_ids_from_global(global_id),
+            "title": dm.titles_map.get(local), "meaning": dm.get_word_meaning(key)}
+    if dm.word_table is not None:
+        info["text"] = dm.word_table.text(global_id)
+        info["location"] = dm.word_table.location(global_id)
+    return info
+
+
+ENDPOINTS = {
+    "ayah": _ayah,
+    "search": _search,
+    "unit": _unit,
+    "recitation": _recitation,
+    "page": _page,
+    "word": _word,
+}
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # seconds
+
+    def report(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else 0.0
+
+        return {"requests": self.requests, "errors": self.errors, "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced, "p50_ms": percentile(0.50), "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99), "max_ms": ordered[-1] * 1000 if ordered else 0.0}
+
+
+class QueryService:
+    def __init__(self, data_manager, workers=4, cache_size=CACHE_SIZE):
+        self.data_manager = data_manager
+        self.cache_size = cache_size
+        self.started = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        # Both only touched from the event loop thread.
+        self._cache = OrderedDict()  # (endpoint, params) -> JSON-encoded result
+        self._in_flight = {}         # (endpoint, params) -> asyncio.Future of the running query
+        self.metrics = {name: EndpointMetrics() for name in ENDPOINTS}
+
+    async def query(self, endpoint, params):
+        """Answers one query. Returns the JSON-encoded result; raises QueryError."""
+        handler = ENDPOINTS.get(endpoint)
+        if handler is None:
+            raise QueryError(404, f"Unknown endpoint '{endpoint}'")
+        metrics = self.metrics[endpoint]
+        metrics.requests += 1
+        start = time.perf_counter()
+        key = (endpoint, tuple(sorted((str(k), str(v)) for k, v in params.items())))
+        try:
+            encoded = self._cache.get(key)
+            if encoded is not None:
+                self._cache.move_to_end(key)
+                metrics.cache_hits += 1
+                return encoded
+
+            running = self._in_flight.get(key)
+            if running is not None:
+                metrics.coalesced += 1
+                return await asyncio.shield(running)
+
+            running = asyncio.get_running_loop().run_in_executor(self._executor, self._run, handler, dict(key[1]))
+            self._in_flight[key] = running
+            try:
+                encoded = await asyncio.shield(running)
+            finally:
+                del self._in_flight[key]
+            self._cache[key] = encoded
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return encoded
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            metrics.latencies.append(time.perf_counter() - start)
+
+    def _run(self, handler, params):
+        return json.dumps(handler(self.data_manager, params), ensure_ascii=False).encode("utf-8")
+
+    async def batch(self, items):
+        """Answers a list of {"endpoint", "params"} concurrently; returns one JSON array."""
+        if not isinstance(items, list) or len(items) > MAX_BATCH:
+            raise QueryError(400, f"Batch must be a JSON list of at most {MAX_BATCH} queries")
+
+        async def answer(item):
+            try:
+                if not isinstance(item, dict):
+                    raise QueryError(400, "Batch items must be objects")
+                encoded = await self.query(item.get("endpoint"), item.get("params") or {})
+                return b'{"result":' + encoded + b'}'
+            except Exception as e:
+                return _error_body(e)
+
+        return b"[" + b",".join(await asyncio.gather(*(answer(item) for item in items))) + b"]"
+
+    def metrics_report(self):
+        return {"uptime_s": time.time() - self.started, "cached_answers": len(self._cache),
+                "endpoints": {name: m.report() for name, m in self.metrics.items()}}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _error_body(error):
+    status = error.status if isinstance(error, QueryError) else 500
+    if status == 500:
+        print(f"Error answering query: {error}")
+    return json.dumps({"error": str(error), "status": status}, ensure_ascii=False).encode("utf-8")
+
+
+# --- HTTP/1.1 front end ---
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def _read_request(reader):
+    """Returns (method, target, headers, body), or None once the client closes."""
+    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+    if not request_line.strip():
+        return None
+    method, target, _version = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise QueryError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _respond(service, method, target):
+    """Returns (status, body bytes) for one request."""
+    url = urlsplit(target)
+    endpoint = url.path.strip("/")
+    params = dict(parse_qsl(url.query))
+    try:
+        if endpoint == "metrics":
+            return 200, json.dumps({"result": service.metrics_report()}).encode("utf-8")
+        if method != "GET":
+            raise QueryError(405, "Use GET (or POST /batch)")
+        return 200, b'{"result":' + await service.query(endpoint, params) + b'}'
+    except Exception as e:
+        return (e.status if isinstance(e, QueryError) else 500), _error_body(e)
+
+
+async def _handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except QueryError as e:
+                _write_response(writer, e.status, _error_body(e), keep_alive=False)
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, target, headers, payload = request
+
+            if urlsplit(target).path.strip("/") == "batch":
+                try:
+                    if method != "POST":
+                        raise QueryError(405, "Use POST for /batch")
+                    status, body = 200, b'{"result":' + await service.batch(json.loads(payload or b"null")) + b'}'
+                except Exception as e:
+                    status = e.status if isinstance(e, QueryError) else 400
+                    body = _error_body(e)
+            else:
+                status, body = await _respond(service, method, target)
+
+            keep_alive = headers.get("connection", "").lower() != "close"
+            _write_response(writer, status, body, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+def _write_response(writer, status, body, keep_alive):
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Starts the HTTP front end; returns the asyncio server (already listening)."""
+    return await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+
+
+# --- Client helper for tools on the same machine ---
+def query(endpoint, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=10, **params):
+    """Blocking client call: query("search", q="...") -> result. Raises QueryError."""
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+    from urllib.parse import urlencode
+
+    url = f"http://{host}:{port}/{endpoint}?{urlencode(params)}"
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())["result"]
+    except HTTPError as e:
+        error = json.loads(e.read() or b"{}")
+        raise QueryError(e.code, error.get("error", str(e)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Quran data queries to local tools over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="interface to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="threads answering queries")
+    args = parser.parse_args(argv)
+
+    from quran_data_manager import QuranDataManager
+    service = QueryService(QuranDataManager(), workers=args.workers)
+
+    async def run():
+        server = await serve(service, args.host, args.port)
+        print(f"Quran query service listening on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+recitation_ranges.py - Ordinal range algebra for recitation and unit ranges.
+
+RecitationStream is the mushaf word stream used by recitation (layout words in
+page order, ayah-number markers dropped) as typed columns, with each word's
+normalized text precomputed. Every position carries an ordinal key
+sura * 1000 + aya, which is non-decreasing in mushaf order, so the slice for a
+(from_sura, from_aya) - (to_sura, to_aya) range is found with two bisects.
+
+RangeEngine resolves juz/hizb/rub/page/sura units to ayah ranges from
+precomputed first/last ayah ordinals and slices ayahs and words by range.
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from utils import normalize_words
+from word_table import pack_strings
+
+# Pattern to detect if a string consists only of Arabic or Arabic-Indic numerals
+ARABIC_NUMBER_PATTERN = re.compile(r"^[\u0660-\u0669\u06F0-\u06F9]+$")
+
+UNIT_TYPES = ('juz', 'hizb', 'rub', 'page', 'sura')
+MAX_AYA_KEY = 999
+RANGE_CACHE_SIZE = 16
+
+
+def ayah_key(sura, aya):
+    """Ordinal key of an ayah; orders like (sura, aya)."""
+    return sura * 1000 + min(aya, MAX_AYA_KEY)
+
+
+class RecitationStream:
+    def __init__(self, pages):
+        """pages: layout page dicts in page order."""
+        self.page = array('H')
+        self.sura = array('H')
+        self.aya = array('H')
+        self.word = array('H')
+        self.key = array('I')
+        texts = []
+
+        for page_data in pages:
+            page_number = page_data.get('page_number')
+            for line_data in page_data.get('lines', []):
+                for word_info in line_data.get('words', []):
+                    sura_no = word_info.get('surah')
+                    aya_no = word_info.get('ayah')
+                    text = word_info.get('text')
+                    word_id = word_info.get('word')
+
+                    # Skip invalid entries, missing word_id, or ayah markers
+                    if not all([sura_no, aya_no, text]) or word_id is None or ARABIC_NUMBER_PATTERN.match(text):
+                        continue
+
+                    self.page.append(page_number)
+                    self.sura.append(sura_no)
+                    self.aya.append(aya_no)
+                    self.word.append(word_id)
+                    self.key.append(ayah_key(sura_no, aya_no))
+                    texts.append(text)
+
+        self._text, self.text_offset = pack_strings(texts)
+        self._normalized, self.normalized_offset = pack_strings(normalize_words(texts))
+        self.ordered = all(self.key[i] <= self.key[i + 1] for i in range(len(self.key) - 1))
+
+    def __len__(self):
+        return len(self.key)
+
+    def text(self, pos):
+        return self._text[self.text_offset[pos]:self.text_offset[pos + 1]]
+
+    def normalized(self, pos):
+        return self._normalized[self.normalized_offset[pos]:self.normalized_offset[pos + 1]]
+
+    def span(self, from_sura, from_aya, to_sura, to_aya):
+        """
+        [start, stop) positions of the words from the first word of (from_sura, from_aya)
+        up to the last word at or before (to_sura, to_aya). Empty if the start ayah is absent.
+        """
+        from_key = ayah_key(from_sura, from_aya)
+        to_key = ayah_key(to_sura, to_aya)
+        keys = self.key
+        if self.ordered:
+            start = bisect_left(keys, from_key)
+            if start == len(keys) or self.sura[start] != from_sura or self.aya[start] != from_aya:
+                return 0, 0
+            return start, max(start, bisect_right(keys, to_key, lo=start))
+
+        # Out-of-order layout data: walk like the original page scan.
+        start = next((i for i in range(len(keys)) if self.sura[i] == from_sura and self.aya[i] == from_aya), None)
+        if start is None:
+            return 0, 0
+        stop = start
+        while stop < len(keys) and keys[stop] <= to_key:
+            stop += 1
+        return start, stop
+
+
+class RangeEngine:
+    def __init__(self, ayah_index, stream=None):
+        """
+        ayah_index: AyahIndex over all_ayas (after juz/hizb_quarter were filled in).
+        stream: RecitationStream, or None if the layout is not available.
+        """
+        self.ayah_index = ayah_index
+        self.stream = stream
+        self._units = {unit: {} for unit in UNIT_TYPES}  # unit -> {value: [first, last] ordinal}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        for ordinal, aya in enumerate(ayah_index.ayas):
+            rub = aya.get('hizb_quarter')
+            values = {
+                'juz': aya.get('juz'),
+                'rub': rub,
+                'hizb': (rub - 1) // 4 + 1 if rub else None,
+                'page': aya.get('page'),
+                'sura': aya.get('sura_no'),
+            }
+            for unit, value in values.items():
+                if value is None:
+                    continue
+                bounds = self._units[unit].get(value)
+                if bounds is None:
+                    self._units[unit][value] = [ordinal, ordinal]
+                else:
+                    bounds[1] = ordinal
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def unit_range(self, unit_type, unit_value):
+        """(start_sura, start_aya, end_sura, end_aya) of a juz/hizb/rub/page/sura, or None."""
+        bounds = self._units.get(unit_type, {}).get(unit_value)
+        if bounds is None:
+            return None
+        ayas = self.ayah_index.ayas
+        start_aya, end_aya = ayas[bounds[0]], ayas[bounds[1]]
+        return (start_aya['sura_no'], start_aya['aya_no'], end_aya['sura_no'], end_aya['aya_no'])
+
+    def ayahs_between(self, start_sura_aya, end_sura_aya):
+        """(sura, aya) of every ayah from start to the first end after it, inclusive."""
+        index = self.ayah_index
+        start = index.ordinal(*start_sura_aya)
+        if start is None:
+            return []
+        end = index.ordinal(*end_sura_aya)
+        if end is None or end < start:
+            end = len(index) - 1
+        keys = (index.key(i) for i in range(start, end + 1))
+        return [key for key in keys if key[0] is not None and key[1] is not None]
+
+    def words_between(self, from_sura, from_aya, to_sura, to_aya):
+        """
+        The recitation word stream of a range: ([(text, normalized_text)], [(page, sura, aya, word_id)]).
+        Results are cached per range for repeated recitation sessions.
+        """
+        cache_key = (from_sura, from_aya, to_sura, to_aya)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+        if cached is None:
+            stream = self.stream
+            start, stop = stream.span(from_sura, from_aya, to_sura, to_aya)
+            positions = range(start, stop)
+            cached = (tuple((stream.text(i), stream.normalized(i)) for i in positions),
+                      tuple((stream.page[i], stream.sura[i], stream.aya[i], stream.word[i]) for i in positions))
+            with self._lock:
+                self._cache[cache_key] = cached
+                while len(self._cache) > RANGE_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return list(cached[0]), list(cached[1])
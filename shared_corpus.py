@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+shared_corpus.py - The read-only mushaf data, mapped once and shared.
+
+The compiled corpus (quran_corpus.bin) and the page shard file are opened with
+read-only mmap, so the operating system keeps a single copy of their pages in
+its file cache and maps it into every process that opens them: the main app,
+the playlist/memorize viewer, helper scripts and a second instance all read the
+same physical memory instead of each parsing the layout JSON into its own heap.
+Within a process the open files are shared as well: every data manager gets the
+same corpus and page source from here.
+
+Writers (build_quran_corpus.py, the shard builder, snapshots) write a per-process
+temporary file and rename it into place, so no process maps a half-written file.
+
+    store = shared_corpus.layout_store()   # {page_number: page dict}, own small LRU
+"""
+
+import os
+import threading
+
+from utils import QURAN_CORPUS_FILE, MUSHAF_LAYOUT_FILE, PAGE_SHARDS_FILE
+from quran_corpus import QuranCorpus, CorpusFormatError
+from page_layout_store import PageLayoutStore, open_page_shards, DEFAULT_CACHE_PAGES
+
+_lock = threading.Lock()
+_sources = {}  # (kind, path) -> open corpus / shard file, or None if unavailable
+
+
+def _open_corpus(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        corpus = QuranCorpus(path)
+    except (OSError, CorpusFormatError) as e:
+        print(f"!!! Could not open compiled corpus {path}: {e}. Falling back to JSON files.")
+        return None
+
+    stale = corpus.stale_sources()
+    if stale:
+        print(f"Compiled corpus is out of date ({', '.join(stale)} changed). Falling back to JSON files; re-run build_quran_corpus.py.")
+        corpus.close()
+        return None
+    print(f"Using compiled corpus from {path}")
+    return corpus
+
+
+def corpus(path=QURAN_CORPUS_FILE):
+    """
+    The process-wide QuranCorpus, or None if the file is missing, unreadable or older
+    than its JSON sources.
+    """
+    with _lock:
+        key = ("corpus", path)
+        if key not in _sources:
+            _sources[key] = _open_corpus(path)
+        return _sources[key]
+
+
+def page_shards(layout_path=MUSHAF_LAYOUT_FILE, shards_path=PAGE_SHARDS_FILE):
+    """The process-wide page shard file for layout_path (built on first use), or None."""
+    with _lock:
+        key = ("shards", shards_path)
+        if key not in _sources:
+            _sources[key] = open_page_shards(layout_path, shards_path)
+        return _sources[key]
+
+
+def page_source(use_corpus=True):
+    """The compiled corpus when usable, otherwise the page shards."""
+    source = corpus() if use_corpus else None
+    return source if source is not None else page_shards()
+
+
+def layout_store(use_corpus=True, max_pages=DEFAULT_CACHE_PAGES):
+    """A {page_number: page} mapping with its own LRU over the shared page source, or None."""
+    source = page_source(use_corpus)
+    return PageLayoutStore(source, max_pages) if source is not None else None
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+sqlite_pool.py - Per-thread, read-only SQLite connections for the shipped databases.
+
+A sqlite3 connection must not be used from two threads at once, so instead of one
+shared connection opened with check_same_thread=False every thread gets its own,
+opened lazily on first use. Connections are opened through a URI with mode=ro
+(nothing can write, not even by accident) and immutable=1 (the shipped files never
+change, so SQLite skips file locking and change detection), memory-map the file and
+keep a larger page cache. sqlite3 keeps a per-connection cache of prepared
+statements keyed by SQL text; callers build each SQL string once and reuse it so
+repeated lookups skip the parse.
+
+    pool = SQLitePool(db_path)
+    row = pool.execute("SELECT ... WHERE sura=? AND aya=?", (2, 255)).fetchone()
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+MMAP_SIZE = 256 * 1024 * 1024  # bytes of each file SQLite may memory-map
+CACHE_KIB = 8 * 1024           # page cache per connection
+STATEMENT_CACHE = 256          # prepared statements kept per connection
+
+
+def read_only_uri(path, immutable=True):
+    uri = Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+    return uri + "&immutable=1" if immutable else uri
+
+
+def header_fingerprint(path):
+    """
+    (size, file change counter, schema cookie) from a database's 100-byte header, or None if
+    the file is missing or not an SQLite database. A cheap stand-in for a content hash: SQLite
+    bumps the change counter on every committed write and the schema cookie on every schema
+    change (in rollback-journal mode, which the shipped databases use).
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            header = f.read(100)
+    except OSError:
+        return None
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\0"):
+        return None
+    return size, int.from_bytes(header[24:28], 'big'), int.from_bytes(header[40:44], 'big')
+
+
+class SQLitePool:
+    def __init__(self, path, row_factory=sqlite3.Row, immutable=True,
+                 mmap_size=MMAP_SIZE, cache_kib=CACHE_KIB):
+        """
+        immutable: pass False for a database another process may still write to; it is
+        then opened read-only but with normal locking.
+        """
+        self.path = path
+        self.row_factory = row_factory
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self.cache_kib = cache_kib
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []  # (thread, connection), so close_all() can reach every thread's
+        self._closed = False
+
+    def connection(self):
+        """The calling thread's connection, opened on first use. Raises sqlite3.Error."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        if self._closed:
+            raise sqlite3.ProgrammingError(f"Connection pool for {self.path} is closed")
+        if not os.path.exists(self.path):
+            raise sqlite3.OperationalError(f"Database file not found: {self.path}")
+
+        # check_same_thread=False only so close_all() may close it from another thread;
+        # the connection itself is used by its own thread alone.
+        conn = sqlite3.connect(read_only_uri(self.path, self.immutable), uri=True,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        conn.row_factory = self.row_factory
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+        conn.execute("PRAGMA query_only=1")
+        self._local.conn = conn
+
+        with self._lock:
+            # Drop connections of threads that have since exited.
+            alive = []
+            for thread, old in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, old))
+                else:
+                    old.close()
+            alive.append((threading.current_thread(), conn))
+            self._connections = alive
+        return conn
+
+    def execute(self, sql, params=()):
+        """Runs sql on the calling thread's connection and returns the cursor."""
+        return self.connection().execute(sql, params)
+
+    def close_all(self):
+        """Closes every thread's connection; the pool cannot be used afterwards."""
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+staged_loader.py - Runs interdependent loading stages on a worker pool.
+
+Each stage is exposed as a concurrent.futures.Future so callers can block on,
+poll or subscribe to the artefacts they need (e.g. paint the first page as soon
+as the layout is ready while meanings and search indexes are still loading).
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import startup_profiler
+
+
+class StageDependencyError(RuntimeError):
+    """Set on a stage whose dependency failed, so it never ran."""
+
+
+class StagedLoader:
+    def __init__(self, max_workers=4, name="quran-load"):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.futures = {}
+        self.started = time.perf_counter()
+        self.timings = {} # stage -> (start, end) perf_counter seconds, for stages that ran
+
+    def add(self, name, func, deps=()):
+        """
+        Schedules func() to run once every stage named in deps has finished.
+        Dependencies must have been added before. Returns the stage's Future.
+        """
+        stage = Future()
+        dep_futures = [self.futures[d] for d in deps]
+        self.futures[name] = stage
+
+        if not dep_futures:
+            self._launch(name, stage, func, dep_futures)
+            return stage
+
+        remaining = [len(dep_futures)]
+
+        def on_dep_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._launch(name, stage, func, dep_futures)
+
+        for dep in dep_futures:
+            dep.add_done_callback(on_dep_done)
+        return stage
+
+    def add_done(self, name, result=None):
+        """Registers a stage that is already satisfied (e.g. restored from a cache)."""
+        stage = Future()
+        stage.set_result(result)
+        self.futures[name] = stage
+        return stage
+
+    def _launch(self, name, stage, func, dep_futures):
+        failed = [f for f in dep_futures if f.exception() is not None]
+        if failed:
+            stage.set_exception(StageDependencyError(f"Stage '{name}' skipped: a dependency failed"))
+            return
+
+        def run():
+            if not stage.set_running_or_notify_cancel():
+                return
+            start = time.perf_counter()
+            try:
+                with startup_profiler.span(f"{self.name}.{name}", "loader"):
+                    result = func()
+            except BaseException as e:
+                self.timings[name] = (start, time.perf_counter())
+                print(f"Error in loading stage '{name}': {e}")
+                stage.set_exception(e)
+                return
+            self.timings[name] = (start, time.perf_counter())
+            stage.set_result(result)
+
+        self._executor.submit(run)
+
+    def wait(self, names=None, timeout=None):
+        """Blocks until the given stages (default: all) finish. Returns True if all succeeded."""
+        futures = [self.futures[n] for n in (names or list(self.futures))]
+        done, not_done = wait(futures, timeout=timeout)
+        return not not_done and all(f.exception() is None for f in done)
+
+    def shutdown_when_done(self):
+        """Releases the worker threads once every scheduled stage has finished."""
+        futures = list(self.futures.values())
+        remaining = [len(futures)]
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._executor.shutdown(wait=False)
+
+        for f in futures:
+            f.add_done_callback(on_done)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+startup_cache.py - Persistent snapshots of data derived at startup.
+
+A snapshot is a single pickle holding the derived structures together with the
+signature (size, mtime, content hash) of every source file they were built from.
+It is restored in one read when nothing changed and ignored, so the caller
+rebuilds and re-saves it, as soon as any source differs.
+"""
+
+import os
+import pickle
+import threading
+
+from utils import CACHE_DIR, file_signature, signature_matches
+
+
+class SnapshotCache:
+    def __init__(self, name, sources, version=1):
+        """
+        name: file name of the snapshot inside the cache directory.
+        sources: paths of the files the cached data is derived from.
+        version: bump when the code that builds the cached data changes.
+        """
+        self.path = os.path.join(CACHE_DIR, f"{name}.pickle")
+        self.sources = list(sources)
+        self.version = version
+
+    def load(self):
+        """Returns the cached data, or None if there is no valid snapshot."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError) as e:
+            print(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return None
+
+        if not isinstance(snapshot, dict) or snapshot.get("version") != self.version:
+            return None
+
+        # Keyed by file name so the snapshot survives the app folder moving
+        # (e.g. a new PyInstaller extraction directory on every launch).
+        recorded = snapshot.get("sources", {})
+        for path in self.sources:
+            name = os.path.basename(path)
+            if name not in recorded:
+                return None
+            signature = recorded[name]
+            if signature is None:
+                if os.path.exists(path):
+                    return None
+            elif not signature_matches(path, signature, remember=True):
+                print(f"Snapshot {os.path.basename(self.path)} is stale: {name} changed.")
+                return None
+        return snapshot.get("data")
+
+    def save(self, data):
+        snapshot = {
+            "version": self.version,
+            "sources": {os.path.basename(p): file_signature(p, remember=True) for p in self.sources},
+            "data": data,
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except (OSError, pickle.PicklingError) as e:
+            print(f"Could not save snapshot {self.path}: {e}")
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
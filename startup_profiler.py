@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+startup_profiler.py - Named timing spans around the startup phases.
+
+Off unless the app is started with --profile-startup (or the environment variable
+QURAN_PROFILE_STARTUP is set); a disabled span is a single function call. When on,
+every span records wall time, thread CPU time and the process peak memory (peak
+RSS / peak working set) at its end, and at exit two files are written next to the
+given prefix (default: startup_profile):
+
+    startup_profile.txt         phases in start order, nested per thread
+    startup_profile.trace.json  Chrome trace, open in chrome://tracing or Perfetto
+
+    python main.py --profile-startup
+    python main.py --profile-startup=/tmp/run1
+    python main.py --profile-startup --profile-allocations   # + tracemalloc, much slower
+
+    with startup_profiler.span("fonts"):
+        ...
+
+    @startup_profiler.profiled("UiBuilder.build_controls")
+    def build_controls(self): ...
+
+--profile-allocations also records the net Python allocation of each span through
+tracemalloc; it slows loading several times over, so use it for memory, not time.
+Memory figures are process-wide, so spans running at the same time on the loader
+threads share each other's allocations.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+FLAG = "--profile-startup"
+ALLOCATIONS_FLAG = "--profile-allocations"
+ENV_VAR = "QURAN_PROFILE_STARTUP"
+DEFAULT_PREFIX = "startup_profile"
+
+tracemalloc = None  # imported by enable() only when allocations are traced
+
+
+def _peak_rss_posix():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_rss_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return 0
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss():
+    """Peak resident memory of the process so far, in bytes (0 if unavailable)."""
+    try:
+        return _peak_rss_windows() if sys.platform == "win32" else _peak_rss_posix()
+    except (ImportError, OSError, AttributeError):
+        return 0
+
+
+class _Span:
+    __slots__ = ("name", "category", "thread_id", "thread_name", "depth",
+                 "start", "end", "cpu", "alloc", "peak")
+
+    def __init__(self, name, category, depth):
+        thread = threading.current_thread()
+        self.name = name
+        self.category = category
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.depth = depth
+        self.end = None
+        self.start = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.alloc = tracemalloc.get_traced_memory()[0] if tracemalloc else None
+        self.peak = 0
+
+    def close(self):
+        self.end = time.perf_counter()
+        self.cpu = time.thread_time() - self.cpu
+        self.peak = peak_rss()
+        if self.alloc is not None:
+            self.alloc = tracemalloc.get_traced_memory()[0] - self.alloc
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.prefix = DEFAULT_PREFIX
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reported = False
+        self._once_done = set()
+
+    def enable(self, prefix=None, trace_allocations=False):
+        """Starts recording; the report is written at exit (or by write_report())."""
+        global tracemalloc
+        if self.enabled:
+            return
+        self.enabled = True
+        self.prefix = prefix or DEFAULT_PREFIX
+        self.started = time.perf_counter()
+        if trace_allocations:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        atexit.register(self.write_report)
+
+    def _open(self, name, category):
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        entry = _Span(name, category, depth)
+        with self._lock:
+            self.spans.append(entry)
+        return entry
+
+    def _close(self, entry):
+        entry.close()
+        self._local.depth = entry.depth
+
+    def span(self, name, category="startup"):
+        """Context manager timing the enclosed block as one span."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _SpanContext(self, name, category)
+
+    def profiled(self, name=None, category="startup", first_only=False):
+        """
+        Decorator form of span(); the name defaults to the function's qualified name.
+        first_only records just the first call (e.g. the first page render).
+        """
+        def decorate(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or (first_only and span_name in self._once_done):
+                    return func(*args, **kwargs)
+                if first_only:
+                    self._once_done.add(span_name)
+                with _SpanContext(self, span_name, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    # --- Reports ---
+    def finished_spans(self):
+        with self._lock:
+            return sorted((s for s in self.spans if s.end is not None), key=lambda s: s.start)
+
+    def text_report(self):
+        spans = self.finished_spans()
+        lines = [f"{'phase':<52} {'start':>9} {'wall':>9} {'cpu':>9} {'peak':>7} {'alloc':>7}  thread",
+                 f"{'':<52} {'ms':>9} {'ms':>9} {'ms':>9} {'MiB':>7} {'MiB':>7}"]
+        for s in spans:
+            label = ("  " * s.depth + s.name)[:52]
+            alloc = f"{s.alloc / 1048576:>7.1f}" if s.alloc is not None else f"{'-':>7}"
+            lines.append(f"{label:<52} {(s.start - self.started) * 1000:>9.1f} {(s.end - s.start) * 1000:>9.1f} "
+                         f"{s.cpu * 1000:>9.1f} {s.peak / 1048576:>7.1f} {alloc}  {s.thread_name}")
+        if spans:
+            total = max(s.end for s in spans) - self.started
+            lines.append(f"\nStartup spans finished {total * 1000:.1f} ms after profiling began; "
+                         f"peak memory {peak_rss() / 1048576:.1f} MiB.")
+        if tracemalloc:
+            lines.append(f"Traced Python allocation peak: {tracemalloc.get_traced_memory()[1] / 1048576:.1f} MiB.")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Trace Event Format: one complete ('X') event per span, times in microseconds."""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for s in self.finished_spans():
+            threads[s.thread_id] = s.thread_name
+            args = {"cpu_ms": s.cpu * 1000, "peak_mib": s.peak / 1048576}
+            if s.alloc is not None:
+                args["alloc_mib"] = s.alloc / 1048576
+            events.append({
+                "name": s.name, "cat": s.category, "ph": "X", "pid": pid, "tid": s.thread_id,
+                "ts": (s.start - self.started) * 1e6, "dur": (s.end - s.start) * 1e6, "args": args,
+            })
+        for tid, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": thread_name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_report(self):
+        """Prints the text report and writes it and the Chrome trace next to the prefix."""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        report = self.text_report()
+        print(report)
+        try:
+            with open(f"{self.prefix}.txt", 'w', encoding='utf-8') as f:
+                f.write(report + "\n")
+            with open(f"{self.prefix}.trace.json", 'w', encoding='utf-8') as f:
+                json.dump(self.chrome_trace(), f)
+            print(f"Startup profile written to {self.prefix}.txt and {self.prefix}.trace.json")
+        except OSError as e:
+            print(f"Error writing startup profile: {e}")
+
+
+class _SpanContext:
+    __slots__ = ("_profiler", "_name", "_category", "_entry")
+
+    def __init__(self, profiler, name, category):
+        self._profiler = profiler
+        self._name = name
+        self._category = category
+
+    def __enter__(self):
+        self._entry = self._profiler._open(self._name, self._category)
+        return self._entry
+
+    def __exit__(self, *exc):
+        self._profiler._close(self._entry)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+profiler = StartupProfiler()
+span = profiler.span
+profiled = profiler.profiled
+write_report = profiler.write_report
+
+
+def _requested_prefix(argv, environ):
+    """The report prefix asked for on the command line or in the environment, else None."""
+    for arg in argv[1:]:
+        if arg == FLAG:
+            return DEFAULT_PREFIX
+        if arg.startswith(FLAG + "="):
+            return arg.split("=", 1)[1] or DEFAULT_PREFIX
+    value = environ.get(ENV_VAR)
+    if value:
+        return DEFAULT_PREFIX if value == "1" else value
+    return None
+
+
+_prefix = _requested_prefix(sys.argv, os.environ)
+if _prefix:
+    profiler.enable(_prefix, trace_allocations=ALLOCATIONS_FLAG in sys.argv)
@@ -410,6 +410,7 @@ TRANSLATIONS = {
         "no_tafsir": "لا يوجد تفسير متاح.",
         "no_nozool": "لا توجد أسباب نزول متاحة.",
         "no_tajweed": "لا توجد أحكام تجويد متاحة.",
+        "info_loading": "جاري التحميل...",
     },
     "en": {
         # Tabs
@@ -817,5 +818,6 @@ TRANSLATIONS = {
         "no_tafsir": "No Tafsir available.",
         "no_nozool": "No revelation reasons available.",
         "no_tajweed": "No Tajweed rules available.",
+        "info_loading": "Loading...",
     }
 }
@@ -11,6 +11,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 from PyQt5.QtCore import Qt, QTimer
 from utils import resource_path
+import startup_profiler
 
 # --- NEW: CollapsibleBox Class for Sidebar Architecture ---
 from PyQt5.QtWidgets import QToolButton
@@ -60,6 +61,7 @@ class UiBuilder:
         self.main_window = main_window
         self.font_family = main_window.font_family
 
+    @startup_profiler.profiled("UiBuilder.build_controls")
     def build_controls(self):
         """Builds all UI controls and layouts for the main window."""
         # The main layout for the entire window
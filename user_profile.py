@@ -2,9 +2,6 @@
 """
 user_profile.py - Manages user profiles, progress tracking, and dashboard UI.
 """
-import json
-import os
-from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QInputDialog,
                              QPushButton, QListWidget, QLineEdit, QMessageBox,
                              QDateEdit, QFrame, QGridLayout, QWidget, QToolButton, QGroupBox,
@@ -12,365 +9,13 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QInputDi
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QColor
 
-USERS_FILE = "users.json"
-USER_DATA_DIR = "user_data"
-
-class UserManager:
-    def __init__(self):
-        self.current_user = None
-        self.users = self._load_users()
-        if not os.path.exists(USER_DATA_DIR):
-            os.makedirs(USER_DATA_DIR)
-
-    def _load_users(self):
-        if os.path.exists(USERS_FILE):
-            try:
-                with open(USERS_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Migration: If data is a list (old format), convert to dict with empty pins
-                    # Migration 2: If data is dict but values are strings (pin only), convert to dict structure
-                    if isinstance(data, list):
-                        return {user: {"pin": "", "security": ""} for user in data}
-                    
-                    new_data = {}
-                    for user, val in data.items():
-                        if isinstance(val, str):
-                            new_data[user] = {"pin": val, "security": ""}
-                        else:
-                            new_data[user] = val
-                    return new_data
-            except: return {}
-        return {}
-
-    def _save_users(self):
-        with open(USERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.users, f, ensure_ascii=False, indent=4)
-
-    def add_user(self, username, pin="", security=""):
-        if username and username not in self.users:
-            self.users[username] = {"pin": pin, "security": security}
-            self._save_users()
-            # Initialize empty data for new user
-            self.save_user_data(username, {"history": [], "khatma_count": 0})
-            return True
-        return False
-
-    def delete_user(self, username):
-        if username in self.users:
-            del self.users[username]
-            self._save_users()
-            # Try to remove user data file
-            try:
-                path = self.get_user_data_path(username)
-                if os.path.exists(path):
-                    os.remove(path)
-            except: pass
-            return True
-        return False
-
-    def get_user_data_path(self, username):
-        return os.path.join(USER_DATA_DIR, f"{username}.json")
-
-    def load_user_data(self, username):
-        path = self.get_user_data_path(username)
-        if os.path.exists(path):
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except: pass
-        return {"history": [], "khatma_count": 0}
-
-    def save_user_data(self, username, data):
-        path = self.get_user_data_path(username)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-
-    def record_session_progress(self, session_ayahs, duration_seconds=0):
-        """
-        session_ayahs: list of dicts {sura, ayah, accuracy, page}
-        """
-        if not self.current_user: return
-        
-        data = self.load_user_data(self.current_user)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # Record Session Metadata (New Feature)
-        if "sessions" not in data:
-            data["sessions"] = []
-            
-        data["sessions"].append({
-            "date": today,
-            "duration": duration_seconds,
-            "ayahs_count": len(session_ayahs)
-        })
-
-        for item in session_ayahs:
-            entry = {
-                "date": today,
-                "sura": item['sura'],
-                "ayah": item['ayah'],
-                "page": item.get('page', 0),
-                "accuracy": item['accuracy'],
-                "status": "memorized" if item['accuracy'] >= 70 else "pending"
-            }
-            data["history"].append(entry)
-            
-        self.save_user_data(self.current_user, data)
-
-    def get_stats(self, username, start_date_str=None, end_date_str=None):
-        data = self.load_user_data(username)
-        history = data.get("history", [])
-        
-        filtered_history = []
-        if start_date_str and end_date_str:
-            for h in history:
-                if start_date_str <= h.get("date", "") <= end_date_str:
-                    filtered_history.append(h)
-        else:
-            filtered_history = history
-
-        unique_ayahs = set()
-        total_accuracy = 0
-        count = 0
-        
-        for h in filtered_history:
-            # Consider memorized if status is memorized
-            if h.get("status") == "memorized":
-                unique_ayahs.add((h["sura"], h["ayah"]))
-                total_accuracy += h.get("accuracy", 0)
-                count += 1
-        
-        avg_accuracy = (total_accuracy / count) if count > 0 else 0
-        
-        # Simple estimation for pages (approx 15 lines per page, avg 8-10 words per line... 
-        # actually mapping is better but for now just count unique ayahs)
-        # A rough estimate: 6236 ayahs / 604 pages ~= 10 ayahs per page.
-        pages_estimate = len(unique_ayahs) / 10.0 
-        
-        return {
-            "ayahs_memorized": len(unique_ayahs),
-            "pages_estimate": int(pages_estimate),
-            "avg_accuracy": avg_accuracy,
-            "khatma_count": data.get("khatma_count", 0),
-            "surahs_count": len(set(s for s, a in unique_ayahs))
-        }
-
-    def get_surah_breakdown(self, username):
-        """
-        Returns stats per surah:
-        {
-            sura_no: {
-                'memorized_ayahs': set(aya_no),
-                'attempts': int,
-                'total_accuracy': float
-            }
-        }
-        """
-        data = self.load_user_data(username)
-        history = data.get("history", [])
-        
-        breakdown = {}
-        
-        for h in history:
-            sura = h.get("sura")
-            aya = h.get("ayah")
-            acc = h.get("accuracy", 0)
-            status = h.get("status")
-            
-            if not sura: continue
-            
-            if sura not in breakdown:
-                breakdown[sura] = {
-                    'memorized_ayahs': set(),
-                    'attempts': 0,
-                    'total_accuracy': 0
-                }
-            
-            breakdown[sura]['attempts'] += 1
-            breakdown[sura]['total_accuracy'] += acc
-            
-            if status == "memorized":
-                breakdown[sura]['memorized_ayahs'].add(aya)
-                
-        return breakdown
-
-    def get_detailed_period_stats(self, username, start_date_str, end_date_str):
-        """Returns detailed stats including duration and per-page breakdown."""
-        data = self.load_user_data(username)
-        history = data.get("history", [])
-        sessions = data.get("sessions", [])
-        
-        # Filter History
-        filtered_history = [h for h in history if start_date_str <= h.get("date", "") <= end_date_str]
-        
-        # Filter Sessions for Duration
-        filtered_sessions = [s for s in sessions if start_date_str <= s.get("date", "") <= end_date_str]
-        
-        # Calculate Duration
-        total_seconds = sum(s.get("duration", 0) for s in filtered_sessions)
-        hours = int(total_seconds // 3600)
-        minutes = int((total_seconds % 3600) // 60)
-        
-        # Calculate Counts
-        surah_counts = {} # sura_no -> count
-        page_counts = {} # page_no -> count
-        
-        for h in filtered_history:
-            s = h.get("sura")
-            p = h.get("page")
-            if s: surah_counts[s] = surah_counts.get(s, 0) + 1
-            if p: page_counts[p] = page_counts.get(p, 0) + 1
-            
-        return {
-            "duration_str": f"{hours} ساعة و {minutes} دقيقة",
-            "surah_counts": surah_counts,
-            "page_counts": page_counts,
-            "total_ayahs": len(filtered_history)
-        }
-
-    def get_last_position(self, username):
-        data = self.load_user_data(username)
-        history = data.get("history", [])
-        if history:
-            last = history[-1]
-            return last.get("sura"), last.get("ayah")
-        return None, None
-
-    def reset_progress(self, username):
-        data = self.load_user_data(username)
-        if len(data["history"]) > 0:
-             data["khatma_count"] = data.get("khatma_count", 0) + 1
-        
-        data["history"] = []
-        self.save_user_data(username, data)
-
-    def get_plans(self, username):
-        data = self.load_user_data(username)
-        return data.get("plans", [])
-
-    def save_plans(self, username, plans):
-        data = self.load_user_data(username)
-        data["plans"] = plans
-        self.save_user_data(username, data)
-
-    def check_pin(self, username, pin):
-        user_data = self.users.get(username, {})
-        stored_pin = user_data.get("pin", "") if isinstance(user_data, dict) else user_data
-        # If no pin is stored (legacy user), allow access
-        if not stored_pin:
-            return True
-        return stored_pin == pin
-
-    def check_security(self, username, answer):
-        user_data = self.users.get(username, {})
-        if isinstance(user_data, dict):
-            return user_data.get("security", "") == answer
-        return False
-
-    def update_pin(self, username, new_pin):
-        if username in self.users:
-            if isinstance(self.users[username], dict):
-                self.users[username]["pin"] = new_pin
-            else:
-                self.users[username] = {"pin": new_pin, "security": ""}
-            self._save_users()
-            return True
-        return False
-
-    def get_consistency_stats(self, username):
-        data = self.load_user_data(username)
-        sessions = data.get("sessions", [])
-        history = data.get("history", [])
-        
-        # Collect all unique dates from sessions and history
-        dates_set = set()
-        for s in sessions:
-            if s.get("date"): dates_set.add(s["date"])
-        for h in history:
-            if h.get("date"): dates_set.add(h["date"])
-            
-        if not dates_set:
-            return {
-                "total_days": 0, "current_streak": 0, "longest_streak": 0,
-                "consistency_pct": 0.0, "last_active": "غير متوفر"
-            }
-            
-        sorted_dates = sorted(list(dates_set))
-        date_objs = []
-        for d in sorted_dates:
-            try:
-                date_objs.append(datetime.strptime(d, "%Y-%m-%d").date())
-            except: pass
-            
-        if not date_objs: return {"total_days": 0, "current_streak": 0, "longest_streak": 0, "consistency_pct": 0.0, "last_active": "غير متوفر"}
+# UserManager and its paths are re-exported so existing `from user_profile import UserManager`
+# imports keep working.
+from user_manager import UserManager, USERS_FILE, USER_DATA_DIR
 
-        total_days = len(date_objs)
-        last_active = sorted_dates[-1]
-        
-        # Streaks
-        current_streak = 0
-        longest_streak = 0
-        temp_streak = 0
-        
-        for i in range(len(date_objs)):
-            if i == 0:
-                temp_streak = 1
-            else:
-                diff = (date_objs[i] - date_objs[i-1]).days
-                if diff == 1:
-                    temp_streak += 1
-                elif diff > 1:
-                    longest_streak = max(longest_streak, temp_streak)
-                    temp_streak = 1
-        longest_streak = max(longest_streak, temp_streak)
-        
-        # Current Streak
-        today = datetime.now().date()
-        last_date_obj = date_objs[-1]
-        diff_from_today = (today - last_date_obj).days
-        
-        if diff_from_today <= 1: # Active today or yesterday
-            current_streak = 1
-            # Count backwards
-            for i in range(len(date_objs)-2, -1, -1):
-                if (date_objs[i+1] - date_objs[i]).days == 1:
-                    current_streak += 1
-                else:
-                    break
-        else:
-            current_streak = 0
-            
-        # Consistency Percentage
-        first_date = date_objs[0]
-        days_span = (today - first_date).days + 1
-        consistency_pct = (total_days / days_span * 100) if days_span > 0 else 0.0
-        
-        return {
-            "total_days": total_days,
-            "current_streak": current_streak,
-            "longest_streak": longest_streak,
-            "consistency_pct": consistency_pct,
-            "last_active": last_active
-        }
-
-    def save_reflection(self, username, sura, aya, text):
-        data = self.load_user_data(username)
-        if "reflections" not in data:
-            data["reflections"] = {}
-        
-        key = f"{sura}:{aya}"
-        if text:
-            data["reflections"][key] = text
-        else:
-            if key in data["reflections"]:
-                del data["reflections"][key]
-        
-        self.save_user_data(username, data)
+__all__ = ["ProfileDialog", "CollapsibleSection", "DashboardDialog",
+           "UserManager", "USERS_FILE", "USER_DATA_DIR"]
 
-    def get_reflection(self, username, sura, aya):
-        data = self.load_user_data(username)
-        reflections = data.get("reflections", {})
-        return reflections.get(f"{sura}:{aya}", "")
 
 class ProfileDialog(QDialog):
     def __init__(self, user_manager, parent=None):
@@ -5,28 +5,26 @@ utils.py - Helper functions, constants, and normalization logic for the Quran Ta
 
 import os
 import sys
-import ctypes # NEW: For Windows power management
 import re
 import json # NEW: Import json for settings management
 import threading # NEW: For non-blocking sound playback
 import time # NEW: For time tracking
 import difflib
+import functools
+import hashlib
 
-# --- NEW: Add ffmpeg to PATH for pydub when running standalone ---
-# This helps pydub find ffmpeg, especially when running this script directly.
-if getattr(sys, 'frozen', False):
-    # Running in a PyInstaller bundle.
-    if hasattr(sys, '_MEIPASS'):
-        bundle_dir = sys._MEIPASS
-    else:
-        bundle_dir = os.path.dirname(sys.executable)
-else:
-    # Running in a normal Python environment
-    bundle_dir = os.path.dirname(os.path.abspath(__file__))
+# This module is imported by the data layer and the build scripts, so importing it
+# must stay cheap and side-effect free: no PyQt, no ctypes, no environment or
+# filesystem changes. Those happen on first use (load_pydub, WakeLock, save_settings).
 
-ffmpeg_dir_to_add = os.path.join(bundle_dir, 'ffmpeg')
-if os.path.isdir(ffmpeg_dir_to_add):
-    os.environ["PATH"] = ffmpeg_dir_to_add + os.pathsep + os.environ["PATH"]
+def _bundle_dir():
+    if getattr(sys, 'frozen', False):
+        # Running in a PyInstaller bundle.
+        if hasattr(sys, '_MEIPASS'):
+            return sys._MEIPASS
+        return os.path.dirname(sys.executable)
+    # Running in a normal Python environment
+    return os.path.dirname(os.path.abspath(__file__))
 
 # Global variables for rate-limiting sound playback
 _last_error_sound_play_time = 0
@@ -41,7 +39,12 @@ def load_pydub():
     """Lazy load pydub to speed up app startup."""
     global AudioSegment, pydub_play, PYDUB_AVAILABLE, _pydub_loaded
     if _pydub_loaded: return
-    
+
+    # Add the bundled ffmpeg to PATH before pydub looks for it on import.
+    ffmpeg_dir = os.path.join(_bundle_dir(), 'ffmpeg')
+    if os.path.isdir(ffmpeg_dir) and ffmpeg_dir not in os.environ.get("PATH", "").split(os.pathsep):
+        os.environ["PATH"] = ffmpeg_dir + os.pathsep + os.environ.get("PATH", "")
+
     try:
         from pydub import AudioSegment as AS
         from pydub.playback import play as pp
@@ -52,12 +55,6 @@ def load_pydub():
         
         # Configure FFmpeg path
         if getattr(sys, 'frozen', False):
-            if hasattr(sys, '_MEIPASS'):
-                bundle_dir = sys._MEIPASS
-            else:
-                bundle_dir = os.path.dirname(sys.executable)
-            
-            ffmpeg_dir = os.path.join(bundle_dir, 'ffmpeg')
             if os.path.exists(ffmpeg_dir):
                 os.environ["FFMPEG_PATH"] = ffmpeg_dir
                 AudioSegment.converter = os.path.join(ffmpeg_dir, 'ffmpeg.exe')
@@ -77,11 +74,6 @@ def resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base_path, relative_path)
 
-try:
-    from PyQt5.QtGui import QColor
-except ImportError:
-    QColor = None
-
 # --- NEW: Centralized resource paths ---
 DEFAULT_FONT_SIZE = 22
 DEFAULT_BG_COLOR = "#e6f2ff"
@@ -98,6 +90,10 @@ QURAN_VOCAB_FILE = resource_path(os.path.join("data", "quran_vocab.json"))
 QURAN_META_FILE = resource_path(os.path.join("data", "quran_meta.xml")) # مسار ملف البيانات الوصفية
 QURAN_TEXT_DISPLAY_FONT_FILE = os.path.join("fonts", "trado.ttf") # Path to the default Quranic text display font.
 QURAN_WORD_MEANINGS_FILE = resource_path(os.path.join("data", "words_meanings.json")) # Updated to new file
+QURAN_CORPUS_FILE = resource_path(os.path.join("data", "quran_corpus.bin")) # Compiled by build_quran_corpus.py
+QURAN_WORD_MEANINGS_INDEX_FILE = resource_path(os.path.join("data", "word_meanings_index.bin")) # Built by build_word_meanings.py
+UNIFIED_INFO_DB_FILE = resource_path(os.path.join("data", "sqlite", "quran-info-unified.sqlite")) # Built by build_unified_info_db.py
+MUSHAF_LAYOUT_FILE = resource_path(os.path.join("data", "full_mushaf_pages_with_jozz.json")) # Page layout with word coordinates
 
 # Settings file path
 if sys.platform.startswith('win'):
@@ -107,10 +103,9 @@ else:
     # Linux/macOS: ~/.config/QuranApp/settings.json
     _app_data_dir = os.path.join(os.path.expanduser('~'), '.config', "QuranApp")
 
-# Ensure the application data directory exists
-os.makedirs(_app_data_dir, exist_ok=True)
-
 QURAN_APP_SETTINGS_FILE = os.path.join(_app_data_dir, "settings.json")
+CACHE_DIR = os.path.join(_app_data_dir, "cache") # Startup snapshots and other derived data
+PAGE_SHARDS_FILE = os.path.join(CACHE_DIR, "mushaf_pages.shards") # Built from MUSHAF_LAYOUT_FILE when there is no corpus
 
 # --- NEW: Hardcoded Surah Names (Backup) ---
 SURAH_NAMES = [
@@ -140,15 +135,104 @@ def load_settings() -> dict:
             # Fallback to default settings if loading fails
     return {} # Return empty dict if file not found or error occurred
 
+def ensure_app_data_dir() -> str:
+    """Creates the application data directory on first write and returns it."""
+    os.makedirs(_app_data_dir, exist_ok=True)
+    return _app_data_dir
+
 def save_settings(settings: dict):
     """Saves application settings to a JSON file."""
     try:
+        ensure_app_data_dir()
         with open(QURAN_APP_SETTINGS_FILE, 'w', encoding='utf-8') as f:
             json.dump(settings, f, ensure_ascii=False, indent=4)
     except IOError as e:
         print(f"Error saving settings to {QURAN_APP_SETTINGS_FILE}: {e}")
 
 
+# ---------- Source File Signatures ----------
+# Content hashes computed at startup, by absolute path: {path: [size, mtime_ns, sha1]}.
+# A copy, a touch or a fresh extraction changes a file's mtime but not its content;
+# remembering the hash for the new mtime means the file is hashed once, not on every launch.
+VERIFIED_HASHES_FILE = os.path.join(CACHE_DIR, "verified_hashes.json")
+_verified_hashes = None
+_verified_hashes_lock = threading.Lock()
+
+def _remembered_sha1(path, st):
+    """The sha1 recorded for path at exactly this size and mtime, or None."""
+    global _verified_hashes
+    with _verified_hashes_lock:
+        if _verified_hashes is None:
+            try:
+                with open(VERIFIED_HASHES_FILE, 'r', encoding='utf-8') as f:
+                    _verified_hashes = json.load(f)
+            except (OSError, ValueError):
+                _verified_hashes = {}
+        entry = _verified_hashes.get(os.path.abspath(path))
+    if isinstance(entry, list) and len(entry) == 3 and entry[:2] == [st.st_size, st.st_mtime_ns]:
+        return entry[2]
+    return None
+
+def _remember_sha1(path, st, sha1):
+    global _verified_hashes
+    with _verified_hashes_lock:
+        hashes = dict(_verified_hashes or {})
+        hashes[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns, sha1]
+        # Drop files that are gone (e.g. old PyInstaller extraction directories).
+        hashes = {p: e for p, e in hashes.items() if os.path.exists(p)}
+        tmp_path = f"{VERIFIED_HASHES_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(hashes, f)
+            os.replace(tmp_path, VERIFIED_HASHES_FILE)
+        except OSError as e:
+            print(f"Could not save {VERIFIED_HASHES_FILE}: {e}")
+        _verified_hashes = hashes
+
+def file_signature(path: str, remember: bool = False):
+    """
+    Returns [size, mtime_ns, sha1] for a file, or None if it does not exist.
+    Used to decide whether compiled/cached data is still in sync with its source.
+    remember: reuse/record the hash in VERIFIED_HASHES_FILE (for checks run at startup).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if remember:
+        sha1 = _remembered_sha1(path, st)
+        if sha1 is not None:
+            return [st.st_size, st.st_mtime_ns, sha1]
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    if remember:
+        _remember_sha1(path, st, digest.hexdigest())
+    return [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+
+def signature_matches(path: str, signature, remember: bool = False) -> bool:
+    """
+    Checks a file against a stored signature. Size and mtime are compared first;
+    the content hash is only computed when the mtime changed (e.g. after a copy).
+    remember: see file_signature; the hash for a changed mtime is then computed only once.
+    """
+    if not signature:
+        return False
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    size, mtime_ns, sha1 = signature
+    if st.st_size != size:
+        return False
+    if st.st_mtime_ns == mtime_ns:
+        return True
+    current = file_signature(path, remember)
+    return current is not None and current[2] == sha1
+
+
 # ---------- Text Normalization ----------
 
 # NEW: Mapping for special Quranic words (Huroof Muqatta'at)
@@ -175,7 +259,48 @@ SPECIAL_WORD_MAPPINGS = {
 
 # Keep Madda (U+0653) for special words, but remove other diacritics.
 _re_diacritics = re.compile(r'[\u0610-\u061A\u064B-\u0652\u0654-\u065F\u06D6-\u06ED\u0640]')
-_re_not_arabic = re.compile(r'[^\u0600-\u06FF0-9\s]')
+
+# --- Single-pass normalization table ---
+# Every normalization step is a per-character rule, so they collapse into one
+# str.translate() table: keep Arabic letters (with alef/ta marbuta/alef maqsura
+# unified) and ASCII digits; drop diacritics, tatweel, whitespace and anything else.
+class _NormalizationTable(dict):
+    def __missing__(self, codepoint):
+        return None # Not Arabic, not a digit: delete
+
+def _build_normalization_table():
+    table = _NormalizationTable()
+    unify = {"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ة": "ه", "ى": "ي",
+             "\u0670": "\u0627"} # Dagger/superscript alef -> regular alef
+    for codepoint in range(0x0600, 0x0700):
+        ch = chr(codepoint)
+        if ch in unify:
+            table[codepoint] = unify[ch]
+        elif _re_diacritics.match(ch) or ch.isspace():
+            table[codepoint] = None
+        else:
+            table[codepoint] = ch
+    for digit in "0123456789":
+        table[ord(digit)] = digit
+    return table
+
+_NORMALIZATION_TABLE = _build_normalization_table()
+# Plain-dict copy for U+0000-U+06FF: translate() runs faster without __missing__.
+_NORMALIZATION_FAST_TABLE = {codepoint: _NORMALIZATION_TABLE[codepoint] for codepoint in range(0x0700)}
+
+def _special_word_variants():
+    """SPECIAL_WORD_MAPPINGS keyed by every spelling with أ/إ/آ in place of any ا."""
+    variants = {}
+    for key, value in SPECIAL_WORD_MAPPINGS.items():
+        spellings = [""]
+        for ch in key:
+            options = "اأإآ" if ch == "ا" else ch
+            spellings = [prefix + option for prefix in spellings for option in options]
+        for spelling in spellings:
+            variants[spelling] = value
+    return variants
+
+_SPECIAL_WORD_VARIANTS = _special_word_variants()
 
 def normalize_word(s: str) -> str:
     """
@@ -185,28 +310,29 @@ def normalize_word(s: str) -> str:
     """
     if not s:
         return ""
-    
-    # First, do a simple clean of the input string for matching
-    s_for_mapping = s.strip()
-    s_for_mapping = s_for_mapping.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا")
 
     # If the input from STT is a spelled-out version, replace it with the Quranic symbol
     # before proceeding with the full normalization. This allows both the spoken form
     # and the written form to resolve to the same normalized string.
-    if s_for_mapping in SPECIAL_WORD_MAPPINGS:
-        s = SPECIAL_WORD_MAPPINGS[s_for_mapping]
+    special = _SPECIAL_WORD_VARIANTS.get(s.strip())
+    if special is not None:
+        s = special
+
+    # Diacritics, non-Arabic characters and spaces removed, letter forms unified, in one pass.
+    s = s.translate(_NORMALIZATION_FAST_TABLE)
+    if s and max(s) > "\u06ff":
+        s = s.translate(_NORMALIZATION_TABLE) # Rare: characters beyond the Arabic block
+    return s
 
-    # --- NEW: Explicitly replace dagger/superscript alef with regular alef ---
-    s = s.replace("\u0670", "\u0627") # ٰ -> ا
+@functools.lru_cache(maxsize=65536)
+def normalize_corpus_word(s: str) -> str:
+    """Memoized normalize_word for the closed set of Quran word forms (a few tens of thousands)."""
+    return normalize_word(s)
 
-    # Now, apply standard heavy normalization to whatever string we have ('s')
-    s = _re_diacritics.sub("", s)
-    s = _re_not_arabic.sub("", s)
-    s = s.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا").replace("ٱ", "ا")
-    s = s.replace("ة", "ه")
-    s = s.replace("ى", "ي")
-    s = s.replace("ـ", "") # Remove tatweel
-    return "".join(s.split()) # Remove any spaces
+def normalize_words(words, cached=True):
+    """Normalizes a list of words; cached=False for one-off text such as ASR hypotheses."""
+    normalize = normalize_corpus_word if cached else normalize_word
+    return [normalize(w) for w in words]
 
 def calculate_similarity(word1: str, word2: str) -> float:
     """Calculates the similarity between two normalized words using SequenceMatcher."""
@@ -227,6 +353,7 @@ class WakeLock:
     def enable(self):
         if self.active: return
         if sys.platform == 'win32':
+            import ctypes
             # ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED = 0x80000003
             ctypes.windll.kernel32.SetThreadExecutionState(0x80000003)
             self.active = True
@@ -234,6 +361,7 @@ class WakeLock:
     def disable(self):
         if not self.active: return
         if sys.platform == 'win32':
+            import ctypes
             # ES_CONTINUOUS = 0x80000000
             ctypes.windll.kernel32.SetThreadExecutionState(0x80000000)
             self.active = False
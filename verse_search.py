@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+verse_search.py - Inverted character-trigram index over normalized ayah text.
+
+normalize_word() drops spaces, so a verse is one continuous string and any
+substring query (one word or several) of 3+ characters is answered by
+intersecting the posting lists of its trigrams and confirming the substring on
+the few remaining candidates. The index only holds ayah ordinals (positions in
+all_ayas) and is small enough to live in the startup snapshot.
+
+Fuzzy search works on the verse vocabulary (each word normalized on its own, as
+create_quran_vocab.py does): query words are matched to vocabulary words through
+padded trigram overlap and calculate_similarity, the ayat holding those words
+are ranked by how many query words they cover, and the best few are scored as
+sequences against their most similar run of words.
+"""
+
+import heapq
+import threading
+from array import array
+from collections import Counter
+from difflib import SequenceMatcher
+
+from utils import normalize_word, normalize_words, calculate_similarity
+from word_table import pack_strings
+
+NGRAM = 3
+FUZZY_WORD_SIMILARITY = 0.7  # calculate_similarity() a vocabulary word needs to stand for a query word
+FUZZY_MIN_TRIGRAM_DICE = 0.3  # cheap pre-filter before calculate_similarity()
+FUZZY_WORD_CANDIDATES = 8     # vocabulary words kept per query word
+FUZZY_SEQUENCE_CANDIDATES = 30  # ayat scored at sequence level
+SEARCH_CHUNK = 512            # substring candidates verified between partial results
+FUZZY_CHUNK = 10              # ayat sequence-scored between partial results
+
+
+class CancellationToken:
+    """Shared between a caller and a running search; cancel() stops it at the next chunk."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+def trigrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def word_trigrams(word):
+    """Trigrams of a word padded with spaces, so one- and two-letter words have one too."""
+    return trigrams(f" {word} ")
+
+
+class VerseSearchIndex:
+    def __init__(self, ayas):
+        """ayas: all_ayas; verses without aya_text_emlaey are not indexed."""
+        ordinals = array('H')
+        texts = []
+        verse_words = []
+        seen = set()
+        for ordinal, aya in enumerate(ayas):
+            aya_text = aya.get("aya_text_emlaey", "")
+            if not aya_text:
+                continue
+            key = (aya.get("sura_no"), aya.get("aya_no"))
+            if key in seen:
+                continue
+            seen.add(key)
+            ordinals.append(ordinal)
+            texts.append(normalize_word(aya_text))
+            verse_words.append([w for w in normalize_words(aya_text.split()) if w])
+
+        self.ordinals = ordinals  # entry -> ordinal in all_ayas
+        self._text, self._offsets = pack_strings(texts)
+
+        postings = {}
+        for entry, text in enumerate(texts):
+            for gram in trigrams(text):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = posting = array('H')
+                posting.append(entry)
+        self._postings = postings
+        self._build_vocabulary(verse_words)
+
+    def _build_vocabulary(self, verse_words):
+        vocab_ids = {}
+        word_ids = array('H')      # vocabulary ids of every verse, concatenated
+        word_offsets = array('I', [0])
+        for words in verse_words:
+            for word in words:
+                word_ids.append(vocab_ids.setdefault(word, len(vocab_ids)))
+            word_offsets.append(len(word_ids))
+
+        self.vocabulary = sorted(vocab_ids, key=vocab_ids.get)
+        self._word_ids = word_ids
+        self._word_offsets = word_offsets
+
+        # vocabulary id -> verse entries using it; trigram -> vocabulary ids
+        self._word_verses = [array('H') for _ in self.vocabulary]
+        for entry in range(len(verse_words)):
+            for vocab_id in set(self.verse_word_ids(entry)):
+                self._word_verses[vocab_id].append(entry)
+        self._vocab_postings = {}
+        for vocab_id, word in enumerate(self.vocabulary):
+            for gram in word_trigrams(word):
+                self._vocab_postings.setdefault(gram, array('H')).append(vocab_id)
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def normalized_text(self, entry):
+        return self._text[self._offsets[entry]:self._offsets[entry + 1]]
+
+    def verse_word_ids(self, entry):
+        return self._word_ids[self._word_offsets[entry]:self._word_offsets[entry + 1]]
+
+    def _candidates(self, query):
+        if len(query) < NGRAM:
+            return range(len(self.ordinals))
+        lists = []
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return ()
+            lists.append(posting)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for posting in lists[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, normalized_query):
+        """
+        Returns [(ordinal, similarity)] of the verses containing the query, best first:
+        the query covering more of the verse, then an earlier match, then mushaf order.
+        """
+        results = []
+        for results in self.iter_search(normalized_query):
+            pass
+        return results
+
+    def iter_search(self, normalized_query, limit=None, token=None):
+        """
+        Incremental search(): candidates are verified in mushaf order, one chunk at a time,
+        and after each chunk the ranked results so far (at most limit) are yielded.
+        Stops without yielding further once token is cancelled.
+        """
+        if not normalized_query:
+            return
+        candidates = sorted(self._candidates(normalized_query))
+        ranked = []
+        for start in range(0, max(len(candidates), 1), SEARCH_CHUNK):
+            if token is not None and token.cancelled:
+                return
+            for entry in candidates[start:start + SEARCH_CHUNK]:
+                text = self.normalized_text(entry)
+                position = text.find(normalized_query)
+                if position < 0:
+                    continue
+                similarity = len(normalized_query) / len(text) if text else 0
+                ranked.append((-similarity, position, self.ordinals[entry], similarity))
+            ranked.sort()
+            if limit:
+                del ranked[limit:]
+            yield [(ordinal, similarity) for _, _, ordinal, similarity in ranked]
+
+    # --- Fuzzy search ---
+    def similar_words(self, word, limit=FUZZY_WORD_CANDIDATES):
+        """[(vocabulary id, similarity)] of the vocabulary words closest to a normalized word."""
+        grams = word_trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._vocab_postings.get(gram, ()))
+
+        scored = []
+        for vocab_id, count in shared.items():
+            candidate = self.vocabulary[vocab_id]
+            # Padded words have exactly len(word) trigrams (fewer if some repeat).
+            if 2 * count / (len(grams) + len(candidate)) < FUZZY_MIN_TRIGRAM_DICE:
+                continue
+            similarity = calculate_similarity(word, candidate)
+            if similarity >= FUZZY_WORD_SIMILARITY:
+                scored.append((similarity, vocab_id))
+        return [(vocab_id, similarity) for similarity, vocab_id in heapq.nlargest(limit, scored)]
+
+    def _sequence_similarity(self, entry, matcher, size):
+        """
+        Best similarity ratio between the query (seq2 of matcher) and any run of `size`
+        verse words. The cheap upper bounds skip windows that cannot beat the best so far.
+        """
+        words = [self.vocabulary[i] for i in self.verse_word_ids(entry)]
+        size = min(size, len(words))
+        best = 0.0
+        for start in range(len(words) - size + 1):
+            matcher.set_seq1("".join(words[start:start + size]))
+            if matcher.real_quick_ratio() > best and matcher.quick_ratio() > best:
+                best = max(best, matcher.ratio())
+        return best
+
+    def fuzzy_search(self, text, top_k=10):
+        """
+        Typo-tolerant search. Returns [(ordinal, score)] of at most top_k ayat, best first;
+        the score (0..1) averages query-word coverage and sequence similarity.
+        """
+        results = []
+        for results in self.iter_fuzzy_search(text, top_k):
+            pass
+        return results
+
+    def iter_fuzzy_search(self, text, top_k=10, token=None):
+        """
+        Incremental fuzzy_search(): yields the ranked top_k so far after each chunk of
+        sequence-scored ayat. Stops without yielding further once token is cancelled.
+        """
+        query_words = [w for w in normalize_words(text.split(), cached=False) if w]
+        if not query_words:
+            return
+
+        # entry -> best similarity per query word
+        coverage = {}
+        for i, word in enumerate(query_words):
+            if token is not None and token.cancelled:
+                return
+            for vocab_id, similarity in self.similar_words(word):
+                for entry in self._word_verses[vocab_id]:
+                    scores = coverage.get(entry)
+                    if scores is None:
+                        coverage[entry] = scores = [0.0] * len(query_words)
+                    if similarity > scores[i]:
+                        scores[i] = similarity
+
+        candidates = heapq.nlargest(FUZZY_SEQUENCE_CANDIDATES, coverage.items(),
+                                    key=lambda item: (sum(item[1]), -item[0]))
+        # seq2 is the query so difflib indexes it only once for all windows.
+        matcher = SequenceMatcher(None, "", "".join(query_words), autojunk=False)
+        ranked = []
+        for start in range(0, max(len(candidates), 1), FUZZY_CHUNK):
+            if token is not None and token.cancelled:
+                return
+            for entry, scores in candidates[start:start + FUZZY_CHUNK]:
+                score = (sum(scores) / len(query_words) + self._sequence_similarity(entry, matcher, len(query_words))) / 2
+                ranked.append((-score, self.ordinals[entry], score))
+            ranked.sort()
+            yield [(ordinal, score) for _, ordinal, score in ranked[:top_k]]
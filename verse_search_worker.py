@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+verse_search_worker.py - Type-ahead verse search off the GUI thread.
+
+Each call to search() cancels the query still running and starts the new one on
+a single worker thread. Partial results arrive through Qt signals (delivered on
+the GUI thread) tagged with the query's generation, and results of superseded
+queries are never emitted.
+
+    searcher = VerseSearchWorker(data_manager)
+    searcher.results_ready.connect(lambda gen, results: show(results))
+    search_box.textChanged.connect(searcher.search)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from verse_search import CancellationToken
+
+
+class VerseSearchWorker(QObject):
+    results_ready = pyqtSignal(int, list)  # generation, ranked result dicts so far
+    search_finished = pyqtSignal(int)      # generation; not emitted for cancelled queries
+
+    def __init__(self, data_manager, limit=20, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.limit = limit
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="verse-search")
+        self._lock = threading.Lock()
+        self._token = None
+        self._generation = 0
+
+    def search(self, text, fuzzy=False):
+        """Starts a search for text, cancelling the previous one. Returns its generation."""
+        with self._lock:
+            if self._token is not None:
+                self._token.cancel()
+            self._token = token = CancellationToken()
+            self._generation += 1
+            generation = self._generation
+        if text and text.strip():
+            self._executor.submit(self._run, generation, text, fuzzy, token)
+        else:
+            self.results_ready.emit(generation, [])
+            self.search_finished.emit(generation)
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            if self._token is not None:
+                self._token.cancel()
+                self._token = None
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, generation, text, fuzzy, token):
+        try:
+            for results in self.data_manager.iter_find_verse_by_text(text, fuzzy, self.limit, token):
+                if token.cancelled:
+                    return
+                self.results_ready.emit(generation, results)
+        except Exception as e:
+            print(f"Error in verse search for '{text}': {e}")
+        if not token.cancelled:
+            self.search_finished.emit(generation)
@@ -1,79 +1,130 @@
 import sqlite3
 import os
+from array import array
+
+import startup_profiler
+from sqlite_pool import SQLitePool
+from startup_cache import SnapshotCache
+from word_table import pack_strings
+
+WORD_IDS_SNAPSHOT_VERSION = 1
+FETCH_BATCH = 4096 # Rows per fetchmany() while streaming project_contents
 
 class WordMeaningManager:
     def __init__(self, db_path):
         """
-        Initializes the manager and connects to the SQLite database.
+        Initializes the manager; each thread that queries gets its own read-only connection.
         """
         self.db_path = db_path
-        self.conn = None
+        self.pool = None
         self._connect()
 
+    @startup_profiler.profiled("WordMeaningManager.connect")
     def _connect(self):
-        """Connects to the SQLite database."""
+        """Prepares the connection pool for the SQLite database."""
         if not os.path.exists(self.db_path):
             print(f"Error: Database file not found at {self.db_path}")
             return
+        self.pool = SQLitePool(self.db_path, row_factory=None) # Plain tuples; sqlite3.Row is slower to build
+
+    @startup_profiler.profiled("WordMeaningManager.load_all")
+    def load_all(self, use_snapshot=True):
+        """
+        Loads word titles and the ID mappings together.
+        Returns: (titles_map, local_to_global, global_to_db, global_to_local), as returned by
+        load_all_word_titles() and load_id_mappings().
+
+        The rows of project_contents are kept as compact columns in a snapshot keyed by the
+        database file's signature, so later starts skip the SQLite scan.
+        """
+        snapshot = SnapshotCache("word_rasm_ids", [self.db_path], WORD_IDS_SNAPSHOT_VERSION)
+        columns = snapshot.load() if use_snapshot else None
+        if columns is None:
+            columns = self._read_columns()
+            if columns is None:
+                return {}, {}, {}, {}
+            if use_snapshot:
+                snapshot.save(columns)
+        return self._build_maps(columns)
+
+    def _read_columns(self):
+        """
+        Streams project_contents in word_id order into columns:
+        {'sura', 'aya', 'word': arrays, 'titles': pack_strings() of the titles ('' if none)}.
+        """
+        if not self.pool:
+            return None
+        # Fetch all rows ordered by global word_id (sequential 1..77432)
+        query = "SELECT sura_id, aya_id, word_id, title FROM project_contents ORDER BY word_id"
+        suras, ayas, words, titles = array('H'), array('H'), array('I'), []
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
-        except sqlite3.Error as e:
-            print(f"Database connection error: {e}")
-            self.conn = None
+            cursor = self.pool.execute(query)
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH)
+                if not rows:
+                    break
+                for s_id, a_id, w_id, title in rows:
+                    suras.append(s_id)
+                    ayas.append(a_id)
+                    words.append(w_id)
+                    titles.append(title or "")
+        except (sqlite3.Error, TypeError, OverflowError) as e:
+            print(f"Error loading word titles and ID mappings: {e}")
+            return None
+        return {"sura": suras, "aya": ayas, "word": words, "titles": pack_strings(titles)}
+
+    @staticmethod
+    def _build_maps(columns):
+        """
+        Reconstructs local indices (sura, local_aya, local_word) in one pass over the rows.
+        The ID maps number every row; titles number only the rows that have a title, as the
+        titles query always did (it filtered the others out before numbering).
+        """
+        titles_map = {}
+        local_to_global = {}
+        global_to_db = {}
+        global_to_local = {}
+
+        last_sura = last_aya_id = -1
+        local_aya = local_word = 0
+        t_last_sura = t_last_aya_id = -1
+        t_local_aya = t_local_word = 0
+
+        text, offsets = columns["titles"]
+        for i, (s_id, a_id, w_id) in enumerate(zip(columns["sura"], columns["aya"], columns["word"])):
+            if s_id != last_sura: # New Surah
+                local_aya = 1; local_word = 1; last_sura = s_id; last_aya_id = a_id
+            elif a_id != last_aya_id: # New Ayah
+                local_aya += 1; local_word = 1; last_aya_id = a_id
+            else: # Same Ayah
+                local_word += 1
+
+            local_key = (s_id, local_aya, local_word)
+            local_to_global[local_key] = w_id
+            global_to_db[w_id] = (s_id, a_id, w_id)
+            global_to_local[w_id] = local_key
+
+            title = text[offsets[i]:offsets[i + 1]]
+            if not title:
+                continue
+            if s_id != t_last_sura:
+                t_local_aya = 1; t_local_word = 1; t_last_sura = s_id; t_last_aya_id = a_id
+            elif a_id != t_last_aya_id:
+                t_local_aya += 1; t_local_word = 1; t_last_aya_id = a_id
+            else:
+                t_local_word += 1
+            # Key: (sura, local_aya, local_word) matching the renderer's expectation
+            titles_map[(s_id, t_local_aya, t_local_word)] = title
+
+        print(f"Loaded {len(titles_map)} word titles and ID mappings for {len(global_to_db)} words.")
+        return titles_map, local_to_global, global_to_db, global_to_local
 
     def load_all_word_titles(self):
         """
         Loads all word titles from the database into a dictionary for fast lookup.
         Returns: dict {(sura_id, aya_id, word_id): title}
         """
-        if not self.conn:
-            return {}
-
-        # Query based on the confirmed schema for 'project_contents' table
-        query = """
-            SELECT sura_id, aya_id, word_id, title
-            FROM project_contents
-            WHERE title IS NOT NULL AND title != ''
-            ORDER BY word_id
-        """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            
-            # Create a dictionary mapping for O(1) access
-            # Key: (sura, aya, word), Value: title
-            titles_map = {}
-            
-            # Reconstruct local indices (sura, local_aya, local_word)
-            last_sura = -1
-            last_aya_id = -1
-            local_aya = 0
-            local_word = 0
-            
-            for row in rows:
-                s_id = row['sura_id']
-                a_id = row['aya_id']
-                title = row['title']
-                
-                if s_id != last_sura: # New Surah
-                    local_aya = 1; local_word = 1; last_sura = s_id; last_aya_id = a_id
-                elif a_id != last_aya_id: # New Ayah
-                    local_aya += 1; local_word = 1; last_aya_id = a_id
-                else: # Same Ayah
-                    local_word += 1
-                
-                # Key: (sura, local_aya, local_word) matching the renderer's expectation
-                key = (s_id, local_aya, local_word)
-                titles_map[key] = title
-            
-            print(f"Loaded {len(titles_map)} word titles from database (mapped to local indices).")
-            return titles_map
-
-        except sqlite3.Error as e:
-            print(f"Query error loading word titles: {e}")
-            return {}
+        return self.load_all()[0]
 
     def load_id_mappings(self):
         """
@@ -83,47 +134,9 @@ class WordMeaningManager:
             global_to_db: {global_word_id: (sura_id, aya_id, word_id)}
             global_to_local: {global_word_id: (sura, l_aya, l_word)}
         """
-        if not self.conn: return {}, {}, {}
-        
-        # Fetch all IDs ordered by global word_id (sequential 1..77432)
-        query = "SELECT sura_id, aya_id, word_id FROM project_contents ORDER BY word_id"
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            
-            local_to_global = {}
-            global_to_db = {}
-            global_to_local = {}
-            
-            last_sura = -1
-            last_aya_id = -1
-            local_aya = 0
-            local_word = 0
-            
-            for row in rows:
-                s_id, a_id, w_id = row[0], row[1], row[2]
-                
-                if s_id != last_sura: # New Surah
-                    local_aya = 1; local_word = 1; last_sura = s_id; last_aya_id = a_id
-                elif a_id != last_aya_id: # New Ayah
-                    local_aya += 1; local_word = 1; last_aya_id = a_id
-                else: # Same Ayah
-                    local_word += 1
-                
-                local_key = (s_id, local_aya, local_word)
-                local_to_global[local_key] = w_id
-                global_to_db[w_id] = (s_id, a_id, w_id)
-                global_to_local[w_id] = local_key
-                
-            print(f"Loaded ID mappings for {len(global_to_db)} words.")
-            return local_to_global, global_to_db, global_to_local
-            
-        except sqlite3.Error as e:
-            print(f"Error loading ID mappings: {e}")
-            return {}, {}, {}
+        return self.load_all()[1:]
 
     def __del__(self):
-        """Closes the database connection when the object is destroyed."""
-        if self.conn:
-            self.conn.close()
+        """Closes the database connections when the object is destroyed."""
+        if self.pool:
+            self.pool.close_all()
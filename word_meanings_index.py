@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+word_meanings_index.py - Aligns the phrase meanings of words_meanings.json to
+mushaf words, and reads the precomputed alignment written by build_word_meanings.py.
+
+The index stores one meaning id per global word id plus a deduplicated pool of
+meaning strings, so the app only has to mmap it instead of re-running the
+alignment on every launch.
+"""
+
+from array import array
+
+from quran_corpus import CorpusFile, CorpusWriter
+from utils import normalize_word, normalize_words
+
+NO_MEANING = 0xFFFFFFFF
+
+
+def parse_meaning_phrases(data):
+    """
+    Parses {"sura:aya": "word: meaning | word2: meaning2"} into
+    {(sura, aya): [(normalized_phrase, meaning), ...]}.
+    """
+    phrases = {}
+    for key, value in data.items():
+        try:
+            if ':' not in key: continue
+            sura_str, aya_str = key.split(':')
+            sura, aya = int(sura_str), int(aya_str)
+
+            for seg in value.split('|'):
+                if ':' in seg:
+                    w, m = seg.split(':', 1)
+                    w_norm = normalize_word(w.strip())
+                    if w_norm: # Ensure not empty
+                        phrases.setdefault((sura, aya), []).append((w_norm, m.strip()))
+        except ValueError:
+            continue
+    return phrases
+
+
+def align_word_meanings(pages, phrases, matched=None):
+    """
+    Greedy phrase-to-word alignment over layout pages.
+    Returns {(sura, aya, word): meaning}. If `matched` is a set, the
+    (sura, aya, phrase_index) of every phrase that was used is added to it.
+    """
+    word_meanings = {}
+    for page_data in pages:
+        page_words = [word for line in page_data.get('lines', []) for word in line.get('words', [])]
+        # Each word is normalized once per page instead of once per phrase comparison.
+        norms = normalize_words([word.get('text', '') for word in page_words])
+
+        i = 0
+        while i < len(page_words):
+            word_processed_count = 0
+            word = page_words[i]
+            sura = word.get('surah')
+            aya = word.get('ayah')
+
+            if not sura or not aya:
+                i += 1
+                continue
+
+            try:
+                sura_int, aya_int = int(sura), int(aya)
+            except (ValueError, TypeError):
+                i += 1
+                continue
+
+            current_word_norm = norms[i]
+            aya_phrases = phrases.get((sura_int, aya_int))
+
+            # --- Pass 1: Strict multi-word phrase matching ---
+            if current_word_norm and aya_phrases:
+                for phrase_idx, (phrase, meaning) in enumerate(aya_phrases):
+                    if phrase.startswith(current_word_norm):
+                        remaining_phrase = phrase[len(current_word_norm):]
+
+                        # If it's a perfect match for a single-word phrase
+                        if not remaining_phrase:
+                            w_id = word.get('word')
+                            if w_id is not None:
+                                word_meanings[(sura_int, aya_int, int(w_id))] = meaning
+                                word_processed_count = 1
+                                if matched is not None: matched.add((sura_int, aya_int, phrase_idx))
+                                break
+
+                        # Attempt to greedily match subsequent words for multi-word phrase
+                        consumed_words = 1
+                        temp_idx = i + 1
+                        while remaining_phrase and temp_idx < len(page_words):
+                            next_word_norm = norms[temp_idx]
+                            if not next_word_norm: # Skip empty normalized words (like formatting)
+                                temp_idx += 1
+                                consumed_words += 1
+                                continue
+
+                            if remaining_phrase.startswith(next_word_norm):
+                                remaining_phrase = remaining_phrase[len(next_word_norm):]
+                                consumed_words += 1
+                                temp_idx += 1
+                            else:
+                                break
+
+                        if not remaining_phrase: # Full multi-word phrase matched
+                            for j in range(consumed_words):
+                                w = page_words[i + j]
+                                w_id = w.get('word')
+                                if w_id is not None:
+                                    word_meanings[(int(w.get('surah')), int(w.get('ayah')), int(w_id))] = meaning
+                            word_processed_count = consumed_words
+                            if matched is not None: matched.add((sura_int, aya_int, phrase_idx))
+                            break
+
+            if word_processed_count > 0:
+                i += word_processed_count
+                continue
+
+            # --- Pass 2: Lenient fallback for words not part of a successful strict match ---
+            if current_word_norm and aya_phrases:
+                word_id = word.get('word')
+                if word_id is not None:
+                    for phrase_idx, (phrase, meaning) in enumerate(aya_phrases):
+                        # Check if the dictionary phrase is IN the Quranic word (handles prefixes like و, ف)
+                        if phrase in current_word_norm:
+                            word_meanings[(sura_int, aya_int, int(word_id))] = meaning
+                            if matched is not None: matched.add((sura_int, aya_int, phrase_idx))
+                            break
+
+            i += 1 # Move to the next word if no match was found
+
+    return word_meanings
+
+
+def unmatched_phrases(phrases, matched):
+    """Lists the phrases the alignment could not place on any word."""
+    report = []
+    for (sura, aya), aya_phrases in sorted(phrases.items()):
+        for phrase_idx, (phrase, meaning) in enumerate(aya_phrases):
+            if (sura, aya, phrase_idx) not in matched:
+                report.append({"sura": sura, "aya": aya, "phrase": phrase, "meaning": meaning})
+    return report
+
+
+def write_word_meanings_index(path, word_meanings, local_to_global, sources):
+    """
+    Writes the (global_word_id -> meaning_id) table and the meaning string pool.
+    Returns (mapped word count, words without a global id).
+    """
+    writer = CorpusWriter()
+    writer.meta["kind"] = "word_meanings"
+    size = max(local_to_global.values(), default=0) + 1
+    table = array('I', [NO_MEANING]) * size
+
+    mapped = 0
+    missing_ids = 0
+    for key, meaning in word_meanings.items():
+        global_id = local_to_global.get(key)
+        if global_id is None:
+            missing_ids += 1
+            continue
+        table[global_id] = writer.add_string(meaning)
+        mapped += 1
+
+    writer.sections["word.meaning_id"] = table.tobytes()
+    writer.meta["mapped"] = mapped
+    writer.add_sources(sources)
+    writer.write(path)
+    return mapped, missing_ids
+
+
+class WordMeaningsIndex(CorpusFile):
+    """Memory-mapped (global_word_id -> meaning) lookup."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._meaning_ids = self.column("word.meaning_id", 'I')
+
+    def __len__(self):
+        return self.meta.get("mapped", 0)
+
+    def meaning(self, global_word_id):
+        if global_word_id is None or not 0 <= global_word_id < len(self._meaning_ids):
+            return None
+        meaning_id = self._meaning_ids[global_word_id]
+        return None if meaning_id == NO_MEANING else self.string(meaning_id)
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+word_table.py - Compact struct-of-arrays table of every Quran word.
+
+Rows are indexed by global word id (the word_id of word-wordrasm.sqlite). Each
+attribute is one typed array column and the texts are stored as a single string
+per kind with offset columns, instead of one dict/tuple per word. Read-only
+mapping views keep the old dict interfaces (local_to_global_map, titles_map, ...)
+working on top of the table.
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping
+
+from utils import normalize_words
+
+CHAR_TYPES = ("", "word", "end")
+_CHAR_TYPE_CODES = {name: code for code, name in enumerate(CHAR_TYPES)}
+
+
+def pack_strings(texts):
+    """Packs texts into one string plus an offsets column (len(texts) + 1 entries)."""
+    offsets = array('I', [0])
+    total = 0
+    for text in texts:
+        total += len(text)
+        offsets.append(total)
+    return "".join(texts), offsets
+
+
+class WordTable:
+    def __init__(self, columns, texts, aya_starts, extra_titles=None, key_map=None):
+        """Use WordTable.build(); the arguments are the pickled state."""
+        self.sura = columns["sura"]        # array('H') local sura number
+        self.aya = columns["aya"]          # array('H') local aya number
+        self.word = columns["word"]        # array('H') local word number within the aya
+        self.db_aya = columns["db_aya"]    # array('I') aya_id as stored in the DB
+        self.page = columns["page"]        # array('H') mushaf page, 0 if not in the layout
+        self.line = columns["line"]        # array('B') line on the page, 0 if not in the layout
+        self.char_type = columns["char_type"]  # array('B') index into CHAR_TYPES
+        self._text, self.text_offset = texts["text"]
+        self._normalized, self.normalized_offset = texts["normalized"]
+        self._title, self.title_offset = texts["title"]
+        self._aya_starts = aya_starts      # {(sura, aya): first global id}
+        self._extra_titles = extra_titles or {}  # titles whose local key has no global id
+        self._key_map = key_map                  # only if global ids are not contiguous per aya
+        self._count = sum(1 for s in self.sura if s)
+
+    def __getstate__(self):
+        return {
+            "columns": {name: getattr(self, name) for name in
+                        ("sura", "aya", "word", "db_aya", "page", "line", "char_type")},
+            "texts": {"text": (self._text, self.text_offset),
+                      "normalized": (self._normalized, self.normalized_offset),
+                      "title": (self._title, self.title_offset)},
+            "aya_starts": self._aya_starts,
+            "extra_titles": self._extra_titles,
+            "key_map": self._key_map,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @classmethod
+    def build(cls, pages, global_to_db, global_to_local, titles_map):
+        """
+        pages: iterable of layout page dicts (full_mushaf_pages_with_jozz.json format).
+        global_to_db / global_to_local / titles_map: as loaded by WordMeaningManager.
+        """
+        size = max(global_to_db, default=0) + 1
+        sura = array('H', bytes(2 * size))
+        aya = array('H', bytes(2 * size))
+        word = array('H', bytes(2 * size))
+        db_aya = array('I', bytes(4 * size))
+        page = array('H', bytes(2 * size))
+        line = array('B', bytes(size))
+        char_type = array('B', bytes(size))
+        texts = [""] * size
+        titles = [""] * size
+        aya_starts = {}
+
+        for global_id in sorted(global_to_db):
+            s, a, w = global_to_local[global_id]
+            sura[global_id], aya[global_id], word[global_id] = s, a, w
+            db_aya[global_id] = global_to_db[global_id][1]
+            aya_starts.setdefault((s, a), global_id)
+
+        local_to_global = {key: gid for gid, key in global_to_local.items()}
+        extra_titles = {}
+        for key, title in titles_map.items():
+            global_id = local_to_global.get(key)
+            if global_id is None:
+                extra_titles[key] = title
+            else:
+                titles[global_id] = title
+
+        for page_data in pages:
+            page_num = page_data.get('page_number', 0)
+            for line_data in page_data.get('lines', []):
+                for item in line_data.get('words', []):
+                    # Ayah-end markers carry the number after the last word; they have no global id.
+                    if item.get('char_type') == 'end':
+                        continue
+                    try:
+                        key = (int(item.get('surah')), int(item.get('ayah')), int(item.get('word')))
+                    except (TypeError, ValueError):
+                        continue
+                    global_id = local_to_global.get(key)
+                    if global_id is None:
+                        continue
+                    page[global_id] = page_num
+                    line[global_id] = item.get('line') or 0
+                    char_type[global_id] = _CHAR_TYPE_CODES.get(item.get('char_type'), 0)
+                    texts[global_id] = item.get('text') or ""
+
+        columns = {"sura": sura, "aya": aya, "word": word, "db_aya": db_aya,
+                   "page": page, "line": line, "char_type": char_type}
+        string_columns = {"text": pack_strings(texts),
+                          "normalized": pack_strings(normalize_words(texts)),
+                          "title": pack_strings(titles)}
+        table = cls(columns, string_columns, aya_starts, extra_titles)
+        table._check_aya_starts()
+        return table
+
+    def _check_aya_starts(self):
+        """Global ids are contiguous within an aya; fall back to a full key map if the DB says otherwise."""
+        for global_id in range(1, len(self.sura)):
+            if not self.sura[global_id]:
+                continue
+            key = (self.sura[global_id], self.aya[global_id])
+            start = self._aya_starts.get(key)
+            if start is None or start + self.word[global_id] - 1 != global_id:
+                print("WordTable: global word ids are not contiguous per aya; using an explicit key map.")
+                self._key_map = {self.local_id(g): g for g in self}
+                return
+
+    # --- Row access ---
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Yields every global word id in the table."""
+        sura = self.sura
+        return (g for g in range(1, len(sura)) if sura[g])
+
+    def __contains__(self, global_id):
+        return isinstance(global_id, int) and 0 < global_id < len(self.sura) and self.sura[global_id] != 0
+
+    def global_id(self, sura, aya, word):
+        """(sura, aya, word) local ids -> global word id, or None."""
+        if self._key_map is not None:
+            return self._key_map.get((sura, aya, word))
+        start = self._aya_starts.get((sura, aya))
+        if start is None or not isinstance(word, int) or word < 1:
+            return None
+        global_id = start + word - 1
+        if global_id < len(self.sura) and self.word[global_id] == word and \
+                self.aya[global_id] == aya and self.sura[global_id] == sura:
+            return global_id
+        return None
+
+    def global_id_from_key(self, global_idx):
+        """'s:a:w' string key (as used by the renderer) -> global word id, or None."""
+        try:
+            sura, aya, word = map(int, global_idx.split(':'))
+        except (AttributeError, ValueError):
+            return None
+        return self.global_id(sura, aya, word)
+
+    def local_id(self, global_id):
+        """Global word id -> (sura, aya, word), or None."""
+        if global_id not in self:
+            return None
+        return (self.sura[global_id], self.aya[global_id], self.word[global_id])
+
+    def key(self, global_id):
+        """Global word id -> 's:a:w' string key, or ''."""
+        local = self.local_id(global_id)
+        return f"{local[0]}:{local[1]}:{local[2]}" if local else ""
+
+    def db_ids(self, global_id):
+        """Global word id -> (sura_id, aya_id, word_id) as stored in the DB, or None."""
+        if global_id not in self:
+            return None
+        return (self.sura[global_id], self.db_aya[global_id], global_id)
+
+    def aya_words(self, sura, aya):
+        """Global word ids of an aya, in order."""
+        start = self._aya_starts.get((sura, aya))
+        if start is None:
+            return range(0)
+        end = start
+        while end < len(self.sura) and self.sura[end] == sura and self.aya[end] == aya:
+            end += 1
+        return range(start, end)
+
+    def text(self, global_id):
+        """Layout (rendered) text of the word."""
+        return self._text[self.text_offset[global_id]:self.text_offset[global_id + 1]]
+
+    def normalized(self, global_id):
+        """normalize_word() of the layout text."""
+        return self._normalized[self.normalized_offset[global_id]:self.normalized_offset[global_id + 1]]
+
+    def title(self, global_id):
+        """Word title from word-wordrasm.sqlite."""
+        return self._title[self.title_offset[global_id]:self.title_offset[global_id + 1]]
+
+    def location(self, global_id):
+        """(page, line) of the word in the mushaf layout, or None if it is not on any page."""
+        if global_id not in self or not self.page[global_id]:
+            return None
+        return (self.page[global_id], self.line[global_id])
+
+    def word_dict(self, global_id):
+        """The word as a layout-style dict, for code that still expects one."""
+        if global_id not in self:
+            return None
+        return {'surah': self.sura[global_id], 'ayah': self.aya[global_id], 'word': self.word[global_id],
+                'text': self.text(global_id), 'char_type': CHAR_TYPES[self.char_type[global_id]],
+                'line': self.line[global_id], 'page': self.page[global_id]}
+
+    # --- Dict-compatible views ---
+    def local_to_global_view(self):
+        return _LocalToGlobalView(self)
+
+    def global_to_local_view(self):
+        return _GlobalView(self, self.local_id)
+
+    def global_to_db_view(self):
+        return _GlobalView(self, self.db_ids)
+
+    def titles_view(self):
+        return _TitlesView(self)
+
+    # --- Diagnostics ---
+    def nbytes(self):
+        """Approximate memory held by the table."""
+        total = sum(sys.getsizeof(getattr(self, name)) for name in
+                    ("sura", "aya", "word", "db_aya", "page", "line", "char_type",
+                     "text_offset", "normalized_offset", "title_offset"))
+        total += sys.getsizeof(self._text) + sys.getsizeof(self._normalized) + sys.getsizeof(self._title)
+        total += _deep_sizeof(self._aya_starts) + _deep_sizeof(self._extra_titles)
+        if self._key_map is not None:
+            total += _deep_sizeof(self._key_map)
+        return total
+
+    def memory_report(self, **dict_maps):
+        """
+        Compares the table with the dict maps it replaces, e.g.
+        memory_report(titles_map=..., local_to_global_map=...). Returns a dict of byte counts.
+        """
+        report = {name: _deep_sizeof(value) for name, value in dict_maps.items()}
+        report["dict_maps_total"] = sum(report.values())
+        report["word_table"] = self.nbytes()
+        report["saved"] = report["dict_maps_total"] - report["word_table"]
+        return report
+
+
+class _GlobalView(Mapping):
+    """{global_id: getter(global_id)} over the table."""
+
+    def __init__(self, table, getter):
+        self._table = table
+        self._getter = getter
+
+    def __getitem__(self, global_id):
+        value = self._getter(global_id) if global_id in self._table else None
+        if value is None:
+            raise KeyError(global_id)
+        return value
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, global_id):
+        return global_id in self._table
+
+
+class _LocalToGlobalView(Mapping):
+    """{(sura, aya, word): global_id} over the table."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, key):
+        try:
+            global_id = self._table.global_id(*key)
+        except TypeError:
+            global_id = None
+        if global_id is None:
+            raise KeyError(key)
+        return global_id
+
+    def __iter__(self):
+        return (self._table.local_id(g) for g in self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, key):
+        try:
+            return self._table.global_id(*key) is not None
+        except TypeError:
+            return False
+
+
+class _TitlesView(_LocalToGlobalView):
+    """{(sura, aya, word): title} over the table (words without a title are absent)."""
+
+    def __getitem__(self, key):
+        extra = self._table._extra_titles.get(key)
+        if extra is not None:
+            return extra
+        title = self._table.title(super().__getitem__(key))
+        if not title:
+            raise KeyError(key)
+        return title
+
+    def __iter__(self):
+        table = self._table
+        yield from (table.local_id(g) for g in table if table.title(g))
+        yield from table._extra_titles
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+
+def _deep_sizeof(obj, _seen=None):
+    """sys.getsizeof including the contents of dicts, lists, tuples and sets."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+if __name__ == '__main__':
+    # Memory of the word table vs. the dict maps it replaces in QuranDataManager.
+    import json
+    from word_meaning_manager import WordMeaningManager
+    from quran_data_manager import WORD_RASM_DB_FILE, MUSHAF_LAYOUT_FILE
+
+    manager = WordMeaningManager(WORD_RASM_DB_FILE)
+    titles_map, local_to_global, global_to_db, global_to_local = manager.load_all()
+    with open(MUSHAF_LAYOUT_FILE, 'r', encoding='utf-8') as f:
+        layout_pages = json.load(f)
+
+    table = WordTable.build(layout_pages, global_to_db, global_to_local, titles_map)
+    report = table.memory_report(titles_map=titles_map, local_to_global_map=local_to_global,
+                                 global_to_db_map=global_to_db, global_to_local_map=global_to_local)
+    for name, size in report.items():
+        print(f"{name:>22}: {size / 1024 / 1024:8.2f} MB")